@@ -0,0 +1,10 @@
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'interactions.settings')
+
+app = Celery('interactions')
+# all celery settings are in django settings, prefixed by CELERY_
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
@@ -1,5 +1,6 @@
 from enum import Enum
-from django.db.models import Q
+from django.db import connections
+from django.db.models import Q, Case, When, Value
 
 
 class ChoiceEnum(Enum):
@@ -21,3 +22,40 @@ def make_words_fields_query_expr(words, fields, mode):
         else:
             q = (q | w_q) if q else w_q
     return q
+
+
+def chunked(iterable, size):
+    """Yield lists of up to `size` items from `iterable`, without materializing it.
+    """
+    chunk = []
+    for it in iterable:
+        chunk.append(it)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def bulk_update(queryset, objs, fields, batch_size=None):
+    """Save `fields` of already existing `objs` with a single
+    `UPDATE ... SET f = CASE WHEN pk = ... END` query per batch.
+
+    Stand-in for Django 2.2's `QuerySet.bulk_update`.
+    """
+    objs = list(objs)
+    if not objs:
+        return
+    model = queryset.model
+    fields = [model._meta.get_field(name) for name in fields]
+    # each object uses 2 params (pk and value) per field
+    max_batch_size = connections[queryset.db].ops.bulk_batch_size(['pk', 'pk'] * len(fields), objs)
+    batch_size = min(batch_size, max_batch_size) if batch_size else max_batch_size
+    for batch in chunked(objs, max(batch_size, 1)):
+        updates = {
+            field.attname: Case(*[When(pk=obj.pk, then=Value(getattr(obj, field.attname)))
+                                  for obj in batch],
+                                output_field=field)
+            for field in fields
+        }
+        queryset.filter(pk__in=[obj.pk for obj in batch]).update(**updates)
@@ -1,4 +1,5 @@
 from .settings import *
+from .settings import REST_FRAMEWORK
 
 
 DATABASES = {
@@ -7,3 +8,15 @@ DATABASES = {
         # 'NAME': 'tests_db.sqlite',
     }
 }
+
+# run background tasks in process
+CELERY_TASK_ALWAYS_EAGER = True
+
+# API tests authenticate with APIClient.force_authenticate() (or JWTs), the
+# authentication classes are the production ones
+REST_FRAMEWORK = dict(REST_FRAMEWORK, DEFAULT_THROTTLE_RATES={
+    'api': '10000/min',
+    'expensive': '10000/min',
+    'reference': '10000/min',
+    'autocomplete': '10000/min',
+})
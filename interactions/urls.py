@@ -15,8 +15,6 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import include, path
-from django.conf import settings
-from django.conf.urls.static import static
 from rest_framework import routers
 from rest_framework.documentation import include_docs_urls
 from rest_framework_jwt.views import obtain_jwt_token, refresh_jwt_token, verify_jwt_token
@@ -26,13 +24,17 @@ from interactionscore import views as core_views
 
 router = routers.DefaultRouter()
 router.register(r'affiliate-groups', core_views.AffiliateGroupViewSet)
+router.register(r'comments', core_views.CommentViewSet)
 router.register(r'engagement-plans', core_views.EngagementPlanViewSet)
 router.register(r'hcps', core_views.HCPViewSet)
 router.register(r'interactions', core_views.InteractionViewSet)
 router.register(r'projects', core_views.ProjectViewSet)
 router.register(r'therapeutic-areas', core_views.TherapeuticAreaViewSet)
 router.register(r'resources', core_views.ResourceViewSet)
+router.register(r'resource-uploads', core_views.ResourceUploadViewSet)
 router.register(r'hcp-objectives', core_views.HCPObjectiveViewSet)
+router.register(r'hcp-deliverables', core_views.HCPDeliverableViewSet)
+router.register(r'project-deliverables', core_views.ProjectDeliverableViewSet)
 router.register(r'brand-critical-success-factors', core_views.BrandCriticalSuccessFactorViewSet)
 router.register(r'medical-plan-objectives', core_views.MedicalPlanObjectiveViewSet)
 
@@ -46,7 +48,9 @@ urlpatterns = [
         path('token/refresh/', refresh_jwt_token),
         path('token/verify/', verify_jwt_token),
         path('self/', core_views.CurrentUserView.as_view(), name='users-current'),
+        path('self/plan/', core_views.CurrentPlanView.as_view(), name='users-current-plan'),
+        path('changes/', core_views.ChangesView.as_view(), name='changes'),
         path('docs/', include_docs_urls(title='My API title', public=False)),
         path('api-auth/', include('rest_framework.urls', namespace='rest_framework')),
     ] + router.urls))
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+]
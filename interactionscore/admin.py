@@ -1,10 +1,14 @@
 from django.utils.translation import gettext_lazy as _
 from django.forms import ModelForm
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django import forms
-from django.urls import resolve
+from django.urls import resolve, path
 from django.contrib.auth.models import Permission
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
 import nested_admin
 from safedelete.admin import SafeDeleteAdmin, highlight_deleted
 
@@ -21,12 +25,15 @@ from .models import (
     ProjectObjective,
     ProjectDeliverable,
     HCP,
+    HCPMerge,
     User,
     Interaction,
     Resource,
     BrandCriticalSuccessFactor,
     MedicalPlanObjective,
 )
+from .importers import HCPImporter, ImportFileError, read_rows
+from .merging import MergeError, merge_hcps
 
 admin.site.site_header = "Otsuka Interactions Admin"
 admin.site.site_title = "Otsuka Interactions Admin"
@@ -97,6 +104,7 @@ class CommentAdmin(SafeDeleteAdmin):
     model = Comment
     list_display = (highlight_deleted, "user") + SafeDeleteAdmin.list_display
     list_filter = ("user",) + SafeDeleteAdmin.list_filter
+    list_select_related = Comment.STR_RELATED
 
 
 class CommentInline(nested_admin.NestedStackedInline):
@@ -193,20 +201,92 @@ class EngagementPlanAdmin(nested_admin.NestedModelAdmin, SafeDeleteAdmin):
     list_filter = ("approved", "user", "year") + SafeDeleteAdmin.list_filter
 
 
+class HCPImportForm(forms.Form):
+    file = forms.FileField(help_text='CSV or XLSX file, with a header row')
+    dry_run = forms.BooleanField(required=False, help_text='Only validate, do not save anything')
+
+
+def action_hcps_merge(modeladmin, request, queryset):
+    hcps = list(queryset.order_by('created_at', 'pk'))
+    if len(hcps) < 2:
+        modeladmin.message_user(request, 'Select the HCPs to merge (at least 2).', messages.ERROR)
+        return
+    hcp = hcps[0]
+    try:
+        with transaction.atomic():
+            for duplicate in hcps[1:]:
+                merge_hcps(hcp, duplicate, user=request.user)
+                modeladmin.log_change(request, hcp, 'Merged HCP #{} ({}).'.format(duplicate.pk, duplicate))
+    except MergeError as e:
+        modeladmin.message_user(request, str(e), messages.ERROR)
+        return
+    modeladmin.message_user(request, '{} HCPs merged into {} (#{}).'.format(len(hcps) - 1, hcp, hcp.pk))
+
+
+action_hcps_merge.short_description = 'Merge into the oldest selected HCP'
+
+
 @admin.register(HCP)
 class HCPAdmin(SafeDeleteAdmin):
     model = HCP
+    change_list_template = 'admin/interactionscore/hcp/change_list.html'
     list_display = (
                        highlight_deleted,
                        "institution_name",
                        "hcp_affiliate_groups",
                    ) + SafeDeleteAdmin.list_display
     list_filter = SafeDeleteAdmin.list_filter
+    actions = SafeDeleteAdmin.actions + (action_hcps_merge,)
+
+    max_import_errors_shown = 50
+
+    def get_urls(self):
+        return [
+            path('import/', self.admin_site.admin_view(self.import_view), name='interactionscore_hcp_import'),
+        ] + super().get_urls()
+
+    def import_view(self, request):
+        if not (self.has_add_permission(request) and self.has_change_permission(request)):
+            raise PermissionDenied
+
+        form = HCPImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            upload = form.cleaned_data['file']
+            importer = HCPImporter(dry_run=form.cleaned_data['dry_run'])
+            try:
+                importer.run(read_rows(upload.file, upload.name))
+            except ImportFileError as e:
+                self.message_user(request, str(e), messages.ERROR)
+            else:
+                self.message_user(request, '{}{} HCPs created, {} updated, {} rows with errors'.format(
+                    '(dry run) ' if importer.dry_run else '',
+                    importer.created, importer.updated, len(importer.errors)))
+                for row_number, message in importer.errors[:self.max_import_errors_shown]:
+                    self.message_user(request, 'Row {}: {}'.format(row_number, message), messages.WARNING)
+                if not importer.errors:
+                    return redirect('admin:interactionscore_hcp_changelist')
+
+        return TemplateResponse(request, 'admin/interactionscore/hcp/import.html', dict(
+            self.admin_site.each_context(request),
+            opts=self.model._meta,
+            title='Import HCPs',
+            form=form,
+        ))
 
     def hcp_affiliate_groups(self, obj):
         return ", ".join([ag.name for ag in obj.affiliate_groups.all()])
 
 
+@admin.register(HCPMerge)
+class HCPMergeAdmin(admin.ModelAdmin):
+    model = HCPMerge
+    list_display = ('id', 'hcp', 'merged_hcp', 'merged_by', 'created_at')
+    readonly_fields = ('hcp', 'merged_hcp', 'merged_by', 'data', 'created_at')
+
+    def has_add_permission(self, request):
+        return False
+
+
 @admin.register(Interaction)
 class InteractionAdmin(SafeDeleteAdmin):
     model = Interaction
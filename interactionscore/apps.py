@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class InteractionscoreConfig(AppConfig):
     name = 'interactionscore'
+
+    def ready(self):
+        # connect signal receivers
+        from . import autocomplete, changes, counters, jwt_auth  # noqa: F401
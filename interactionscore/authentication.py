@@ -0,0 +1,18 @@
+"""Authentication policy of the API.
+
+API clients authenticate with JWTs only (see `jwt_auth`): the session (and
+its CSRF check) is only looked at for the browsable API and the docs, ie.
+requests negotiated to an HTML renderer, and HTTP Basic authentication
+(a password hash per request) is not enabled.
+"""
+from rest_framework.authentication import SessionAuthentication
+
+
+class BrowsableAPISessionAuthentication(SessionAuthentication):
+    """`SessionAuthentication` for requests rendered as HTML only."""
+
+    def authenticate(self, request):
+        renderer = getattr(request, 'accepted_renderer', None)
+        if renderer is None or renderer.media_type != 'text/html':
+            return None
+        return super().authenticate(request)
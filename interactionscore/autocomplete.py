@@ -0,0 +1,142 @@
+"""HCP autocomplete from an in-memory prefix index.
+
+Each process keeps the words of the HCPs' names and institution (lowercased,
+without accents) sorted, so the HCPs matching a prefix are found by bisection
+instead of `LIKE '%...%'` queries on every keystroke. The index is rebuilt
+when the version kept in the cache changes (HCPs saved, deleted or their AGs
+and TAs changed, see receivers below) or when older than
+`HCP_AUTOCOMPLETE_INDEX_MAX_AGE` (for caches not shared between processes).
+"""
+import bisect
+import heapq
+import time
+import unicodedata
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .models import HCP
+
+INDEX_VERSION_CACHE_KEY = 'hcp-autocomplete-version'
+
+
+def normalize(text):
+    """Lowercased `text` without accents (so "mul" matches "Müller")."""
+    text = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(c for c in text if not unicodedata.combining(c))
+
+
+class HCPIndex:
+
+    def __init__(self, version=None):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.hcps = {}  # id -> (id, display name, institution)
+        self.sort_keys = {}
+        self.affiliate_groups = defaultdict(set)
+        self.tas = defaultdict(set)
+        words = []
+        for hcp_id, first_name, last_name, institution in HCP.objects.values_list(
+                'id', 'first_name', 'last_name', 'institution_name'):
+            name = '{} {}'.format(first_name, last_name).strip()
+            self.hcps[hcp_id] = (hcp_id, name, institution)
+            self.sort_keys[hcp_id] = (normalize(last_name), normalize(first_name), hcp_id)
+            words.extend((word, hcp_id) for word in set(normalize(
+                ' '.join((first_name, last_name, institution))).split()))
+        words.sort()
+        self.words = [word for word, hcp_id in words]
+        self.word_hcps = [hcp_id for word, hcp_id in words]
+        for hcp_id, affiliate_group_id in HCP.affiliate_groups.through.objects.values_list(
+                'hcp_id', 'affiliategroup_id'):
+            self.affiliate_groups[hcp_id].add(affiliate_group_id)
+        for hcp_id, ta_id in HCP.tas.through.objects.values_list('hcp_id', 'therapeuticarea_id'):
+            self.tas[hcp_id].add(ta_id)
+
+    def prefix_matches(self, prefix):
+        """Ids of the HCPs with a word starting with `prefix`."""
+        start = bisect.bisect_left(self.words, prefix)
+        end = bisect.bisect_left(self.words, prefix + '\uffff', start)
+        return set(self.word_hcps[start:end])
+
+    def in_scope(self, hcp_id, affiliate_groups, tas):
+        return bool(self.affiliate_groups[hcp_id] & affiliate_groups and self.tas[hcp_id] & tas)
+
+    def search(self, query, limit, affiliate_groups=None, tas=None):
+        """(id, display name, institution) of the first `limit` HCPs (by name)
+        having a word starting with each word of `query`, and when given an
+        AG in `affiliate_groups` and a TA in `tas`.
+        """
+        hcp_ids = None
+        for prefix in normalize(query).split():
+            matches = self.prefix_matches(prefix)
+            hcp_ids = matches if hcp_ids is None else hcp_ids & matches
+            if not hcp_ids:
+                return []
+        if hcp_ids is None:
+            return []
+        if affiliate_groups is not None:
+            hcp_ids = [hcp_id for hcp_id in hcp_ids if self.in_scope(hcp_id, affiliate_groups, tas)]
+        return [self.hcps[hcp_id] for hcp_id in heapq.nsmallest(limit, hcp_ids, key=self.sort_keys.get)]
+
+
+_index = None
+
+
+def get_index_version():
+    version = cache.get(INDEX_VERSION_CACHE_KEY)
+    if version is None:
+        cache.add(INDEX_VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+        version = cache.get(INDEX_VERSION_CACHE_KEY)
+    return version
+
+
+def get_hcp_index():
+    """This process' index, rebuilt if outdated."""
+    global _index
+    version = get_index_version()
+    index = _index
+    if (index is None or index.version != version or
+            time.monotonic() - index.built_at > settings.HCP_AUTOCOMPLETE_INDEX_MAX_AGE):
+        index = _index = HCPIndex(version)
+    return index
+
+
+def autocomplete_hcps(user, query, limit):
+    """`HCPIndex.search()` restricted to the HCPs `user` can see."""
+    if user.is_staff:
+        return get_hcp_index().search(query, limit)
+    return get_hcp_index().search(query, limit,
+                                  affiliate_groups={ag.id for ag in user.affiliate_groups.all()},
+                                  tas={ta.id for ta in user.tas.all()})
+
+
+def bump_index_version():
+    cache.set(INDEX_VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+
+
+# HCP changes
+#####################################################################
+
+def hcps_changed():
+    # right away for this process, and once committed for the ones which
+    # may have rebuilt their index in the meantime without the change
+    bump_index_version()
+    transaction.on_commit(bump_index_version)
+
+
+@receiver(post_save, sender=HCP)
+@receiver(post_delete, sender=HCP)
+def hcp_changed(sender, **kwargs):
+    hcps_changed()
+
+
+@receiver(m2m_changed, sender=HCP.affiliate_groups.through)
+@receiver(m2m_changed, sender=HCP.tas.through)
+def hcp_m2m_changed(sender, action, **kwargs):
+    if action in {'post_add', 'post_remove', 'post_clear'}:
+        hcps_changed()
@@ -0,0 +1,237 @@
+"""Change notifications of engagement plans (and their items and comments).
+
+Saves and deletions are published (once committed) as lightweight events,
+`{"model", "id", "action", "engagement_plan"}`, to the broker configured by
+`settings.CHANGES_BACKEND`. Clients long-poll them (see `ChangesView`) from
+the cursor of the last events they got, and only refetch what changed instead
+of polling whole plans. Users get the events of the plans they can see.
+
+`CacheBackend` (the default) goes through the Django cache, so processes
+sharing one (eg. redis) see each other's changes: it requires a shared cache
+(memcached or redis), the `manage.py check` warns otherwise. `LocalBackend` is an
+in-process broker, for single process deployments only: each process numbers
+its own events, a cursor from one is meaningless to the others.
+"""
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from .models import (
+    AffiliateGroup,
+    Comment,
+    EngagementPlan,
+    EngagementPlanHCPItem,
+    EngagementPlanPerms,
+    EngagementPlanProjectItem,
+)
+
+
+class LocalBackend:
+    """The last `buffer_size` events kept in memory, waiting readers are
+    woken up by new ones.
+    """
+
+    def __init__(self, buffer_size=1000):
+        self.events = deque(maxlen=buffer_size)
+        self.cursor = 0
+        self.condition = threading.Condition()
+
+    def publish(self, event):
+        with self.condition:
+            self.cursor += 1
+            self.events.append((self.cursor, event))
+            self.condition.notify_all()
+
+    def read(self, cursor, timeout):
+        """`(cursor, events, missed)`: the events after `cursor` (waiting up
+        to `timeout` seconds for some), the cursor of the last one, and
+        whether some were missed (too old, or the cursor is unknown).
+        """
+        with self.condition:
+            if cursor is None:
+                return self.cursor, [], False
+            self.condition.wait_for(lambda: self.cursor != cursor, timeout)
+            if cursor > self.cursor:
+                return self.cursor, [], True
+            first = self.events[0][0] if self.events else self.cursor + 1
+            events = [event for number, event in self.events if number > cursor]
+            return self.cursor, events, cursor + 1 < first
+
+
+class CacheBackend:
+    """Events kept `timeout` seconds in the Django cache, numbered with an
+    atomic `incr()` (with memcached or redis), readers checking for new ones
+    every `poll_interval` seconds. Only the last `max_events` are read, older
+    ones are missed (like `LocalBackend`'s `buffer_size`).
+    """
+    key_prefix = 'changes'
+
+    def __init__(self, timeout=300, poll_interval=0.5, max_events=1000):
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.max_events = max_events
+
+    def get_event_key(self, number):
+        return '{}-event-{}'.format(self.key_prefix, number)
+
+    def publish(self, event):
+        cursor_key = self.key_prefix + '-cursor'
+        cache.add(cursor_key, 0, timeout=None)
+        number = cache.incr(cursor_key)
+        cache.set(self.get_event_key(number), event, self.timeout)
+
+    def read(self, cursor, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            last = cache.get(self.key_prefix + '-cursor', 0)
+            if cursor is None:
+                return last, [], False
+            if last < cursor:
+                return last, [], True
+            if last > cursor:
+                first = max(cursor + 1, last - self.max_events + 1)
+                keys = [self.get_event_key(number) for number in range(first, last + 1)]
+                found = cache.get_many(keys)
+                missed = first > cursor + 1 or len(found) < len(keys)
+                return last, [found[key] for key in keys if key in found], missed
+            if time.monotonic() >= deadline:
+                return last, [], False
+            time.sleep(min(self.poll_interval, max(deadline - time.monotonic(), 0)))
+
+
+@lru_cache()
+def get_backend():
+    backend_class = import_string(settings.CHANGES_BACKEND)
+    return backend_class(**settings.CHANGES_BACKEND_OPTIONS)
+
+
+@receiver(setting_changed)
+def reset_backend(setting, **kwargs):
+    if setting in {'CHANGES_BACKEND', 'CHANGES_BACKEND_OPTIONS'}:
+        get_backend.cache_clear()
+
+
+@checks.register()
+def check_shared_cache(app_configs, **kwargs):
+    """`CacheBackend` with a per-process cache: each process would number and
+    keep its own events, as `LocalBackend` does.
+    """
+    if (issubclass(import_string(settings.CHANGES_BACKEND), CacheBackend) and
+            isinstance(caches[DEFAULT_CACHE_ALIAS], (LocMemCache, DummyCache))):
+        return [checks.Warning(
+            'CHANGES_BACKEND uses the default cache, which is not shared between processes.',
+            hint="Configure a memcached or redis cache in CACHES, or use "
+                 "'interactionscore.changes.LocalBackend' with a single process.",
+            obj='CHANGES_BACKEND',
+            id='interactionscore.W001',
+        )]
+    return []
+
+
+# Reading
+#####################################################################
+
+def get_event_filter(user):
+    """Whether `user` can see an event, as the plans (see
+    `filters.filter_visible_engagement_plans()`).
+    """
+    if user.is_staff or user.has_interactions_perm(EngagementPlanPerms.list_all_ep):
+        return lambda event: True
+    if user.has_interactions_perm(EngagementPlanPerms.list_own_ag_ep):
+        affiliate_groups = set(user.affiliate_groups.values_list('id', flat=True))
+        return lambda event: not affiliate_groups.isdisjoint(event['affiliate_groups'])
+    return lambda event: event['user'] == user.pk
+
+
+def read_changes(user, cursor, timeout):
+    """`(cursor, events, missed)` of the changes `user` can see after `cursor`
+    (the current cursor only, when `None`), waiting up to `timeout` seconds
+    for some.
+    """
+    visible = get_event_filter(user)
+    deadline = time.monotonic() + timeout
+    while True:
+        cursor, events, missed = get_backend().read(cursor, max(deadline - time.monotonic(), 0))
+        events = [{name: event[name] for name in ('model', 'id', 'action', 'engagement_plan')}
+                  for event in events if visible(event)]
+        if events or missed or time.monotonic() >= deadline:
+            return cursor, events, missed
+
+
+# Publishing
+#####################################################################
+
+# paths from the commented rows to their plan
+COMMENT_TARGET_PLANS = {
+    'engagement_plan_hcp_item': 'engagement_plan',
+    'engagement_plan_project_item': 'engagement_plan',
+    'hcp_objective': 'engagement_plan_item__engagement_plan',
+    'project_objective': 'engagement_plan_item__engagement_plan',
+    'hcp_deliverable': 'objective__engagement_plan_item__engagement_plan',
+    'project_deliverable': 'objective__engagement_plan_item__engagement_plan',
+}
+
+
+def get_engagement_plan(instance):
+    """`(id, user id)` of the plan `instance` is about, `None` if none."""
+    if isinstance(instance, EngagementPlan):
+        return instance.pk, instance.user_id
+    if isinstance(instance, Comment) and instance.engagement_plan_id is None:
+        for name, path in COMMENT_TARGET_PLANS.items():
+            target_id = getattr(instance, name + '_id')
+            if target_id is not None:
+                target_model = Comment._meta.get_field(name).related_model
+                return target_model._base_manager.filter(pk=target_id).values_list(
+                    path, path + '__user').first()
+        return None
+    return EngagementPlan._base_manager.filter(pk=instance.engagement_plan_id).values_list(
+        'pk', 'user').first()
+
+
+def publish_change(instance, action):
+    """Publish the `action` on `instance`, once the transaction is committed."""
+    plan = get_engagement_plan(instance)
+    if plan is None:
+        return
+    plan_id, user_id = plan
+    event = {
+        'model': instance._meta.model_name,
+        'id': instance.pk,
+        'action': action,
+        'engagement_plan': plan_id,
+        # for scoping
+        'user': user_id,
+        'affiliate_groups': list(AffiliateGroup.objects.filter(users=user_id).values_list('id', flat=True)),
+    }
+    transaction.on_commit(lambda: get_backend().publish(event))
+
+
+def changed(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    if getattr(instance, 'deleted', None) is not None:
+        action = 'deleted'  # soft-deleted (or saved while deleted)
+    else:
+        action = 'created' if created else 'updated'
+    publish_change(instance, action)
+
+
+def deleted(sender, instance, **kwargs):
+    publish_change(instance, 'deleted')
+
+
+for model in (EngagementPlan, EngagementPlanHCPItem, EngagementPlanProjectItem, Comment):
+    post_save.connect(changed, sender=model)
+    post_delete.connect(deleted, sender=model)
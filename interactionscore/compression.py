@@ -0,0 +1,91 @@
+"""Compression of responses, with brotli when installed (and accepted by the
+client) else gzip, like Django's `GZipMiddleware` but:
+
+* only for compressible content types (JSON, text, CSV...), not for the
+  already compressed Resource files (PDFs, Office documents, images)
+* only above `COMPRESSION_MIN_SIZE` bytes
+* streamed responses (eg. exports) are compressed as they are streamed
+"""
+import re
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_sequence, compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_CONTENT_TYPES = (
+    'application/javascript',
+    'application/json',
+    'application/xml',
+    'image/svg+xml',
+    'text/',
+)
+re_accepts_gzip = re.compile(r'\bgzip\b')
+re_accepts_brotli = re.compile(r'\bbr\b')
+
+
+def brotli_compress_string(s):
+    return brotli.compress(s, quality=settings.COMPRESSION_BROTLI_QUALITY)
+
+
+def brotli_compress_sequence(sequence):
+    compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+    for item in sequence:
+        data = compressor.process(item)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+COMPRESSORS = {
+    'br': (brotli_compress_string, brotli_compress_sequence),
+    'gzip': (compress_string, compress_sequence),
+}
+
+
+def get_accepted_encoding(request):
+    accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    if brotli is not None and re_accepts_brotli.search(accept_encoding):
+        return 'br'
+    if re_accepts_gzip.search(accept_encoding):
+        return 'gzip'
+    return None
+
+
+class CompressionMiddleware(MiddlewareMixin):
+
+    def process_response(self, request, response):
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+        if response.has_header('Content-Encoding') or response.status_code != 200:
+            return response
+        if not response.get('Content-Type', '').startswith(COMPRESSIBLE_CONTENT_TYPES):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = get_accepted_encoding(request)
+        if encoding is None:
+            return response
+
+        compress_string, compress_sequence = COMPRESSORS[encoding]
+        if response.streaming:
+            response.streaming_content = compress_sequence(response.streaming_content)
+            del response['Content-Length']
+        else:
+            compressed_content = compress_string(response.content)
+            if len(compressed_content) >= len(response.content):
+                return response
+            response.content = compressed_content
+            response['Content-Length'] = str(len(response.content))
+
+        # compressed responses have weak ETags (RFC 7232 section-2.1)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
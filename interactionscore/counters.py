@@ -0,0 +1,200 @@
+"""Denormalized counts (of plan items, objectives, deliverables by status,
+interactions of HCPs) kept up to date by signal receivers.
+
+A row is counted in its parent while not soft-deleted (and matching the
+counter's conditions). When a counted row is saved or deleted, the counters
+of the parents it stops or starts being counted in are adjusted with one
+`F()` `UPDATE` per parent. Set based soft-deletes (of querysets, and cascading
+to the descendants of a deleted row) recount the parents of the rows they
+change, see `recount_parents()`. Other changes made without signals (queryset
+`update()`s, `bulk_create`...) are not seen: the `recount` management command
+fixes the counts.
+"""
+import operator
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import reduce
+
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+
+from .models import (
+    ArchivedInteraction,
+    EngagementPlanHCPItem,
+    EngagementPlanProjectItem,
+    HCPDeliverable,
+    HCPObjective,
+    Interaction,
+    ProjectDeliverable,
+    ProjectObjective,
+)
+
+
+class Counter:
+    """`counter_field` of the `parent_field` rows of `model` rows, counting
+    the rows not deleted which have the `conditions` values.
+    """
+
+    def __init__(self, model, parent_field, counter_field, **conditions):
+        self.model = model
+        field = model._meta.get_field(parent_field)
+        self.parent_model = field.related_model
+        self.parent_attname = field.attname
+        self.counter_field = counter_field
+        self.conditions = conditions
+
+    @property
+    def fields(self):
+        return {self.parent_attname, 'deleted'} | set(self.conditions)
+
+    def get_parent_id(self, instance):
+        """Id of the parent `instance` is counted in, `None` if not counted."""
+        if instance.deleted is not None:
+            return None
+        if any(getattr(instance, name) != value for name, value in self.conditions.items()):
+            return None
+        return getattr(instance, self.parent_attname)
+
+    def get_count_subquery(self):
+        counted = self.model._base_manager.filter(
+            deleted__isnull=True, **dict(self.conditions, **{self.parent_attname: OuterRef('pk')}))
+        counted = counted.order_by().values(self.parent_attname).annotate(count=Count('pk')).values('count')
+        return Coalesce(Subquery(counted, output_field=IntegerField()), Value(0))
+
+
+def deliverable_counters(model):
+    return [Counter(model, 'objective', 'deliverables_count')] + [
+        Counter(model, 'objective', '{}_deliverables_count'.format(status.name), status=status.name)
+        for status in model.Status
+    ]
+
+
+COUNTERS = [
+    Counter(EngagementPlanHCPItem, 'engagement_plan', 'hcp_items_count'),
+    Counter(EngagementPlanHCPItem, 'engagement_plan', 'approved_hcp_items_count', approved=True),
+    Counter(EngagementPlanProjectItem, 'engagement_plan', 'project_items_count'),
+    Counter(HCPObjective, 'engagement_plan_item', 'objectives_count'),
+    Counter(ProjectObjective, 'engagement_plan_item', 'objectives_count'),
+    Counter(Interaction, 'hcp', 'interactions_count'),
+    Counter(ArchivedInteraction, 'hcp', 'interactions_count'),
+] + deliverable_counters(HCPDeliverable) + deliverable_counters(ProjectDeliverable)
+
+MODEL_COUNTERS = defaultdict(list)
+for counter in COUNTERS:
+    MODEL_COUNTERS[counter.model].append(counter)
+
+
+# Recounting
+#####################################################################
+
+def recount(parent_model, queryset=None):
+    """Recompute the counters of the `parent_model` rows of `queryset` (all
+    of them by default) with a single `UPDATE`. Returns the number of rows.
+    """
+    sums = defaultdict(list)  # eg. live and archived interactions of HCPs
+    for counter in COUNTERS:
+        if counter.parent_model is parent_model:
+            sums[counter.counter_field].append(counter.get_count_subquery())
+    if queryset is None:
+        queryset = parent_model._base_manager.all()
+    values = {}
+    for field, subqueries in sums.items():
+        value = subqueries[0]
+        for subquery in subqueries[1:]:
+            value = value + subquery
+        values[field] = value
+    return queryset.update(**values)
+
+
+def recount_parents(model, queryset):
+    """Recompute the counters the `model` rows of `queryset` are counted in,
+    with an `UPDATE` per parent model (the parents' ids selected by subqueries).
+    """
+    parent_ids = defaultdict(list)
+    for counter in MODEL_COUNTERS.get(model, ()):
+        parent_ids[counter.parent_model].append(Q(pk__in=queryset.order_by().values(counter.parent_attname)))
+    for parent_model, conditions in parent_ids.items():
+        recount(parent_model, parent_model._base_manager.filter(reduce(operator.or_, conditions)))
+
+
+def get_parent_models():
+    return list({counter.parent_model: None for counter in COUNTERS})
+
+
+# Signals
+#####################################################################
+
+_state = threading.local()
+
+
+@contextmanager
+def paused():
+    """Don't update counters (eg. while moving rows between tables, which
+    doesn't change what they count).
+    """
+    previous = getattr(_state, 'paused', False)
+    _state.paused = True
+    try:
+        yield
+    finally:
+        _state.paused = previous
+
+
+def get_parent_ids(instance):
+    return [counter.get_parent_id(instance) for counter in MODEL_COUNTERS[instance.__class__]]
+
+
+def update_counters(model, old_parent_ids, new_parent_ids):
+    deltas = defaultdict(lambda: defaultdict(int))
+    for counter, old, new in zip(MODEL_COUNTERS[model], old_parent_ids, new_parent_ids):
+        if old == new:
+            continue
+        if old is not None:
+            deltas[counter.parent_model, old][counter.counter_field] -= 1
+        if new is not None:
+            deltas[counter.parent_model, new][counter.counter_field] += 1
+    for (parent_model, parent_id), fields in deltas.items():
+        values = {name: F(name) + delta for name, delta in fields.items() if delta}
+        if values:
+            parent_model._base_manager.filter(pk=parent_id).update(**values)
+
+
+def counted_init(sender, instance, **kwargs):
+    # what the instance is counted in when loaded (unknown if partially loaded)
+    deferred = instance.get_deferred_fields()
+    if not any(counter.fields & deferred for counter in MODEL_COUNTERS[sender]):
+        instance._counted_in = get_parent_ids(instance)
+
+
+def counted_pre_save(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding or hasattr(instance, '_counted_in'):
+        return
+    fields = set().union(*(counter.fields for counter in MODEL_COUNTERS[sender]))
+    stored = sender._base_manager.filter(pk=instance.pk).values(*fields).first()
+    if stored is not None:
+        instance._counted_in = get_parent_ids(sender(**stored))
+
+
+def counted_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old = [None] * len(MODEL_COUNTERS[sender]) if created else getattr(instance, '_counted_in', None)
+    new = get_parent_ids(instance)
+    if old is not None and not getattr(_state, 'paused', False):
+        update_counters(sender, old, new)
+    instance._counted_in = new
+
+
+def counted_deleted(sender, instance, **kwargs):
+    old = getattr(instance, '_counted_in', None)
+    if old is not None and not getattr(_state, 'paused', False):
+        update_counters(sender, old, [None] * len(old))
+
+
+for model in MODEL_COUNTERS:
+    post_init.connect(counted_init, sender=model)
+    pre_save.connect(counted_pre_save, sender=model)
+    post_save.connect(counted_saved, sender=model)
+    post_delete.connect(counted_deleted, sender=model)
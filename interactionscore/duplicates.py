@@ -0,0 +1,158 @@
+"""Detection of HCPs entered more than once (with spelling variations).
+
+Comparing every pair of HCPs doesn't scale, so HCPs are first grouped by
+blocking keys (see `blocking_keys()`): only HCPs sharing a key are compared,
+by the similarity of their (normalized) names and institutions.
+"""
+import difflib
+import itertools
+from collections import defaultdict, namedtuple
+
+from django.conf import settings
+from django.db.models import Q
+
+from .autocomplete import normalize
+from .models import HCP
+
+HCP_FIELDS = ('id', 'first_name', 'last_name', 'email', 'institution_name', 'city')
+
+SOUNDEX_CODES = {letter: str(code) for code, letters in enumerate(
+    ('aeiouyhw', 'bfpv', 'cgjkqsxz', 'dt', 'l', 'mn', 'r')) for letter in letters}
+
+
+def soundex(name):
+    """Soundex code of `name` (eg. 'R163' for both "Robert" and "Rupert")."""
+    letters = [c for c in normalize(name) if c in SOUNDEX_CODES]
+    if not letters:
+        return ''
+    code = letters[0].upper()
+    previous = SOUNDEX_CODES[letters[0]]
+    for letter in letters[1:]:
+        digit = SOUNDEX_CODES[letter]
+        if digit != '0' and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        if letter not in 'hw':  # consonants separated by h or w are coded once
+            previous = digit
+    return code.ljust(4, '0')
+
+
+class HCPRecord(namedtuple('HCPRecord', 'id name institution email email_domain city last_code first_code')):
+    """Normalized values of an HCP, computed once per HCP."""
+
+    @classmethod
+    def from_values(cls, id, first_name, last_name, email, institution_name, city):
+        email = email.strip().lower()
+        return cls(
+            id=id,
+            # sorted words: swapped first and last names still match
+            name=' '.join(sorted(normalize('{} {}'.format(first_name, last_name)).split())),
+            institution=' '.join(normalize(institution_name).split()),
+            email=email,
+            email_domain=email.rpartition('@')[2],
+            city=' '.join(normalize(city).split()),
+            last_code=soundex(last_name),
+            first_code=soundex(first_name),
+        )
+
+
+def blocking_keys(record):
+    """Keys of the blocks `record` is compared within."""
+    keys = []
+    if record.last_code:
+        keys.append(('name', record.last_code, record.first_code))
+        if record.email_domain:
+            keys.append(('email_domain', record.email_domain, record.last_code))
+        if record.city:
+            keys.append(('city', record.city, record.last_code))
+    if record.email:
+        keys.append(('email', record.email))
+    return keys
+
+
+def score(a, b, threshold=0.0):
+    """Likelihood (0 to 1) of `a` and `b` being the same HCP, or 0 when
+    it's certainly below `threshold` (known without the costly comparisons).
+    """
+    if a.email and a.email == b.email:
+        return 1.0
+    if not a.name or not b.name:
+        return 0.0
+    if a.institution and b.institution:
+        name_weight, institution_weight = 0.7, 0.3
+    else:
+        name_weight, institution_weight = 0.9, 0.0  # less sure without institutions
+    name = difflib.SequenceMatcher(None, a.name, b.name)
+    # upper bounds of the name similarity, from its lengths then its letters
+    for upper_bound in (name.real_quick_ratio, name.quick_ratio):
+        if name_weight * upper_bound() + institution_weight < threshold:
+            return 0.0
+    total = name_weight * name.ratio()
+    if institution_weight:
+        total += institution_weight * difflib.SequenceMatcher(None, a.institution, b.institution).ratio()
+    return total
+
+
+def get_records(queryset):
+    return [HCPRecord.from_values(*values) for values in queryset.values_list(*HCP_FIELDS).iterator()]
+
+
+def find_duplicates(queryset=None, threshold=None):
+    """`(score, id, other_id)` of the pairs of HCPs of `queryset` (all by
+    default) scoring at least `threshold`, best first.
+    """
+    if queryset is None:
+        queryset = HCP.objects.all()
+    if threshold is None:
+        threshold = settings.HCP_DUPLICATE_THRESHOLD
+    blocks = defaultdict(list)
+    for record in get_records(queryset):
+        for key in blocking_keys(record):
+            blocks[key].append(record)
+
+    scored = set()
+    duplicates = []
+    for records in blocks.values():
+        # blocks of very common keys (eg. a big hospital domain) would bring
+        # back the quadratic comparisons, other keys of their HCPs remain
+        if len(records) > settings.HCP_DUPLICATE_MAX_BLOCK_SIZE:
+            continue
+        for a, b in itertools.combinations(records, 2):
+            pair = (a.id, b.id) if a.id < b.id else (b.id, a.id)
+            if pair in scored:
+                continue
+            scored.add(pair)
+            pair_score = score(a, b, threshold)
+            if pair_score >= threshold:
+                duplicates.append((pair_score,) + pair)
+    duplicates.sort(key=lambda d: (-d[0], d[1], d[2]))
+    return duplicates
+
+
+def find_duplicates_of(hcp, queryset=None, threshold=None):
+    """`(score, id)` of the HCPs of `queryset` (all by default) looking like
+    `hcp`, best first.
+    """
+    if queryset is None:
+        queryset = HCP.objects.all()
+    if threshold is None:
+        threshold = settings.HCP_DUPLICATE_THRESHOLD
+    record = HCPRecord.from_values(*(getattr(hcp, name) for name in HCP_FIELDS))
+    keys = set(blocking_keys(record))
+    if not keys:
+        return []
+    # all blocking keys but the email one start with the last name's initial
+    # (its first letter without accents): candidates start with it, or with
+    # another character (accented letter, punctuation as in "'t Hooft"...)
+    candidates = Q(email__iexact=record.email) if record.email else Q()
+    if record.last_code:
+        candidates |= Q(last_name__istartswith=record.last_code[0]) | Q(last_name__iregex=r'^[^a-z]')
+    duplicates = []
+    for other in get_records(queryset.filter(candidates).exclude(id=hcp.id)):
+        if keys.intersection(blocking_keys(other)):
+            other_score = score(record, other, threshold)
+            if other_score >= threshold:
+                duplicates.append((other_score, other.id))
+    duplicates.sort(key=lambda d: (-d[0], d[1]))
+    return duplicates
@@ -0,0 +1,459 @@
+"""Declarative filtering of the viewsets on their query parameters.
+
+A viewset's `filterset_class` declares its query parameters as `Filter`
+attributes. `FilterSetBackend` first validates all of them (answering with a
+400 listing the errors by parameter), then compiles them into the queryset
+with subqueries (no joins to make `distinct()`, no extra queries).
+"""
+import operator
+from collections import OrderedDict
+from functools import reduce
+
+import coreapi
+import coreschema
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from .models import (
+    AffiliateGroup,
+    Comment,
+    Deliverable,
+    EngagementPlan,
+    EngagementPlanHCPItem,
+    EngagementPlanPerms,
+    EngagementPlanProjectItem,
+    HCP,
+    HCPDeliverable,
+    HCPObjective,
+    Project,
+    ProjectDeliverable,
+    ProjectObjective,
+    QuarterType,
+    TherapeuticArea,
+)
+from .scopes import filter_in, filter_m2m
+
+CURRENT = 'current'
+
+
+class Filter:
+    """Query parameter filtering on `<field>__<lookup>=<value>`, or with the
+    filterset's `method(queryset, value)`.
+    """
+    schema_class = coreschema.String
+
+    def __init__(self, field=None, lookup='exact', method=None, description=''):
+        self.field = field
+        self.lookup = lookup
+        self.method = method
+        self.description = description
+
+    def parse(self, value):
+        """Python value of the query parameter, raises `ValueError` when invalid."""
+        return value
+
+    def filter(self, filterset, queryset, value):
+        if self.method is not None:
+            return getattr(filterset, self.method)(queryset, value)
+        return queryset.filter(**{'{}__{}'.format(self.field, self.lookup): value})
+
+
+class CharFilter(Filter):
+    pass
+
+
+class IntegerFilter(Filter):
+    """Integer (eg. an id), or one of the `keywords` (like 'current')."""
+    schema_class = coreschema.Integer
+
+    def __init__(self, *args, keywords=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.keywords = keywords
+
+    def parse(self, value):
+        if value in self.keywords:
+            return value
+        if not value.isdigit():
+            raise ValueError('A valid integer is required.')
+        return int(value)
+
+
+class IntegerListFilter(Filter):
+    """Comma separated integers (eg. ids), filtering with `filter_in()`."""
+
+    def parse(self, value):
+        try:
+            return [int(item) for item in value.split(',') if item]
+        except ValueError:
+            raise ValueError('A comma separated list of integers is required.')
+
+    def filter(self, filterset, queryset, value):
+        if self.method is not None:
+            return super().filter(filterset, queryset, value)
+        return filter_in(queryset, self.field, value)
+
+
+class BooleanFilter(Filter):
+    schema_class = coreschema.Boolean
+    values = {'true': True, 'false': False}
+
+    def parse(self, value):
+        if value not in self.values:
+            raise ValueError('"true" or "false" is required.')
+        return self.values[value]
+
+
+class ChoiceFilter(Filter):
+
+    def __init__(self, *args, choices=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.choices = [choice for choice, label in choices]
+
+    def parse(self, value):
+        if value not in self.choices:
+            raise ValueError('"{}" is not a valid choice.'.format(value))
+        return value
+
+
+class ChoiceListFilter(ChoiceFilter):
+    """Comma separated choices, filtering with `filter_in()`."""
+
+    def parse(self, value):
+        values = [item for item in value.split(',') if item]
+        for item in values:
+            super().parse(item)
+        return values
+
+    def filter(self, filterset, queryset, value):
+        if self.method is not None:
+            return super().filter(filterset, queryset, value)
+        return filter_in(queryset, self.field, value)
+
+
+class FilterSet:
+    """Filters of a viewset's queryset, declared as `Filter` attributes named
+    like their query parameters (empty ones are ignored).
+    """
+
+    def __init__(self, request, view):
+        self.request = request
+        self.view = view
+
+    @classmethod
+    def get_filters(cls):
+        filters = OrderedDict()
+        for klass in reversed(cls.__mro__):
+            for name, value in vars(klass).items():
+                if isinstance(value, Filter):
+                    filters[name] = value
+        return filters
+
+    def get_data(self):
+        """Parsed query parameters, raises a `ValidationError` when invalid."""
+        data, errors = OrderedDict(), {}
+        for name, filter in self.get_filters().items():
+            value = self.request.query_params.get(name, None)
+            if not value:
+                continue
+            try:
+                data[name] = filter.parse(value)
+            except ValueError as e:
+                errors[name] = [str(e)]
+        if errors:
+            raise ValidationError(errors)
+        self.validate(data)
+        return data
+
+    def validate(self, data):
+        """Validation of parameters combinations, raises a `ValidationError`."""
+
+    def filter_queryset(self, queryset):
+        data = self.get_data()
+        filters = self.get_filters()
+        for name, value in data.items():
+            queryset = filters[name].filter(self, queryset, value)
+        return self.filter_scope(queryset, data)
+
+    def filter_scope(self, queryset, data):
+        """Filtering of what the user can see (depending on `data`)."""
+        return queryset
+
+
+class FilterSetBackend(BaseFilterBackend):
+    """Filters with the view's `filterset_class`, when it has one."""
+
+    def filter_queryset(self, request, queryset, view):
+        filterset_class = getattr(view, 'filterset_class', None)
+        if filterset_class is None:
+            return queryset
+        return filterset_class(request, view).filter_queryset(queryset)
+
+    def get_schema_fields(self, view):
+        filterset_class = getattr(view, 'filterset_class', None)
+        if filterset_class is None:
+            return []
+        return [
+            coreapi.Field(name=name, required=False, location='query',
+                          schema=filter.schema_class(description=filter.description))
+            for name, filter in filterset_class.get_filters().items()
+        ]
+
+
+def get_user_tas(user_id):
+    return TherapeuticArea.objects.filter(users=user_id)
+
+
+def get_user_affiliate_groups(user_id):
+    return AffiliateGroup.objects.filter(users=user_id)
+
+
+def filter_visible_engagement_plans(queryset, user):
+    """The engagement plans of `queryset` that `user` can see."""
+    # staff users and those with list_all_ep perm can see all
+    if user.is_staff or user.has_interactions_perm(EngagementPlanPerms.list_all_ep):
+        return queryset
+    # list_own_ag_ep perm allows listing EPs from same AG as user
+    if user.has_interactions_perm(EngagementPlanPerms.list_own_ag_ep):
+        return queryset.filter(user__affiliate_groups__in=user.affiliate_groups.all())
+    # by default a user only has access to his own EPs
+    return queryset.filter(user=user)
+
+
+def get_plans_comments_condition(plans):
+    """`Q` of the comments on the `plans` (a queryset) or on any of their
+    items, objectives and deliverables: a subquery per (indexed) target foreign
+    key, OR'ed.
+    """
+    targets = {
+        'engagement_plan': plans,
+        'engagement_plan_hcp_item': EngagementPlanHCPItem.objects.filter(engagement_plan__in=plans),
+        'engagement_plan_project_item': EngagementPlanProjectItem.objects.filter(engagement_plan__in=plans),
+        'hcp_objective': HCPObjective.objects.filter(engagement_plan_item__engagement_plan__in=plans),
+        'project_objective': ProjectObjective.objects.filter(engagement_plan_item__engagement_plan__in=plans),
+        'hcp_deliverable': HCPDeliverable.objects.filter(
+            objective__engagement_plan_item__engagement_plan__in=plans),
+        'project_deliverable': ProjectDeliverable.objects.filter(
+            objective__engagement_plan_item__engagement_plan__in=plans),
+    }
+    # as subqueries, deleted rows must be excluded explicitly
+    return reduce(operator.or_, (
+        Q(**{name + '__in': targets[name].filter(deleted__isnull=True).values('pk')})
+        for name in Comment.TARGET_FIELDS
+    ))
+
+
+# Filtersets
+#####################################################################
+
+class UserScopeFilterSet(FilterSet):
+    """Non-staff users see the rows of their TAs and AGs (unless filtering
+    on other ones, or they have none).
+    """
+    tas = IntegerListFilter('tas', description='ids of TAs')
+    affiliate_groups = IntegerListFilter('affiliate_groups', description='ids of affiliate groups')
+
+    def filter_scope(self, queryset, data):
+        user = self.request.user
+        if user.is_staff:
+            return queryset
+        user_tas = user.tas.all()
+        if 'tas' not in data and user_tas:
+            queryset = filter_m2m(queryset, tas=user_tas)
+        user_affiliate_groups = user.affiliate_groups.all()
+        if 'affiliate_groups' not in data and user_affiliate_groups:
+            queryset = filter_m2m(queryset, affiliate_groups=user_affiliate_groups)
+        return queryset
+
+
+class TAObjectiveFilterSet(FilterSet):
+    """For BrandCriticalSuccessFactors and MedicalPlanObjectives."""
+    ta = IntegerFilter('ta_id', description='id of a TA')
+    affiliate_groups = IntegerListFilter('affiliate_groups', description='ids of affiliate groups')
+
+    def filter_scope(self, queryset, data):
+        user = self.request.user
+        if user.is_staff:
+            return queryset
+        if 'ta' not in data:
+            queryset = filter_in(queryset, 'ta', user.tas.all())
+        user_affiliate_groups = user.affiliate_groups.all()
+        if 'affiliate_groups' not in data and user_affiliate_groups:
+            queryset = filter_m2m(queryset, affiliate_groups=user_affiliate_groups)
+        return queryset
+
+
+class ProjectFilterSet(UserScopeFilterSet):
+    user = IntegerFilter('user_id', description='id of the user the projects belong to')
+    type = ChoiceFilter('type', choices=Project.Type.choices())
+    search = CharFilter(method='filter_search', description='words in the title')
+
+    def filter_search(self, queryset, value):
+        return Project.add_full_text_search_to_query(queryset, value)
+
+
+class ResourceFilterSet(UserScopeFilterSet):
+    user = IntegerFilter(method='filter_user', description='id of a user with TAs or AGs in common')
+
+    def filter_user(self, queryset, value):
+        return filter_m2m(queryset, tas=get_user_tas(value),
+                          affiliate_groups=get_user_affiliate_groups(value))
+
+
+class HCPFilterSet(FilterSet):
+    user = IntegerFilter(description='id of a user with TAs or AGs in common, '
+                                     'or whose engagement plan is given')
+    engagement_plan = IntegerFilter(keywords=(CURRENT,), description='id or "current"')
+    search = CharFilter(method='filter_search', description='words in the names, institution or location')
+
+    def validate(self, data):
+        if data.get('engagement_plan') == CURRENT and 'user' not in data:
+            raise ValidationError({'user': ['Required with engagement_plan=current.']})
+
+    def filter_queryset(self, queryset):
+        data = self.get_data()
+        user_id = data.get('user')
+        engagement_plan = data.get('engagement_plan')
+        if engagement_plan is not None:
+            # HCPs of the EP (asserting it belongs to the user when given),
+            # a subquery: safedelete doesn't hide the deleted rows in it
+            items = EngagementPlanHCPItem.objects.filter(deleted__isnull=True,
+                                                         engagement_plan__deleted__isnull=True)
+            if engagement_plan == CURRENT:
+                items = items.filter(engagement_plan__year=timezone.now().year)
+            else:
+                items = items.filter(engagement_plan_id=engagement_plan)
+            if user_id is not None:
+                items = items.filter(engagement_plan__user_id=user_id)
+            queryset = queryset.filter(id__in=items.values('hcp_id'))
+        elif user_id is not None:
+            queryset = filter_m2m(queryset, tas=get_user_tas(user_id),
+                                  affiliate_groups=get_user_affiliate_groups(user_id))
+        if 'search' in data:
+            queryset = self.filter_search(queryset, data['search'])
+        return self.filter_scope(queryset, data)
+
+    def filter_search(self, queryset, value):
+        return HCP.add_full_text_search_to_query(queryset, value)
+
+    def filter_scope(self, queryset, data):
+        user = self.request.user
+        if user.is_staff:
+            return queryset
+        queryset = filter_m2m(queryset, affiliate_groups=user.affiliate_groups.all())
+        return filter_m2m(queryset, tas=user.tas.all())
+
+
+class HCPObjectiveFilterSet(FilterSet):
+    user = IntegerFilter(description='id of the user whose engagement plan is given '
+                                     '(the current one by default)')
+    hcp = IntegerFilter('hcp_id', description='id of an HCP')
+    engagement_plan = IntegerFilter(keywords=(CURRENT,), description='id or "current"')
+
+    def filter_queryset(self, queryset):
+        data = self.get_data()
+        user_id = data.get('user')
+        engagement_plan = data.get('engagement_plan')
+        if user_id is not None and engagement_plan is None:
+            engagement_plan = CURRENT
+        if 'hcp' in data:
+            queryset = queryset.filter(hcp_id=data['hcp'])
+
+        if engagement_plan is None:
+            return queryset
+        plans = EngagementPlan.objects.filter(deleted__isnull=True)  # a subquery, see HCPFilterSet
+        if engagement_plan == CURRENT:
+            plans = plans.filter(year=timezone.now().year)
+        else:
+            plans = plans.filter(id=engagement_plan)
+        if user_id is not None:
+            plans = plans.filter(user_id=user_id)
+        # objectives of the approved HCPs of the EP(s)
+        return queryset.filter(
+            engagement_plan_item__approved=True,
+            engagement_plan_item__deleted__isnull=True,
+            engagement_plan_item__engagement_plan_id__in=plans.values('id'),
+        )
+
+
+class EngagementPlanFilterSet(FilterSet):
+    approved = BooleanFilter('approved')
+
+
+class DeliverableFilterSet(FilterSet):
+    """For HCP and project deliverables, of the engagement plans the user can
+    see, eg. `engagement_plan=current&quarter_type=current&status=slightly_behind,major_issue`
+    for the current quarter ones at risk.
+    """
+    user = IntegerFilter(description='id of the user whose engagement plans are given')
+    engagement_plan = IntegerFilter(keywords=(CURRENT,), description='id or "current" (of this year)')
+    objective = IntegerFilter('objective_id', description='id of an objective')
+    quarter = IntegerFilter('quarter', description='1 to 4')
+    quarter_type = ChoiceFilter(method='filter_quarter_type', choices=QuarterType.choices(),
+                                description='"past", "current" or "future" quarters')
+    status = ChoiceListFilter('status', choices=Deliverable.Status.choices(),
+                              description='comma separated statuses')
+
+    def filter_quarter_type(self, queryset, value):
+        return queryset.filter_quarter_type(value)
+
+    def filter_queryset(self, queryset):
+        data = self.get_data()
+        filters = self.get_filters()
+        for name in ('objective', 'quarter', 'quarter_type', 'status'):
+            if name in data:
+                queryset = filters[name].filter(self, queryset, data[name])
+        return self.filter_scope(queryset, data)
+
+    def filter_scope(self, queryset, data):
+        # as a subquery, deleted plans must be excluded explicitly
+        plans = filter_visible_engagement_plans(EngagementPlan.objects.filter(deleted__isnull=True),
+                                                self.request.user)
+        if data.get('engagement_plan') == CURRENT:
+            plans = plans.filter(year=timezone.now().year)
+        elif 'engagement_plan' in data:
+            plans = plans.filter(id=data['engagement_plan'])
+        if 'user' in data:
+            plans = plans.filter(user_id=data['user'])
+        return queryset.filter(objective__engagement_plan_item__engagement_plan_id__in=plans.values('id'))
+
+
+class CommentFilterSet(FilterSet):
+    """Comments of the engagement plans the user can see, eg. `engagement_plan=<id>`
+    for the ones on a plan and everything in it, `hcp_objective=<id>` for the ones
+    on an objective.
+    """
+    engagement_plan = IntegerFilter(description='id of an engagement plan (comments on it, its items, '
+                                                'objectives and deliverables)')
+    engagement_plan_hcp_item = IntegerFilter('engagement_plan_hcp_item_id', description='id of an HCP item')
+    engagement_plan_project_item = IntegerFilter('engagement_plan_project_item_id',
+                                                 description='id of a project item')
+    hcp_objective = IntegerFilter('hcp_objective_id', description='id of an HCP objective')
+    project_objective = IntegerFilter('project_objective_id', description='id of a project objective')
+    hcp_deliverable = IntegerFilter('hcp_deliverable_id', description='id of an HCP deliverable')
+    project_deliverable = IntegerFilter('project_deliverable_id', description='id of a project deliverable')
+    target = ChoiceFilter(method='filter_target', choices=[(name, name) for name in Comment.TARGET_FIELDS],
+                          description='kind of the commented rows, eg. "engagement_plan" for the comments '
+                                      'on the plans themselves')
+    user = IntegerFilter('user_id', description='id of the author')
+
+    def filter_target(self, queryset, value):
+        return queryset.filter(**{value + '__isnull': False})
+
+    def filter_queryset(self, queryset):
+        data = self.get_data()
+        filters = self.get_filters()
+        for name, value in data.items():
+            if name != 'engagement_plan':
+                queryset = filters[name].filter(self, queryset, value)
+        return self.filter_scope(queryset, data)
+
+    def filter_scope(self, queryset, data):
+        user = self.request.user
+        if 'engagement_plan' not in data and user.is_staff:
+            return queryset  # including the comments on nothing
+        plans = filter_visible_engagement_plans(EngagementPlan.objects.filter(deleted__isnull=True), user)
+        if 'engagement_plan' in data:
+            plans = plans.filter(id=data['engagement_plan'])
+        return queryset.filter(get_plans_comments_condition(plans))
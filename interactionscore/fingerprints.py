@@ -0,0 +1,142 @@
+"""Cheap fingerprints of list responses, used as their ETags and to validate
+their cached content.
+
+A fingerprint is the count and latest `updated_at` (and `deleted`) of the
+listed rows and of the related rows they are serialized with, so it changes
+whenever these are saved, added or (soft) deleted, without serializing them.
+Changes made without saving the listed or related rows (eg. queryset
+`update()`s) are not seen.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, quote_etag
+from rest_framework.response import Response
+from rest_framework.serializers import BaseSerializer, ListSerializer
+
+FINGERPRINT_FIELDS = ('updated_at', 'deleted')
+
+
+def get_path_model(model, path):
+    for name in path.split('__'):
+        model = model._meta.get_field(name).related_model
+    return model
+
+
+def get_serializer_related(serializer_class):
+    """Lookups of the related models nested in the output of
+    `serializer_class`, as `fingerprint_related`.
+    """
+    related = []
+    for field in serializer_class().fields.values():
+        serializer = field.child if isinstance(field, ListSerializer) else field
+        if isinstance(serializer, BaseSerializer) and field.source != '*':
+            path = field.source.replace('.', '__')
+            related.append(path)
+            related.extend(path + '__' + lookup for lookup in get_serializer_related(type(serializer)))
+    return tuple(related)
+
+
+def get_queryset_fingerprint(queryset, related=()):
+    """Count and latest timestamps of `queryset` and of its `related` lookups,
+    queried with one aggregate query each.
+    """
+    model = queryset.model
+    pks = queryset.order_by().values('pk')
+    fingerprint = []
+    for path in ('',) + tuple(related):
+        prefix = path + '__' if path else ''
+        path_model = get_path_model(model, path) if path else model
+        aggregates = {'count': Count(prefix + 'pk', distinct=True)}
+        for field in FINGERPRINT_FIELDS:
+            if any(f.name == field for f in path_model._meta.concrete_fields):
+                aggregates[field] = Max(prefix + field)
+        result = model._base_manager.filter(pk__in=pks).aggregate(**aggregates)
+        fingerprint.append(tuple(sorted(result.items())))
+    return fingerprint
+
+
+class FingerprintETagMixin:
+    """List action answering with ETags made from the listed queryset's
+    fingerprint (and 304s to `If-None-Match` requests with an unchanged one)
+    before the serialization of the list.
+
+    `fingerprint_related` are the lookups of the related models (ie. their
+    tables) included in the serialized objects.
+
+    With `cache_list_responses`, rendered JSON lists are also cached, shared
+    by the users of the same scope (see `get_list_cache_scope()`), and served
+    as long as their fingerprint is unchanged.
+    """
+    fingerprint_related = ()
+    cache_list_responses = False
+
+    def get_list_etag(self, fingerprint):
+        user = self.request.user
+        parts = (
+            self.request.get_full_path(),
+            user.pk,
+            getattr(user, 'scope_version', None),
+            # some fields depend on it (like deliverables' quarter_type)
+            timezone.now().date(),
+            fingerprint,
+        )
+        return quote_etag(hashlib.md5(repr(parts).encode()).hexdigest())
+
+    def get_list_cache_scope(self):
+        """What the listed queryset depends on besides the query parameters."""
+        user = self.request.user
+        return (
+            user.is_staff,
+            sorted(ag.id for ag in user.affiliate_groups.all()),
+            sorted(ta.id for ta in user.tas.all()),
+        )
+
+    def get_list_cache_key(self):
+        parts = (
+            self.request.path,
+            sorted(self.request.query_params.lists()),
+            self.request.accepted_media_type,
+            self.get_list_cache_scope(),
+        )
+        return 'list-response-{}'.format(hashlib.md5(repr(parts).encode()).hexdigest())
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        fingerprint = get_queryset_fingerprint(queryset, self.fingerprint_related)
+        etag = self.get_list_etag(fingerprint)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            # not the browsable API, it shows user specific content
+            if self.cache_list_responses and request.accepted_renderer.format == 'json':
+                response = self.get_cached_list_response(queryset, fingerprint)
+            else:
+                response = self.list_queryset(queryset)
+        response['ETag'] = etag
+        return response
+
+    def get_cached_list_response(self, queryset, fingerprint):
+        key = self.get_list_cache_key()
+        cached = cache.get(key)
+        if cached is not None and cached[0] == fingerprint:
+            return HttpResponse(cached[1], content_type=cached[2])
+
+        def cache_response(response):
+            cache.set(key, (fingerprint, response.content, response['Content-Type']),
+                      settings.LIST_RESPONSE_CACHE_TIMEOUT)
+
+        response = self.list_queryset(queryset)
+        response.add_post_render_callback(cache_response)
+        return response
+
+    def list_queryset(self, queryset):
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
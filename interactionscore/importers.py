@@ -0,0 +1,355 @@
+import csv
+import io
+import itertools
+import os
+import re
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import connection, transaction
+from django.utils import timezone
+
+from interactions.helpers import chunked, bulk_update
+from .autocomplete import hcps_changed
+from .models import HCP, AffiliateGroup, TherapeuticArea
+
+
+# between the affiliate groups and therapeutic areas names of a cell, names
+# may contain the CSV delimiters
+NAMES_SEPARATOR = '|'
+
+
+class ImportFileError(Exception):
+    pass
+
+
+# Reading
+#####################################################################
+
+def read_rows(f, filename):
+    """Yield `(row_number, {column: value})` from a CSV or XLSX file object
+    opened in binary mode, one row at a time.
+    """
+    ext = os.path.splitext(filename)[1].lower()
+    if ext in ('.xlsx', '.xlsm'):
+        rows = _read_xlsx_rows(f)
+    elif ext in ('.csv', '.txt', ''):
+        rows = _read_csv_rows(f)
+    else:
+        raise ImportFileError('Unsupported file type: {}'.format(ext))
+
+    header = next(rows, None)
+    if not header:
+        raise ImportFileError('File is empty')
+    columns = [normalize_column_name(name) for name in header]
+
+    for row_number, values in enumerate(rows, 2):
+        if not any(v not in (None, '') for v in values):
+            continue  # skip blank lines
+        yield row_number, dict(zip(columns, values))
+
+
+def _read_csv_rows(f):
+    text = io.TextIOWrapper(f, encoding='utf-8-sig', newline='')
+    first_line = text.readline()
+    # CRM exports come with ',' or ';' (or tabs) depending on locale
+    delimiter = max((',', ';', '\t'), key=first_line.count)
+    return csv.reader(itertools.chain([first_line], text), delimiter=delimiter)
+
+
+def _read_xlsx_rows(f):
+    try:
+        import openpyxl
+    except ImportError:
+        raise ImportFileError('XLSX import requires openpyxl to be installed')
+    # read_only mode streams rows instead of loading the whole sheet
+    workbook = openpyxl.load_workbook(f, read_only=True, data_only=True)
+    sheet = workbook.worksheets[0]
+    return (tuple(cell.value for cell in row) for row in sheet.iter_rows())
+
+
+COLUMN_ALIASES = {
+    'firstname': 'first_name',
+    'given_name': 'first_name',
+    'lastname': 'last_name',
+    'surname': 'last_name',
+    'family_name': 'last_name',
+    'e_mail': 'email',
+    'email_address': 'email',
+    'institution': 'institution_name',
+    'institution_name': 'institution_name',
+    'address': 'institution_address',
+    'affiliate_group': 'affiliate_groups',
+    'ags': 'affiliate_groups',
+    'ta': 'tas',
+    'therapeutic_area': 'tas',
+    'therapeutic_areas': 'tas',
+    'consent': 'has_consented',
+    'consented': 'has_consented',
+}
+
+
+def normalize_column_name(name):
+    name = re.sub(r'[^a-z0-9]+', '_', str(name or '').strip().lower()).strip('_')
+    return COLUMN_ALIASES.get(name, name)
+
+
+# Importing
+#####################################################################
+
+class HCPImporter:
+    """Create or update HCPs from rows of a CRM export.
+
+    Existing HCPs are matched by email, or by first name + last name +
+    institution when the row has no email, against an index built with a
+    single query. New HCPs are inserted with `bulk_create`, matched ones
+    updated with one `UPDATE` per batch, and affiliate groups / TAs (looked
+    up by name) are added with bulk inserts into the M2M tables.
+
+    Row problems don't stop the import, they are collected in `errors` as
+    `(row_number, message)`.
+    """
+
+    FIELDS = (
+        'first_name',
+        'last_name',
+        'email',
+        'phone',
+        'contact_person_first_name',
+        'contact_person_last_name',
+        'contact_person_email',
+        'contact_person_phone',
+        'time_availability',
+        'institution_name',
+        'institution_address',
+        'contact_preference',
+        'has_consented',
+        'city',
+        'country',
+    )
+    TRUE_VALUES = {'1', 'y', 'yes', 'true', 't', 'x'}
+    FALSE_VALUES = {'', '0', 'n', 'no', 'false', 'f'}
+
+    def __init__(self, batch_size=1000, dry_run=False):
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        # stand-in ids of the HCPs a dry run would create, so that later
+        # batches match them as a real run would
+        self._dry_run_ids = itertools.count(-1, -1)
+        self.created = 0
+        self.updated = 0
+        self.errors = []
+
+    def run(self, rows):
+        self._build_indexes()
+        for batch in chunked(rows, self.batch_size):
+            with transaction.atomic():
+                self._import_batch(batch)
+        return self
+
+    # Indexes
+    #################################################
+
+    def _build_indexes(self):
+        self.hcp_index = {}
+        hcps = HCP.objects.values_list('id', 'email', 'first_name', 'last_name', 'institution_name')
+        for hcp_id, email, first_name, last_name, institution_name in hcps.iterator():
+            for key in self._index_keys(email, first_name, last_name, institution_name):
+                self.hcp_index.setdefault(key, hcp_id)
+
+        self.affiliate_groups_by_name = {
+            name.lower(): ag_id for ag_id, name in AffiliateGroup.objects.values_list('id', 'name')}
+        self.tas_by_name = {
+            name.lower(): ta_id for ta_id, name in TherapeuticArea.objects.values_list('id', 'name')}
+
+    @staticmethod
+    def _index_keys(email, first_name, last_name, institution_name):
+        """Keys an HCP can be matched by."""
+        keys = []
+        if email:
+            keys.append(('email', email.lower()))
+        if first_name or last_name:
+            keys.append(('name', first_name.lower(), last_name.lower(), institution_name.lower()))
+        return keys
+
+    @classmethod
+    def _match_keys(cls, email, first_name, last_name, institution_name):
+        """Key a row is matched by: its email, or its name when it has none."""
+        return cls._index_keys(email, first_name, last_name, institution_name)[:1]
+
+    # Rows
+    #################################################
+
+    def _import_batch(self, batch):
+        to_create = {}  # match key -> unsaved HCP
+        to_update = {}  # id -> HCP
+        updated_fields = {}  # id -> names of fields present in the rows
+        m2m = []  # (HCP, affiliate group ids, ta ids)
+
+        for row_number, row in batch:
+            try:
+                data, ag_ids, ta_ids = self.clean_row(row)
+            except ValidationError as e:
+                self.errors.append((row_number, '; '.join(e.messages)))
+                continue
+
+            values = (data.get('email', ''), data.get('first_name', ''),
+                      data.get('last_name', ''), data.get('institution_name', ''))
+            keys = self._match_keys(*values)
+            hcp_id = next((self.hcp_index[k] for k in keys if k in self.hcp_index), None)
+            pending = next((to_create[k] for k in keys if k in to_create), None)
+            if not data.get('email'):
+                data.pop('email', None)  # matched by name, don't blank its email
+
+            if hcp_id is not None:
+                hcp = to_update.get(hcp_id) or HCP(id=hcp_id)
+                to_update[hcp_id] = hcp
+                updated_fields.setdefault(hcp_id, set()).update(data)
+            elif pending is not None:
+                hcp = pending
+            else:
+                hcp = HCP()
+                for k in self._index_keys(*values):
+                    to_create.setdefault(k, hcp)
+            for name, value in data.items():
+                setattr(hcp, name, value)
+            m2m.append((hcp, ag_ids, ta_ids))
+
+        new_hcps = list({id(hcp): hcp for hcp in to_create.values()}.values())
+        if self.dry_run:
+            for hcp in new_hcps:
+                hcp.id = next(self._dry_run_ids)
+        else:
+            self._create(new_hcps)
+        for hcp in new_hcps:
+            for key in self._index_keys(hcp.email, hcp.first_name, hcp.last_name, hcp.institution_name):
+                self.hcp_index.setdefault(key, hcp.id)
+        if self.dry_run:
+            self.created += len(new_hcps)
+            self.updated += len(to_update)
+            return
+
+        self._update(to_update.values(), updated_fields)
+        self._add_m2m(HCP.affiliate_groups, [(hcp.id, ag_ids) for hcp, ag_ids, _ in m2m])
+        self._add_m2m(HCP.tas, [(hcp.id, ta_ids) for hcp, _, ta_ids in m2m])
+        if m2m:
+            # bulk writes send no signals
+            hcps_changed()
+
+        self.created += len(new_hcps)
+        self.updated += len(to_update)
+
+    def clean_row(self, row):
+        """Normalize and validate a row, returning `(hcp_data, affiliate_group_ids, ta_ids)`.
+
+        Only columns present in the row end up in `hcp_data`, so updates don't
+        blank out fields missing from the export.
+        """
+        errors = []
+        data = {}
+        for name in self.FIELDS:
+            if name not in row:
+                continue
+            value = row[name]
+            value = '' if value is None else str(value).strip()
+            field = HCP._meta.get_field(name)
+
+            if name == 'has_consented':
+                if value.lower() in self.TRUE_VALUES:
+                    value = True
+                elif value.lower() in self.FALSE_VALUES:
+                    value = False
+                else:
+                    errors.append('invalid {}: "{}"'.format(name, value))
+                    continue
+            elif name == 'contact_preference':
+                choices = {k.lower(): c.name for c in HCP.ContactPreference for k in (c.name, c.value)}
+                if value and value.lower() not in choices:
+                    errors.append('invalid {}: "{}"'.format(name, value))
+                    continue
+                value = choices[value.lower()] if value else None
+            else:
+                value = re.sub(r'\s+', ' ', value) if name != 'institution_address' else value
+                if name.endswith('email'):
+                    value = value.lower()
+                    if value:
+                        try:
+                            validate_email(value)
+                        except ValidationError:
+                            errors.append('invalid {}: "{}"'.format(name, value))
+                            continue
+                if field.max_length and len(value) > field.max_length:
+                    errors.append('{} longer than {} characters'.format(name, field.max_length))
+                    continue
+            data[name] = value
+
+        if not data.get('email') and not (data.get('first_name') or data.get('last_name')):
+            errors.append('email or name is required')
+
+        ag_ids = self._resolve_names(row.get('affiliate_groups'), self.affiliate_groups_by_name,
+                                     'affiliate group', errors)
+        ta_ids = self._resolve_names(row.get('tas'), self.tas_by_name,
+                                     'therapeutic area', errors)
+
+        if errors:
+            raise ValidationError(errors)
+        return data, ag_ids, ta_ids
+
+    @staticmethod
+    def _resolve_names(value, ids_by_name, label, errors):
+        ids = []
+        for name in str(value or '').split(NAMES_SEPARATOR):
+            name = name.strip()
+            if not name:
+                continue
+            if name.lower() not in ids_by_name:
+                errors.append('unknown {}: "{}"'.format(label, name))
+                continue
+            ids.append(ids_by_name[name.lower()])
+        return ids
+
+    # Writing
+    #################################################
+
+    def _create(self, hcps):
+        if not hcps:
+            return
+        if connection.features.can_return_ids_from_bulk_insert:
+            HCP.objects.bulk_create(hcps)
+        else:
+            # ids are needed for M2Ms, only PostgreSQL returns them from bulk inserts
+            for hcp in hcps:
+                hcp.save()
+
+    def _update(self, hcps, updated_fields):
+        now = timezone.now()
+        # same field set for all objects of a bulk update, so group by it
+        hcps_by_fields = {}
+        for hcp in hcps:
+            hcp.updated_at = now
+            fields = tuple(sorted(updated_fields[hcp.id]))
+            hcps_by_fields.setdefault(fields, []).append(hcp)
+        for fields, group in hcps_by_fields.items():
+            bulk_update(HCP.objects.all(), group, fields + ('updated_at',))
+
+    @staticmethod
+    def _add_m2m(m2m_descriptor, hcp_target_ids):
+        """Insert missing `(hcp, target)` M2M rows, keeping existing ones.
+        """
+        field = m2m_descriptor.field
+        through = field.remote_field.through
+        source_col = field.m2m_field_name() + '_id'
+        target_col = field.m2m_reverse_field_name() + '_id'
+
+        wanted = {(hcp_id, target_id)
+                  for hcp_id, target_ids in hcp_target_ids
+                  for target_id in target_ids}
+        if not wanted:
+            return
+        existing = set(through.objects.filter(**{
+            source_col + '__in': {hcp_id for hcp_id, _ in wanted}
+        }).values_list(source_col, target_col))
+        through.objects.bulk_create([
+            through(**{source_col: hcp_id, target_col: target_id})
+            for hcp_id, target_id in sorted(wanted - existing)
+        ])
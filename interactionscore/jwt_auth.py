@@ -0,0 +1,180 @@
+"""JWT authentication without loading the User from the DB.
+
+Tokens issued by `jwt_payload_handler` carry a compact `scope` claim: the
+user's scope version, flags, permissions and AG/TA ids. As long as the
+version is the current one (kept in the cache), `ScopedJSONWebTokenAuthentication`
+builds `request.user` from the claim alone. Changes to any of those (see
+receivers below) bump the user's `scope_version`, and requests then fall back
+to the DB until the token is refreshed.
+
+The scope versions must be invalidated in every process: the authentication
+class is opt-in (see `DEFAULT_AUTHENTICATION_CLASSES`) and requires a shared
+cache (memcached, redis), the `manage.py check` warns otherwise.
+"""
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.core import checks
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_save, pre_delete
+from django.dispatch import receiver
+from rest_framework.settings import api_settings
+from rest_framework_jwt.authentication import JSONWebTokenAuthentication
+from rest_framework_jwt.utils import jwt_payload_handler as default_jwt_payload_handler
+
+from .models import AffiliateGroup, TherapeuticArea, User
+
+SCOPE_CLAIM = 'scope'
+
+
+def get_scope_version_cache_key(user_id):
+    return 'user-scope-version-{}'.format(user_id)
+
+
+def get_user_scope(user):
+    scope = {
+        'v': user.scope_version,
+        'a': int(user.is_active),
+        's': int(user.is_staff),
+        'su': int(user.is_superuser),
+        'ag': sorted(user.affiliate_groups.values_list('id', flat=True)),
+        'ta': sorted(user.tas.values_list('id', flat=True)),
+    }
+    if not user.is_superuser:  # they have all permissions anyway
+        scope['p'] = sorted(user.get_all_permissions())
+    return scope
+
+
+def jwt_payload_handler(user):
+    """`JWT_PAYLOAD_HANDLER` adding the scope claim (on obtain and refresh)."""
+    payload = default_jwt_payload_handler(user)
+    payload[SCOPE_CLAIM] = get_user_scope(user)
+    return payload
+
+
+def prefetched(queryset, objs):
+    """`queryset` with `objs` as its results, like `prefetch_related` does."""
+    queryset._result_cache = objs
+    queryset._prefetch_done = True
+    return queryset
+
+
+def get_scope_user(payload):
+    """`User` built from the payload's scope claim, its other fields are
+    deferred (ie. loaded from the DB only if accessed).
+    """
+    scope = payload[SCOPE_CLAIM]
+    values = {
+        'id': payload['user_id'],
+        'email': payload.get('email', ''),
+        'is_active': bool(scope.get('a', 1)),  # older tokens: issued to active users
+        'is_staff': bool(scope['s']),
+        'is_superuser': bool(scope['su']),
+        'scope_version': scope['v'],
+    }
+    # from_db() wants them in model fields order
+    names = [f.attname for f in User._meta.concrete_fields if f.attname in values]
+    user = User.from_db('default', names, [values[name] for name in names])
+    perms = set(scope.get('p', ()))
+    user._perm_cache = user._user_perm_cache = user._group_perm_cache = perms
+    user._prefetched_objects_cache = {
+        'affiliate_groups': prefetched(AffiliateGroup.objects.filter(id__in=scope['ag']),
+                                       [AffiliateGroup(id=i) for i in scope['ag']]),
+        'tas': prefetched(TherapeuticArea.objects.filter(id__in=scope['ta']),
+                          [TherapeuticArea(id=i) for i in scope['ta']]),
+    }
+    return user
+
+
+class ScopedJSONWebTokenAuthentication(JSONWebTokenAuthentication):
+    """`JSONWebTokenAuthentication` trusting an up to date scope claim
+    instead of querying the user (and then its permissions, AGs and TAs).
+    """
+
+    def authenticate_credentials(self, payload):
+        scope = payload.get(SCOPE_CLAIM)
+        if scope is not None and 'user_id' in payload:
+            # else the DB user, refused when inactive
+            if scope.get('a', 1) and cache.get(get_scope_version_cache_key(payload['user_id'])) == scope['v']:
+                return get_scope_user(payload)
+        user = super().authenticate_credentials(payload)
+        cache.set(get_scope_version_cache_key(user.pk), user.scope_version,
+                  settings.JWT_SCOPE_VERSION_CACHE_TIMEOUT)
+        return user
+
+
+@checks.register()
+def check_shared_cache(app_configs, **kwargs):
+    """`ScopedJSONWebTokenAuthentication` with a per-process cache: the other
+    processes would trust outdated scopes until their versions expire.
+    """
+    if (any(issubclass(cls, ScopedJSONWebTokenAuthentication)
+            for cls in api_settings.DEFAULT_AUTHENTICATION_CLASSES) and
+            isinstance(caches[DEFAULT_CACHE_ALIAS], (LocMemCache, DummyCache))):
+        return [checks.Warning(
+            'ScopedJSONWebTokenAuthentication uses the default cache, which is not shared between processes.',
+            hint='Configure a memcached or redis cache in CACHES, or authenticate with '
+                 'rest_framework_jwt.authentication.JSONWebTokenAuthentication.',
+            obj='DEFAULT_AUTHENTICATION_CLASSES',
+            id='interactionscore.W002',
+        )]
+    return []
+
+
+def bump_scope_version(user_ids):
+    User._base_manager.filter(pk__in=user_ids).update(scope_version=F('scope_version') + 1)
+    keys = [get_scope_version_cache_key(user_id) for user_id in user_ids]
+    # right away, and once committed for the requests which cached the old
+    # (still committed) version in the meantime
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+# Scope changes
+#####################################################################
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created or update_fields == frozenset({'last_login'}):
+        return
+    bump_scope_version([instance.pk])
+    instance.scope_version += 1
+
+
+def user_m2m_changed(sender, instance, action, reverse, model, pk_set, **kwargs):
+    """Users' groups, permissions, AGs or TAs changed."""
+    if not reverse:
+        if action in {'post_add', 'post_remove', 'post_clear'}:
+            bump_scope_version([instance.pk])
+            instance.scope_version += 1
+    elif action in {'post_add', 'post_remove'}:
+        bump_scope_version(pk_set)
+    elif action == 'pre_clear':  # the users are not known anymore after clearing
+        source = sender._meta.get_field(instance._meta.model_name)
+        bump_scope_version(list(sender.objects.filter(**{source.name: instance})
+                                .values_list('user_id', flat=True)))
+
+
+for field in ('groups', 'user_permissions', 'affiliate_groups', 'tas'):
+    m2m_changed.connect(user_m2m_changed, sender=getattr(User, field).through)
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def group_permissions_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in {'post_add', 'post_remove', 'pre_clear'}:
+        return
+    if not reverse:
+        groups = [instance.pk]
+    elif action == 'pre_clear':
+        groups = list(instance.group_set.values_list('pk', flat=True))
+    else:
+        groups = pk_set
+    bump_scope_version(list(User._base_manager.filter(groups__in=groups).values_list('pk', flat=True)))
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    bump_scope_version(list(instance.user_set.values_list('pk', flat=True)))
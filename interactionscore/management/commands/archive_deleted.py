@@ -0,0 +1,97 @@
+import datetime
+import json
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from safedelete.models import is_safedelete_cls
+
+from interactions.helpers import chunked
+from interactionscore.management.commands.core_fixtures import get_models_in_dependency_order
+from interactionscore.models import ArchivedRecord
+
+
+def get_references_querysets(model):
+    """Querysets (correlated to `OuterRef('pk')`) of rows referencing a `model` row,
+    soft-deleted or not, through FKs and M2Ms pointing to it.
+    """
+    querysets = []
+    for rel in model._meta.related_objects:
+        if rel.many_to_many:
+            through = rel.through
+            querysets.append(through._base_manager.filter(**{
+                rel.field.m2m_reverse_field_name(): OuterRef('pk')}))
+        else:
+            querysets.append(rel.related_model._base_manager.filter(**{
+                rel.field.name: OuterRef('pk')}))
+    return querysets
+
+
+class Command(BaseCommand):
+    help = ('Move rows soft-deleted long ago out of the core tables into ArchivedRecord, '
+            'so that the tables the app queries stay small')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', dest='days', type=int, default=365,
+                            help='archive rows soft-deleted more than this many days ago')
+        parser.add_argument('--dry_run', dest='dry_run', action='store_true')
+        parser.set_defaults(dry_run=False)
+        parser.add_argument('--batch_size', dest='batch_size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - datetime.timedelta(days=options['days'])
+        models = [model for model in get_models_in_dependency_order()
+                  if is_safedelete_cls(model)]
+
+        # referencing rows first, so their parents can be archived in the same run
+        for model in reversed(models):
+            qs = self.get_archivable_queryset(model, cutoff)
+            if options['dry_run']:
+                self.stdout.write('- would archive {} {} rows'.format(qs.count(), model._meta.label))
+                continue
+            count = 0
+            for pks in chunked(qs.values_list('pk', flat=True).iterator(), options['batch_size']):
+                self.archive(model, pks)
+                count += len(pks)
+            self.stdout.write('- archived {} {} rows'.format(count, model._meta.label))
+
+        self.stdout.write(self.style.SUCCESS('...done!'))
+
+    def get_archivable_queryset(self, model, cutoff):
+        """Rows soft-deleted before `cutoff` that nothing references anymore
+        (hard-deleting a referenced row would cascade or null FKs of rows we keep).
+        """
+        qs = model._base_manager.filter(deleted__lt=cutoff)
+        for i, refs_qs in enumerate(get_references_querysets(model)):
+            name = '_referenced_{}'.format(i)
+            qs = qs.annotate(**{name: Exists(refs_qs)}).filter(**{name: False})
+        return qs.order_by('pk')
+
+    @transaction.atomic
+    def archive(self, model, pks):
+        m2m_fields = model._meta.local_many_to_many
+        rows = model._base_manager.filter(pk__in=pks).values()
+        m2m_ids = {field.name: {} for field in m2m_fields}
+        for field in m2m_fields:
+            through = field.remote_field.through
+            source, target = field.m2m_field_name(), field.m2m_reverse_field_name()
+            links = through._base_manager.filter(**{source + '__in': pks}).values_list(
+                source + '_id', target + '_id')
+            for source_id, target_id in links:
+                m2m_ids[field.name].setdefault(source_id, []).append(target_id)
+
+        records = []
+        for row in rows:
+            for field in m2m_fields:
+                row[field.name] = m2m_ids[field.name].get(row['id'], [])
+            records.append(ArchivedRecord(
+                model=model._meta.label,
+                object_id=row['id'],
+                data=json.dumps(row, cls=DjangoJSONEncoder),
+                deleted=row['deleted'],
+            ))
+        ArchivedRecord.objects.bulk_create(records)
+        # a plain (not safedelete) queryset, so this really deletes, M2M rows included
+        model._base_manager.filter(pk__in=pks).delete()
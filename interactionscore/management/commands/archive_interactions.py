@@ -0,0 +1,83 @@
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from interactionscore import counters
+from interactionscore.management.commands.core_fixtures import keep_timestamps
+from interactionscore.models import ArchivedInteraction, Interaction
+
+
+def move_interactions(src_model, dst_model, pks):
+    """Move `src_model` rows (soft-deleted ones too) with `pks` to the
+    `dst_model` table, keeping their ids, timestamps and resources.
+    """
+    fields = [f.attname for f in src_model._meta.concrete_fields]
+    objs = [dst_model(**{name: getattr(obj, name) for name in fields})
+            for obj in src_model._base_manager.filter(pk__in=pks)]
+
+    src_through = src_model.resources.through
+    dst_through = dst_model.resources.through
+    src_column = src_model._meta.get_field('resources').m2m_column_name()
+    dst_column = dst_model._meta.get_field('resources').m2m_column_name()
+    links = [dst_through(**{dst_column: obj_id, 'resource_id': resource_id})
+             for obj_id, resource_id in src_through.objects.filter(
+                 **{src_column + '__in': pks}).values_list(src_column, 'resource_id')]
+
+    # HCPs' interactions counts include both tables
+    with transaction.atomic(), keep_timestamps([dst_model]), counters.paused():
+        dst_model._base_manager.bulk_create(objs)
+        dst_through.objects.bulk_create(links)
+        # a plain (not safedelete) queryset, so this really deletes, M2M rows included
+        src_model._base_manager.filter(pk__in=pks).delete()
+
+
+class Command(BaseCommand):
+    help = ('Move interactions older than INTERACTIONS_LIVE_YEARS to the ArchivedInteraction table, '
+            'so that the Interaction table only holds the recent years')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--years', dest='years', type=int, default=settings.INTERACTIONS_LIVE_YEARS,
+                            help='number of years (current one included) to keep in the Interaction table')
+        parser.add_argument('--restore', dest='restore', type=int, default=None,
+                            help='move the interactions of this year back from the archive')
+        parser.add_argument('--dry_run', dest='dry_run', action='store_true')
+        parser.set_defaults(dry_run=False)
+        parser.add_argument('--batch_size', dest='batch_size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if options['years'] < 1:
+            raise CommandError('--years should be at least 1')
+
+        if options['restore']:
+            year = options['restore']
+            src_model, dst_model = ArchivedInteraction, Interaction
+            qs = src_model._base_manager.filter(
+                time_of_interaction__gte=timezone.make_aware(datetime.datetime(year, 1, 1)),
+                time_of_interaction__lt=timezone.make_aware(datetime.datetime(year + 1, 1, 1)))
+        else:
+            since = timezone.now().year - options['years'] + 1
+            src_model, dst_model = Interaction, ArchivedInteraction
+            qs = src_model._base_manager.filter(
+                time_of_interaction__lt=timezone.make_aware(datetime.datetime(since, 1, 1)))
+
+        if options['dry_run']:
+            self.stdout.write('- would move {} {} rows to {}'.format(
+                qs.count(), src_model._meta.label, dst_model._meta.label))
+            return
+
+        count = 0
+        qs = qs.order_by('pk').values_list('pk', flat=True)
+        while True:
+            # moved rows are gone from `qs`, so always take the first batch
+            pks = list(qs[:options['batch_size']])
+            if not pks:
+                break
+            move_interactions(src_model, dst_model, pks)
+            count += len(pks)
+            self.stdout.write('- moved {} {} rows to {}'.format(
+                count, src_model._meta.label, dst_model._meta.label))
+
+        self.stdout.write(self.style.SUCCESS('...done!'))
@@ -0,0 +1,73 @@
+import base64
+import timeit
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.authentication import BasicAuthentication, SessionAuthentication
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework_jwt.authentication import JSONWebTokenAuthentication
+from rest_framework_jwt.settings import api_settings as jwt_settings
+
+from interactionscore.authentication import BrowsableAPISessionAuthentication
+from interactionscore.models import User
+
+POLICIES = (
+    ('previous', (JSONWebTokenAuthentication, SessionAuthentication, BasicAuthentication)),
+    ('current', (JSONWebTokenAuthentication, BrowsableAPISessionAuthentication)),
+)
+PASSWORD = 'benchmark-password'
+
+
+class Command(BaseCommand):
+    help = ('Time the authentication of JSON API requests sent with a JWT, a session cookie '
+            'or Basic credentials with the previous and current authentication classes '
+            '(uses a temporary user, rolled back afterwards)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', dest='requests', type=int, default=20,
+                            help='number of requests timed per policy and credentials')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = User.objects.create_user(email='auth-benchmark@example.com', password=PASSWORD)
+            for name, headers in self.get_credentials(user):
+                for policy, authentication_classes in POLICIES:
+                    # first run warms up caches
+                    authenticated = self.authenticate(headers, authentication_classes)
+                    seconds = timeit.timeit(lambda: self.authenticate(headers, authentication_classes),
+                                            number=options['requests'])
+                    self.stdout.write('- {:<8} {:<9} {:8.2f} ms/request ({})'.format(
+                        name, policy, seconds * 1000 / options['requests'],
+                        'authenticated' if authenticated else 'anonymous'))
+            transaction.set_rollback(True)
+        self.stdout.write(self.style.SUCCESS('...done!'))
+
+    def get_credentials(self, user):
+        token = jwt_settings.JWT_ENCODE_HANDLER(jwt_settings.JWT_PAYLOAD_HANDLER(user))
+        session = import_module(settings.SESSION_ENGINE).SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.save()
+        basic = base64.b64encode('{}:{}'.format(user.email, PASSWORD).encode()).decode()
+        return (
+            ('jwt', {'HTTP_AUTHORIZATION': 'JWT ' + token}),
+            ('session', {'HTTP_COOKIE': '{}={}'.format(settings.SESSION_COOKIE_NAME, session.session_key)}),
+            ('basic', {'HTTP_AUTHORIZATION': 'Basic ' + basic}),
+        )
+
+    def authenticate(self, headers, authentication_classes):
+        """`request.user` of a JSON API request, as seen by the views."""
+        http_request = APIRequestFactory().get('/api/v1/self/', **headers)
+        SessionMiddleware().process_request(http_request)
+        AuthenticationMiddleware().process_request(http_request)
+        request = Request(http_request, authenticators=[cls() for cls in authentication_classes])
+        request.accepted_renderer = JSONRenderer()
+        return request.user.is_authenticated
@@ -0,0 +1,35 @@
+import itertools
+import timeit
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from interactionscore.models import EngagementPlan
+from interactionscore.renderers import ORJSONRenderer, orjson
+from interactionscore.serializers import EngagementPlanSerializer
+
+
+class Command(BaseCommand):
+    help = ("Time rendering a large engagement plans list (the serialized plans of the DB "
+            "repeated) with DRF's JSONRenderer and ORJSONRenderer")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', dest='size', type=int, default=1000,
+                            help='number of engagement plans in the list')
+        parser.add_argument('--repeat', dest='repeat', type=int, default=10,
+                            help='number of renderings timed per renderer')
+
+    def handle(self, *args, **options):
+        plans = EngagementPlanSerializer(EngagementPlan.objects.all(), many=True).data
+        if not plans:
+            raise CommandError('no engagement plans to render')
+        data = list(itertools.islice(itertools.cycle(plans), options['size']))
+        if orjson is None:
+            self.stdout.write('- orjson is not installed, ORJSONRenderer uses the JSONRenderer fallback')
+
+        for renderer in (JSONRenderer(), ORJSONRenderer()):
+            size = len(renderer.render(data))
+            seconds = timeit.timeit(lambda: renderer.render(data), number=options['repeat'])
+            self.stdout.write('- {:<15} {:8.2f} ms ({} bytes)'.format(
+                type(renderer).__name__, seconds * 1000 / options['repeat'], size))
+        self.stdout.write(self.style.SUCCESS('...done!'))
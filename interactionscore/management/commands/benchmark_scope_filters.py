@@ -0,0 +1,84 @@
+import random
+import timeit
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from interactionscore.models import HCP, AffiliateGroup, TherapeuticArea
+from interactionscore.scopes import filter_m2m
+
+EXPLAIN_PREFIXES = {
+    'postgresql': 'EXPLAIN ',
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+}
+
+
+class Command(BaseCommand):
+    help = ('Compare the query plans and timings of listing the first page of HCPs in a user '
+            'scope with joins + distinct() and with EXISTS subqueries (uses temporary HCPs, '
+            'rolled back afterwards)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hcps', dest='hcps', type=int, default=20000,
+                            help='number of HCPs created')
+        parser.add_argument('--groups', dest='groups', type=int, default=10,
+                            help='number of affiliate groups and of therapeutic areas created')
+        parser.add_argument('--page_size', dest='page_size', type=int, default=100)
+        parser.add_argument('--repeat', dest='repeat', type=int, default=5,
+                            help='number of queries timed per method')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            ags, tas = self.create_hcps(options['hcps'], options['groups'])
+            # a user in 3 AGs and 3 TAs
+            scope_ags, scope_tas = ags[:3], tas[:3]
+            querysets = (
+                ('distinct', HCP.objects.filter(affiliate_groups__in=scope_ags,
+                                                tas__in=scope_tas).distinct()),
+                ('exists', filter_m2m(filter_m2m(HCP.objects.all(), affiliate_groups=scope_ags),
+                                      tas=scope_tas)),
+            )
+            for name, qs in querysets:
+                page = qs[:options['page_size']]
+                seconds = timeit.timeit(lambda: list(page), number=options['repeat'])
+                self.stdout.write('- {:<8} {:8.2f} ms ({} of {} HCPs)'.format(
+                    name, seconds * 1000 / options['repeat'], len(list(page)), qs.count()))
+                for line in self.explain(page):
+                    self.stdout.write('    ' + line)
+            transaction.set_rollback(True)
+        self.stdout.write(self.style.SUCCESS('...done!'))
+
+    def create_hcps(self, count, groups):
+        ags = AffiliateGroup.objects.bulk_create(
+            [AffiliateGroup(name='Benchmark AG {}'.format(i)) for i in range(groups)])
+        tas = TherapeuticArea.objects.bulk_create(
+            [TherapeuticArea(name='Benchmark TA {}'.format(i)) for i in range(groups)])
+        if connection.features.can_return_ids_from_bulk_insert:
+            ag_ids, ta_ids = [ag.id for ag in ags], [ta.id for ta in tas]
+        else:
+            ag_ids = list(AffiliateGroup.objects.filter(name__startswith='Benchmark AG ')
+                          .values_list('id', flat=True))
+            ta_ids = list(TherapeuticArea.objects.filter(name__startswith='Benchmark TA ')
+                          .values_list('id', flat=True))
+
+        random.seed(0)
+        address = 'Street 1\n' * 20  # wide rows, like real ones
+        HCP.objects.bulk_create(
+            [HCP(first_name='Benchmark HCP {}'.format(i), institution_address=address) for i in range(count)])
+        hcp_ids = HCP.objects.filter(first_name__startswith='Benchmark HCP ').values_list('id', flat=True)
+        hcp_ags, hcp_tas = [], []
+        for hcp_id in hcp_ids:
+            for ag_id in random.sample(ag_ids, 3):
+                hcp_ags.append(HCP.affiliate_groups.through(hcp_id=hcp_id, affiliategroup_id=ag_id))
+            for ta_id in random.sample(ta_ids, 3):
+                hcp_tas.append(HCP.tas.through(hcp_id=hcp_id, therapeuticarea_id=ta_id))
+        HCP.affiliate_groups.through.objects.bulk_create(hcp_ags)
+        HCP.tas.through.objects.bulk_create(hcp_tas)
+        return ag_ids, ta_ids
+
+    def explain(self, queryset):
+        prefix = EXPLAIN_PREFIXES.get(connection.vendor, 'EXPLAIN ')
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            return [' '.join(str(col) for col in row) for row in cursor.fetchall()]
@@ -0,0 +1,25 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from interactionscore.models import ResourceUpload
+
+
+class Command(BaseCommand):
+    help = 'Delete chunked Resource uploads (and their stored chunks) abandoned before being finalized'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', dest='hours', type=int, default=48,
+                            help='delete unfinalized uploads started more than this many hours ago')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - datetime.timedelta(hours=options['hours'])
+        uploads = ResourceUpload.objects.filter(resource__isnull=True, created_at__lt=cutoff)
+        count = 0
+        for upload in uploads.iterator():
+            upload.delete_chunks()
+            upload.delete()
+            count += 1
+        self.stdout.write('- deleted {} uploads'.format(count))
+        self.stdout.write(self.style.SUCCESS('...done!'))
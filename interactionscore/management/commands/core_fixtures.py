@@ -0,0 +1,228 @@
+import datetime
+import gzip
+import json
+import sys
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+
+from interactionscore.counters import get_parent_models, recount
+
+
+APP_LABEL = 'interactionscore'
+
+
+class FixtureJSONEncoder(DjangoJSONEncoder):
+    """Keeps the microseconds DjangoJSONEncoder truncates to milliseconds,
+    so that dumping loaded data gives back the same file.
+    """
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+def get_models_in_dependency_order(exclude=()):
+    """Return app's models sorted so FK targets always come before referencing
+    models, followed by the auto-created M2M through models of those models.
+
+    Through models are only included when both sides are included, M2Ms to
+    models outside the app (eg. `User.groups`) are skipped.
+    """
+    exclude = {label.lower() for label in exclude}
+    models = [model for model in apps.get_app_config(APP_LABEL).get_models()
+              if model._meta.label_lower not in exclude]
+    models_set = set(models)
+
+    deps = {
+        model: {field.related_model for field in model._meta.concrete_fields
+                if field.is_relation and
+                field.related_model in models_set and
+                field.related_model is not model}
+        for model in models
+    }
+    ordered = []
+    while deps:
+        ready = [model for model, model_deps in deps.items()
+                 if not (model_deps - set(ordered))]
+        if not ready:
+            raise CommandError('Circular FK dependency between models: {}'.format(
+                ', '.join(model._meta.label for model in deps)))
+        # keep a stable order among models that are ready at the same time
+        for model in sorted(ready, key=lambda m: m._meta.label):
+            ordered.append(model)
+            del deps[model]
+
+    through_models = []
+    for model in ordered:
+        for field in model._meta.local_many_to_many:
+            through = field.remote_field.through
+            if through._meta.auto_created and field.related_model in models_set:
+                through_models.append(through)
+
+    return ordered + through_models
+
+
+def open_fixture(path, mode):
+    """Open fixture file for text read/write, transparently (de)compressing
+    `*.gz` files; `-` stands for stdin/stdout.
+    """
+    if path == '-':
+        return sys.stdin if mode == 'r' else sys.stdout
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+@contextmanager
+def keep_timestamps(models):
+    """Temporarily turn off `auto_now`/`auto_now_add` so `bulk_create` keeps
+    the dumped `created_at`/`updated_at` values.
+    """
+    saved = []
+    for model in models:
+        for field in model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+                saved.append((field, field.auto_now, field.auto_now_add))
+                field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now = auto_now
+            field.auto_now_add = auto_now_add
+
+
+class Command(BaseCommand):
+    help = ('Dump or load all interactionscore data as a single streamed NDJSON file '
+            '(gzipped if the file name ends with .gz)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=('dump', 'load'))
+        parser.add_argument('path', help='fixture file path, or - for stdout/stdin')
+        parser.add_argument('-e', '--exclude', dest='exclude', action='append', default=[],
+                            help='model to exclude (eg. interactionscore.User), can be repeated')
+        parser.add_argument('--batch_size', dest='batch_size', type=int, default=2000,
+                            help='number of rows buffered per bulk insert when loading')
+
+    def handle(self, *args, **options):
+        models = get_models_in_dependency_order(options['exclude'])
+        self._path = options['path']
+        if options['action'] == 'dump':
+            f = open_fixture(options['path'], 'w')
+            try:
+                self.dump(f, models)
+            finally:
+                if f is not sys.stdout:
+                    f.close()
+        else:
+            f = open_fixture(options['path'], 'r')
+            try:
+                self.load(f, models, options['batch_size'])
+            finally:
+                if f is not sys.stdin:
+                    f.close()
+
+    def dump(self, f, models):
+        """Write, for each model, a header line with model label and column
+        names, followed by one JSON array of raw column values per row.
+        """
+        encoder = FixtureJSONEncoder(separators=(',', ':'))
+        for model in models:
+            columns = [field.attname for field in model._meta.concrete_fields]
+            f.write(encoder.encode({'model': model._meta.label_lower, 'fields': columns}) + '\n')
+            # _base_manager includes soft-deleted rows, unlike the default safedelete managers
+            rows = model._base_manager.order_by('pk').values_list(*columns).iterator()
+            count = 0
+            for row in rows:
+                f.write(encoder.encode(row) + '\n')
+                count += 1
+            self._log('- dumped {} {} rows'.format(count, model._meta.label))
+
+    def load(self, f, models, batch_size):
+        """Stream rows back in with one `bulk_create` per batch. No signals are
+        sent and nothing gets saved row by row, so the target tables are
+        expected to be empty. The counters are recounted last.
+        """
+        with transaction.atomic(), keep_timestamps(models):
+            self._load(f, models, batch_size)
+            self._reset_sequences(models)
+            self._recount(models)
+
+    def _load(self, f, models, batch_size):
+        models_by_label = {model._meta.label_lower: model for model in models}
+        model = None
+        fields = None
+        batch = []
+        count = 0
+
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+
+            if isinstance(record, dict):
+                if model is not None:
+                    count += self._bulk_create(model, batch)
+                    self._log('- loaded {} {} rows'.format(count, model._meta.label))
+                batch = []
+                count = 0
+                model = models_by_label.get(record['model'])
+                if model is None:
+                    if record['model'].split('.')[0] != APP_LABEL:
+                        raise CommandError('Line {}: unexpected model {}'.format(line_no, record['model']))
+                    # excluded model, skip its rows
+                    self._log('- skipping {} rows'.format(record['model']))
+                    continue
+                fields_by_attname = {field.attname: field for field in model._meta.concrete_fields}
+                try:
+                    fields = [fields_by_attname[column] for column in record['fields']]
+                except KeyError as e:
+                    raise CommandError('Line {}: unknown column {} for {}'.format(
+                        line_no, e, model._meta.label))
+                continue
+
+            if model is None:
+                continue
+            batch.append(model(**{
+                field.attname: field.to_python(value)
+                for field, value in zip(fields, record)
+            }))
+            if len(batch) >= batch_size:
+                count += self._bulk_create(model, batch)
+                batch = []
+
+        if model is not None:
+            count += self._bulk_create(model, batch)
+            self._log('- loaded {} {} rows'.format(count, model._meta.label))
+
+    def _bulk_create(self, model, objs):
+        if objs:
+            # let the backend choose a batch size it can handle (eg. sqlite's max vars)
+            model._base_manager.bulk_create(objs)
+        return len(objs)
+
+    def _reset_sequences(self, models):
+        """Rows were inserted with explicit ids, so move PostgreSQL sequences past them.
+        """
+        sql_list = connection.ops.sequence_reset_sql(no_style(), models)
+        if sql_list:
+            with connection.cursor() as cursor:
+                for sql in sql_list:
+                    cursor.execute(sql)
+
+    def _recount(self, models):
+        """Counters of the loaded rows (see `interactionscore.counters`), the
+        bulk inserts didn't update them and older fixtures have none.
+        """
+        for model in get_parent_models():
+            if model in models:
+                self._log('- recounted {} {} rows'.format(recount(model), model._meta.label))
+
+    def _log(self, msg):
+        # keep stdout clean when dumping to it
+        (self.stderr if self._path == '-' else self.stdout).write(msg)
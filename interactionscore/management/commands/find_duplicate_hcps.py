@@ -0,0 +1,31 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from interactionscore.duplicates import find_duplicates
+from interactionscore.models import HCP
+
+
+class Command(BaseCommand):
+    help = 'List the pairs of HCPs which are likely duplicates, best matches first'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threshold', dest='threshold', type=float,
+                            default=settings.HCP_DUPLICATE_THRESHOLD,
+                            help='min score (0 to 1) of the listed pairs')
+        parser.add_argument('--limit', dest='limit', type=int, default=None,
+                            help='max number of listed pairs')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        duplicates = find_duplicates(threshold=options['threshold'])
+        elapsed = time.perf_counter() - start
+
+        shown = duplicates[:options['limit']]
+        hcps = HCP.objects.in_bulk({hcp_id for d in shown for hcp_id in d[1:]})
+        for score, hcp_id, other_id in shown:
+            self.stdout.write('- {:.2f}: #{} {!r} / #{} {!r}'.format(
+                score, hcp_id, hcps[hcp_id], other_id, hcps[other_id]))
+        self.stdout.write(self.style.SUCCESS('...done! {} pairs found in {:.1f}s'.format(
+            len(duplicates), elapsed)))
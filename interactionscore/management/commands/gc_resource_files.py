@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from interactionscore.models import Resource, StoredFile, get_thumbnail_name
+from interactionscore.storage import resource_storage
+
+
+def get_unreferenced_queryset():
+    # _base_manager: soft-deleted Resources still reference their files
+    references = Resource._base_manager.filter(file=OuterRef('name'))
+    return StoredFile.objects.annotate(referenced=Exists(references)).filter(referenced=False)
+
+
+class Command(BaseCommand):
+    help = 'Delete the content-addressed Resource files no Resource (even soft-deleted) references anymore'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry_run', dest='dry_run', action='store_true')
+        parser.set_defaults(dry_run=False)
+
+    def handle(self, *args, **options):
+        count = size = 0
+        for stored_file in get_unreferenced_queryset().iterator():
+            if not options['dry_run'] and not self.delete(stored_file):
+                continue
+            count += 1
+            size += stored_file.size
+        self.stdout.write('- {} {} files ({} bytes)'.format(
+            'would delete' if options['dry_run'] else 'deleted', count, size))
+        self.stdout.write(self.style.SUCCESS('...done!'))
+
+    @transaction.atomic
+    def delete(self, stored_file):
+        # lock (as `StoredFile.objects.store()`), then check again: a new upload
+        # could have reused the file meanwhile (a separate query, to see the
+        # uploads committed while waiting for the lock)
+        if not StoredFile.objects.select_for_update().filter(pk=stored_file.pk).exists():
+            return False
+        if not get_unreferenced_queryset().filter(pk=stored_file.pk).exists():
+            return False
+        StoredFile.objects.filter(pk=stored_file.pk).delete()
+        # last, so that the row stays if deleting the files fails
+        resource_storage.delete(get_thumbnail_name(stored_file.name))
+        resource_storage.delete(stored_file.name)
+        return True
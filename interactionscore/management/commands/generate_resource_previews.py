@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from interactionscore.models import Resource
+from interactionscore.tasks import generate_resource_preview
+
+
+class Command(BaseCommand):
+    help = 'Fill the preview fields (metadata and thumbnail) of Resources whose file has none yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queue', dest='queue', action='store_true',
+                            help='queue background tasks instead of running them here')
+        parser.set_defaults(queue=False)
+
+    def handle(self, *args, **options):
+        resources = (Resource.all_objects.exclude(file__isnull=True).exclude(file='')
+                     .exclude(previewed_file=F('file')))
+        count = 0
+        for resource in resources.iterator():
+            if options['queue']:
+                generate_resource_preview.delay(resource.pk)
+            else:
+                resource.update_preview()
+            count += 1
+        self.stdout.write('- {} {} Resources'.format('queued' if options['queue'] else 'previewed', count))
+        self.stdout.write(self.style.SUCCESS('...done!'))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from interactionscore.importers import HCPImporter, ImportFileError, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Import (create or update) HCPs from a CSV or XLSX CRM export'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--dry_run', dest='dry_run', action='store_true',
+                            help='validate and match rows without writing anything')
+        parser.set_defaults(dry_run=False)
+        parser.add_argument('--batch_size', dest='batch_size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        importer = HCPImporter(batch_size=options['batch_size'], dry_run=options['dry_run'])
+        try:
+            with open(options['path'], 'rb') as f:
+                importer.run(read_rows(f, options['path']))
+        except ImportFileError as e:
+            raise CommandError(str(e))
+
+        for row_number, message in importer.errors:
+            self.stderr.write('- row {}: {}'.format(row_number, message))
+        self.stdout.write(self.style.SUCCESS(
+            '...done! {}{} created, {} updated, {} rows with errors'.format(
+                '(dry run) ' if options['dry_run'] else '',
+                importer.created, importer.updated, len(importer.errors))
+        ))
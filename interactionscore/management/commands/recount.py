@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from interactions.helpers import chunked
+from interactionscore.counters import get_parent_models, recount
+
+
+class Command(BaseCommand):
+    help = ('Recompute the denormalized counters (items of plans, deliverables of objectives by status, '
+            'interactions of HCPs...), eg. after changes made without signals')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch_size', dest='batch_size', type=int, default=1000,
+                            help='rows recounted per UPDATE')
+
+    def handle(self, *args, **options):
+        for model in get_parent_models():
+            count = 0
+            pks = model._base_manager.order_by('pk').values_list('pk', flat=True)
+            for batch in chunked(pks.iterator(), options['batch_size']):
+                count += recount(model, model._base_manager.filter(pk__in=batch))
+            self.stdout.write('- recounted {} {} rows'.format(count, model._meta.label))
+        self.stdout.write(self.style.SUCCESS('...done!'))
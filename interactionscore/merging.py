@@ -0,0 +1,111 @@
+"""Merging of duplicate HCPs (see `interactionscore.duplicates` to find them).
+
+Rows referencing the duplicate are repointed with one `UPDATE` per table,
+whatever their number, instead of being loaded and saved one by one.
+"""
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import CharField, TextField
+from django.utils import timezone
+
+from .counters import recount
+from .models import EngagementPlanHCPItem, HCP, HCPMerge
+
+
+class MergeError(Exception):
+    pass
+
+
+def get_fillable_fields():
+    """Fields of an HCP filled from the duplicate when blank (not the flags,
+    eg. consent, which must not be inherited).
+    """
+    return [field for field in HCP._meta.concrete_fields
+            if isinstance(field, (CharField, TextField)) and field.blank]
+
+
+def merge_m2m(through, source_name, target_name, hcp, duplicate):
+    """Move the `through` rows of `duplicate` to `hcp`, but the ones `hcp`
+    has already. Returns the number of moved rows.
+    """
+    existing = list(through._base_manager.filter(**{source_name: hcp}).values_list(target_name, flat=True))
+    through._base_manager.filter(**{source_name: duplicate, target_name + '__in': existing}).delete()
+    return through._base_manager.filter(**{source_name: duplicate}).update(**{source_name: hcp})
+
+
+def move_references(rel, source, target, now):
+    """Repoint the rows referencing `source` through `rel` (soft-deleted
+    ones included) to `target`. Returns their number.
+    """
+    values = {rel.field.name: target}
+    if any(f.name == 'updated_at' for f in rel.related_model._meta.concrete_fields):
+        values['updated_at'] = now  # `update()` skips auto_now
+    return rel.related_model._base_manager.filter(**{rel.field.name: source}).update(**values)
+
+
+def merge_engagement_plan_items(hcp, duplicate, now):
+    """Move what references the items of `duplicate` on the plans `hcp` is
+    on as well (objectives, comments...) to `hcp`'s items, and soft-delete
+    them: an HCP is on a plan once. Returns the number of merged items.
+    """
+    kept = dict(EngagementPlanHCPItem.objects.filter(hcp=hcp).values_list('engagement_plan_id', 'pk'))
+    items = list(EngagementPlanHCPItem.objects.filter(hcp=duplicate, engagement_plan_id__in=kept))
+    for item in items:
+        for rel in EngagementPlanHCPItem._meta.related_objects:
+            move_references(rel, item, kept[item.engagement_plan_id], now)
+        item.delete()
+    if items:
+        recount(EngagementPlanHCPItem, EngagementPlanHCPItem._base_manager.filter(pk__in=kept.values()))
+    return len(items)
+
+
+@transaction.atomic
+def merge_hcps(hcp, duplicate, user=None):
+    """Merge `duplicate` into `hcp`: its interactions, engagement plan items,
+    objectives (anything referencing it, soft-deleted or not), AGs and TAs
+    move to `hcp` (its items on plans `hcp` is on too are merged into
+    `hcp`'s), `hcp`'s blank fields are filled from it, and it gets
+    soft-deleted. Returns the `HCPMerge` audit entry.
+    """
+    if hcp.pk == duplicate.pk:
+        raise MergeError('Cannot merge an HCP into itself.')
+    # locked in a consistent order, concurrent merges could deadlock otherwise
+    locked = {h.pk: h for h in HCP.objects.select_for_update().filter(
+        pk__in=(hcp.pk, duplicate.pk)).order_by('pk')}
+    if len(locked) != 2:
+        raise MergeError('Cannot merge deleted HCPs.')
+    hcp, duplicate = locked[hcp.pk], locked[duplicate.pk]
+
+    now = timezone.now()
+    merged_items = merge_engagement_plan_items(hcp, duplicate, now)
+    moved = {}
+    for rel in HCP._meta.related_objects:
+        if rel.related_model is HCPMerge:
+            continue  # audit entries stay about the HCPs they were made for
+        if rel.many_to_many:
+            count = merge_m2m(rel.through, rel.field.m2m_reverse_field_name(),
+                              rel.field.m2m_field_name(), hcp, duplicate)
+        else:
+            count = move_references(rel, duplicate, hcp, now)
+        moved[rel.related_model._meta.label] = count
+    for field in HCP._meta.local_many_to_many:
+        moved[field.remote_field.through._meta.label] = merge_m2m(
+            field.remote_field.through, field.m2m_field_name(), field.m2m_reverse_field_name(), hcp, duplicate)
+
+    filled = {field.attname: getattr(duplicate, field.attname) for field in get_fillable_fields()
+              if not getattr(hcp, field.attname) and getattr(duplicate, field.attname)}
+    HCP._base_manager.filter(pk=hcp.pk).update(updated_at=now, **filled)
+    recount(HCP, HCP._base_manager.filter(pk__in=(hcp.pk, duplicate.pk)))
+    for name, value in filled.items():
+        setattr(hcp, name, value)
+
+    merge = HCPMerge.objects.create(hcp=hcp, merged_hcp=duplicate, merged_by=user, data=json.dumps({
+        'fields': {field.attname: getattr(duplicate, field.attname) for field in HCP._meta.concrete_fields},
+        'filled': sorted(filled),
+        'moved': moved,
+        'merged_engagement_plan_items': merged_items,
+    }, cls=DjangoJSONEncoder))
+    duplicate.delete()
+    return merge
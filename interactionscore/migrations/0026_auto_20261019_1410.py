@@ -0,0 +1,34 @@
+# Generated by Django 2.0.6 on 2026-10-19 14:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interactionscore', '0025_auto_20180814_1126'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedRecord',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=255)),
+                ('object_id', models.IntegerField()),
+                ('data', models.TextField()),
+                ('deleted', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='interaction',
+            name='hcp',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='interactions', to='interactionscore.HCP'),
+        ),
+        migrations.AlterIndexTogether(
+            name='archivedrecord',
+            index_together={('model', 'object_id')},
+        ),
+    ]
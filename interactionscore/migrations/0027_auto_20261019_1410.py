@@ -0,0 +1,55 @@
+# Generated by Django 2.0.6 on 2026-10-19 14:10
+
+from django.db import migrations
+
+# Partial indexes only covering live rows (`deleted IS NULL`), matching the
+# filter safedelete's default managers add to every query (and to joined
+# tables), so lookups/joins don't have to skip soft-deleted rows and indexes
+# stay as small as the live data.
+# (Django 2.0 has no `Index(condition=...)`, hence raw SQL, which is valid on
+# both PostgreSQL and SQLite.)
+LIVE_INDEXES = (
+    # (table, columns)
+    ('interactionscore_engagementplan', ('user_id', 'year')),
+    ('interactionscore_engagementplan', ('created_at',)),
+    ('interactionscore_engagementplanhcpitem', ('engagement_plan_id',)),
+    ('interactionscore_engagementplanhcpitem', ('hcp_id',)),
+    ('interactionscore_engagementplanprojectitem', ('engagement_plan_id',)),
+    ('interactionscore_engagementplanprojectitem', ('project_id',)),
+    ('interactionscore_hcpobjective', ('engagement_plan_item_id',)),
+    ('interactionscore_hcpobjective', ('hcp_id',)),
+    ('interactionscore_projectobjective', ('engagement_plan_item_id',)),
+    ('interactionscore_hcpdeliverable', ('objective_id',)),
+    ('interactionscore_projectdeliverable', ('objective_id',)),
+    ('interactionscore_interaction', ('hcp_id', 'time_of_interaction')),
+    ('interactionscore_interaction', ('user_id', 'created_at')),
+    ('interactionscore_hcp', ('created_at',)),
+    ('interactionscore_hcp', ('last_name', 'first_name')),
+    ('interactionscore_project', ('created_at',)),
+    ('interactionscore_resource', ('created_at',)),
+    ('interactionscore_resource', ('title',)),
+    ('interactionscore_affiliategroup', ('name',)),
+    ('interactionscore_therapeuticarea', ('name',)),
+    ('interactionscore_brandcriticalsuccessfactor', ('ta_id',)),
+    ('interactionscore_medicalplanobjective', ('ta_id',)),
+)
+
+
+def index_name(table, columns):
+    return '{}_{}_live'.format(table.replace('interactionscore_', 'ic_'), '_'.join(columns))[:63]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interactionscore', '0026_auto_20261019_1410'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            ['CREATE INDEX {name} ON {table} ({columns}) WHERE deleted IS NULL'.format(
+                name=index_name(table, columns), table=table, columns=', '.join(columns))],
+            reverse_sql=['DROP INDEX {}'.format(index_name(table, columns))],
+        )
+        for table, columns in LIVE_INDEXES
+    ]
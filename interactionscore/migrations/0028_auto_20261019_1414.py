@@ -0,0 +1,49 @@
+# Generated by Django 2.0.6 on 2026-10-19 14:14
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interactionscore', '0027_auto_20261019_1410'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedInteraction',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('deleted', models.DateTimeField(editable=False, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('time_of_interaction', models.DateTimeField()),
+                ('purpose', models.TextField()),
+                ('is_joint_visit', models.BooleanField(default=False, verbose_name='Joint visit')),
+                ('is_joint_visit_manager_approved', models.BooleanField(default=False, verbose_name='Joint visit approved by Manager')),
+                ('joint_visit_with', models.TextField(blank=True)),
+                ('joint_visit_reason', models.TextField(blank=True, choices=[('option1', 'Option 1'), ('option2', 'Option 2'), ('other', 'Other')])),
+                ('joint_visit_reason_other', models.TextField(blank=True)),
+                ('origin_of_interaction', models.CharField(choices=[('medinfo_enquiry', 'MedInfo enquiry'), ('engagement_plan', 'Engagement Plan'), ('other', 'Other')], max_length=255)),
+                ('origin_of_interaction_other', models.CharField(blank=True, max_length=255)),
+                ('type_of_interaction', models.CharField(choices=[('phone', 'Phone'), ('face_to_face', 'Face-to-face'), ('email', 'Email')], max_length=255)),
+                ('is_proactive', models.BooleanField(default=False)),
+                ('is_adverse_event', models.BooleanField(default=False, verbose_name='Adverse event')),
+                ('appropriate_pv_procedures_followed', models.NullBooleanField(default=False)),
+                ('follow_up_date', models.DateTimeField(blank=True, null=True)),
+                ('follow_up_notes', models.CharField(blank=True, max_length=255)),
+                ('no_follow_up_required', models.BooleanField(default=False)),
+                ('hcp', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_interactions', to='interactionscore.HCP')),
+                ('hcp_objective', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='interactionscore.HCPObjective')),
+                ('project', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='interactionscore.Project')),
+                ('resources', models.ManyToManyField(blank=True, related_name='archived_interactions', to='interactionscore.Resource')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='MSL')),
+            ],
+        ),
+        migrations.AlterIndexTogether(
+            name='archivedinteraction',
+            index_together={('hcp', 'time_of_interaction'), ('time_of_interaction',)},
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 2.0.6 on 2026-10-19 14:18
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import interactionscore.models
+import interactionscore.storage
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interactionscore', '0028_auto_20261019_1414'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResourceUpload',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255)),
+                ('size', models.BigIntegerField()),
+                ('chunk_size', models.IntegerField()),
+            ],
+            options={
+                'ordering': ['created_at'],
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ResourceUploadChunk',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.IntegerField()),
+                ('size', models.IntegerField()),
+                ('checksum', models.CharField(max_length=64)),
+                ('upload', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='interactionscore.ResourceUpload')),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='resource',
+            name='file',
+            field=models.FileField(blank=True, null=True, storage=interactionscore.storage.ResourceStorage(), upload_to=interactionscore.models.make_resource_filepath),
+        ),
+        migrations.AddField(
+            model_name='resourceupload',
+            name='resource',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='interactionscore.Resource'),
+        ),
+        migrations.AddField(
+            model_name='resourceupload',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resource_uploads', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterUniqueTogether(
+            name='resourceuploadchunk',
+            unique_together={('upload', 'index')},
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 2.0.6 on 2026-10-19 14:27
+
+from django.db import migrations, models
+import interactionscore.models
+import interactionscore.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interactionscore', '0029_auto_20261019_1418'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredFile',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('name', models.CharField(max_length=255)),
+                ('size', models.BigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='resource',
+            name='file',
+            field=models.FileField(blank=True, db_index=True, null=True, storage=interactionscore.storage.ResourceStorage(), upload_to=interactionscore.models.make_resource_filepath),
+        ),
+    ]
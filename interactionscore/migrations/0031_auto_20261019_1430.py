@@ -0,0 +1,39 @@
+# Generated by Django 2.0.6 on 2026-10-19 14:30
+
+from django.db import migrations, models
+import interactionscore.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interactionscore', '0030_auto_20261019_1427'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resource',
+            name='file_size',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='resource',
+            name='mime_type',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='resource',
+            name='page_count',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='resource',
+            name='previewed_file',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='resource',
+            name='thumbnail',
+            field=models.FileField(blank=True, editable=False, null=True, storage=interactionscore.storage.ResourceStorage(), upload_to=''),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.0.6 on 2026-10-19 14:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interactionscore', '0031_auto_20261019_1430'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='scope_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 2.0.6 on 2026-10-19 15:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interactionscore', '0032_user_scope_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HCPMerge',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('hcp', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='merges', to='interactionscore.HCP')),
+                ('merged_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('merged_hcp', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='merged_into', to='interactionscore.HCP')),
+            ],
+        ),
+    ]
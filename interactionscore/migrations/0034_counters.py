@@ -0,0 +1,122 @@
+# Generated by Django 2.0.6 on 2026-10-19 15:10
+
+from django.db import migrations
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+import interactionscore.models
+
+# (counted model, FK to the counting model, counter field, conditions),
+# as in interactionscore.counters at the time of this migration
+COUNTERS = [
+    ('EngagementPlanHCPItem', 'engagement_plan', 'hcp_items_count', {}),
+    ('EngagementPlanHCPItem', 'engagement_plan', 'approved_hcp_items_count', {'approved': True}),
+    ('EngagementPlanProjectItem', 'engagement_plan', 'project_items_count', {}),
+    ('HCPObjective', 'engagement_plan_item', 'objectives_count', {}),
+    ('ProjectObjective', 'engagement_plan_item', 'objectives_count', {}),
+    ('Interaction', 'hcp', 'interactions_count', {}),
+    ('ArchivedInteraction', 'hcp', 'interactions_count', {}),
+] + [
+    (model, 'objective', field, conditions)
+    for model in ('HCPDeliverable', 'ProjectDeliverable')
+    for field, conditions in (
+        ('deliverables_count', {}),
+        ('on_track_deliverables_count', {'status': 'on_track'}),
+        ('slightly_behind_deliverables_count', {'status': 'slightly_behind'}),
+        ('major_issue_deliverables_count', {'status': 'major_issue'}),
+    )
+]
+
+
+def count(apps, schema_editor):
+    updates = {}
+    for model_name, fk_name, field, conditions in COUNTERS:
+        model = apps.get_model('interactionscore', model_name)
+        parent_model = model._meta.get_field(fk_name).related_model
+        counted = model._base_manager.filter(deleted__isnull=True, **dict(conditions, **{fk_name: OuterRef('pk')}))
+        counted = counted.order_by().values(fk_name).annotate(count=Count('pk')).values('count')
+        value = Coalesce(Subquery(counted, output_field=IntegerField()), Value(0))
+        values = updates.setdefault(parent_model, {})
+        values[field] = values[field] + value if field in values else value
+    for parent_model, values in updates.items():
+        parent_model._base_manager.update(**values)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interactionscore', '0033_hcpmerge'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='engagementplan',
+            name='approved_hcp_items_count',
+            field=interactionscore.models.CounterField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='engagementplan',
+            name='hcp_items_count',
+            field=interactionscore.models.CounterField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='engagementplan',
+            name='project_items_count',
+            field=interactionscore.models.CounterField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='engagementplanhcpitem',
+            name='objectives_count',
+            field=interactionscore.models.CounterField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='engagementplanprojectitem',
+            name='objectives_count',
+            field=interactionscore.models.CounterField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='hcp',
+            name='interactions_count',
+            field=interactionscore.models.CounterField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='hcpobjective',
+            name='deliverables_count',
+            field=interactionscore.models.CounterField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='hcpobjective',
+            name='major_issue_deliverables_count',
+            field=interactionscore.models.CounterField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='hcpobjective',
+            name='on_track_deliverables_count',
+            field=interactionscore.models.CounterField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='hcpobjective',
+            name='slightly_behind_deliverables_count',
+            field=interactionscore.models.CounterField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='projectobjective',
+            name='deliverables_count',
+            field=interactionscore.models.CounterField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='projectobjective',
+            name='major_issue_deliverables_count',
+            field=interactionscore.models.CounterField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='projectobjective',
+            name='on_track_deliverables_count',
+            field=interactionscore.models.CounterField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='projectobjective',
+            name='slightly_behind_deliverables_count',
+            field=interactionscore.models.CounterField(default=0, editable=False),
+        ),
+        migrations.RunPython(count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 2.0.6 on 2026-10-19 15:15
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interactionscore', '0034_counters'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='hcpdeliverable',
+            index_together={('status', 'quarter')},
+        ),
+        migrations.AlterIndexTogether(
+            name='projectdeliverable',
+            index_together={('status', 'quarter')},
+        ),
+    ]
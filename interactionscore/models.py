@@ -1,16 +1,23 @@
+import datetime
 import math
 import os
 import re
 import uuid
+from django.conf import settings
+from django.core.files.base import ContentFile
 from django.utils import timezone
-from django.db import models as m
+from django.db import IntegrityError, models as m, transaction
 from django.contrib.auth.models import AbstractUser, UserManager as DefaultUserManager
 from django.utils.translation import ugettext_lazy as _
+from safedelete.managers import SafeDeleteManager, SafeDeleteAllManager, SafeDeleteDeletedManager
 from safedelete.models import SafeDeleteModel
-from safedelete.managers import SafeDeleteManager
 from safedelete.models import SOFT_DELETE, SOFT_DELETE_CASCADE
+from safedelete.queryset import SafeDeleteQueryset
 
 from interactions.helpers import ChoiceEnum, make_words_fields_query_expr
+from .softdelete import SoftDeleteCascadeModel, SoftDeleteCascadeManager, SoftDeleteCascadeQueryset
+from .previews import extract_preview
+from .storage import ChainedReader, HashingReader, resource_storage, save_stream
 
 # Core Business Logic Models
 #####################################################################
@@ -44,6 +51,45 @@ class ApprovableModel(m.Model):
         self.save()
 
 
+class CounterField(m.IntegerField):
+    """Count of related rows, maintained by `interactionscore.counters`."""
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('default', 0)
+        kwargs.setdefault('editable', False)
+        super().__init__(*args, **kwargs)
+
+
+class CountersModel(m.Model):
+    """Model with `CounterField`s, which are updated in the DB only (with
+    `F()` expressions): saving an instance doesn't write them back, they may
+    be outdated.
+    """
+    class Meta:
+        abstract = True
+
+    def save_base(self, *args, **kwargs):
+        # not in save(): soft-deletes skip it
+        if not self._state.adding and not kwargs.get('force_insert'):
+            counters = {f.name for f in self._meta.concrete_fields if isinstance(f, CounterField)}
+            update_fields = kwargs.get('update_fields')
+            if update_fields is None:
+                update_fields = [f.name for f in self._meta.concrete_fields if not f.primary_key]
+            kwargs['update_fields'] = [name for name in update_fields if name not in counters]
+        super().save_base(*args, **kwargs)
+
+
+class DeliverablesCountsModel(CountersModel):
+    """Counts of the (not deleted) deliverables of an objective, by status."""
+    class Meta:
+        abstract = True
+
+    deliverables_count = CounterField()
+    on_track_deliverables_count = CounterField()
+    slightly_behind_deliverables_count = CounterField()
+    major_issue_deliverables_count = CounterField()
+
+
 class AffiliateGroup(TimestampedModel, SafeDeleteModel):
     _safedelete_policy = SOFT_DELETE
 
@@ -111,6 +157,27 @@ class Comment(TimestampedModel, SafeDeleteModel):
                                        null=True, blank=True, related_name='comments')
     message = m.TextField()
 
+    # what can be commented on
+    TARGET_FIELDS = (
+        'engagement_plan',
+        'engagement_plan_hcp_item',
+        'engagement_plan_project_item',
+        'hcp_objective',
+        'project_objective',
+        'hcp_deliverable',
+        'project_deliverable',
+    )
+    # related rows used by `__str__()`, for `select_related()`
+    STR_RELATED = (
+        'user',
+        'engagement_plan_hcp_item__hcp',
+        'engagement_plan_project_item__project',
+        'hcp_objective__hcp',
+        'project_objective__project',
+        'hcp_deliverable__objective__hcp',
+        'project_deliverable__objective__project',
+    )
+
     def __str__(self):
         on_str = []
         if self.engagement_plan_hcp_item:
@@ -165,7 +232,7 @@ class EngagementPlanPerms(ChoiceEnum):
     approve_own_ag_ep = 'Can approve EPs of own AGs'
 
 
-class EngagementPlan(TimestampedModel, ApprovableModel, SafeDeleteModel):
+class EngagementPlan(TimestampedModel, ApprovableModel, CountersModel, SoftDeleteCascadeModel):
     _safedelete_policy = SOFT_DELETE_CASCADE
 
     class Meta:
@@ -176,12 +243,16 @@ class EngagementPlan(TimestampedModel, ApprovableModel, SafeDeleteModel):
 
     year = m.IntegerField()
 
+    hcp_items_count = CounterField()
+    approved_hcp_items_count = CounterField()
+    project_items_count = CounterField()
+
     def __str__(self):
         return "{} / {} ({})".format(
             self.user.email if self.user else '', self.year, self.id)
 
 
-class EngagementPlanHCPItem(TimestampedModel, ApprovableModel, SafeDeleteModel):
+class EngagementPlanHCPItem(TimestampedModel, ApprovableModel, CountersModel, SoftDeleteCascadeModel):
     _safedelete_policy = SOFT_DELETE_CASCADE
 
     engagement_plan = m.ForeignKey(EngagementPlan, on_delete=m.CASCADE,
@@ -200,8 +271,10 @@ class EngagementPlanHCPItem(TimestampedModel, ApprovableModel, SafeDeleteModel):
     removed_at = m.DateTimeField(null=True, blank=True)
     reason_removed = m.CharField(max_length=255, blank=True)
 
+    objectives_count = CounterField()
+
 
-class EngagementPlanProjectItem(TimestampedModel, SafeDeleteModel):
+class EngagementPlanProjectItem(TimestampedModel, CountersModel, SoftDeleteCascadeModel):
     _safedelete_policy = SOFT_DELETE_CASCADE
 
     engagement_plan = m.ForeignKey(EngagementPlan, on_delete=m.CASCADE,
@@ -211,8 +284,10 @@ class EngagementPlanProjectItem(TimestampedModel, SafeDeleteModel):
     removed_at = m.DateTimeField(null=True, blank=True)
     reason_removed = m.CharField(max_length=255, blank=True)
 
+    objectives_count = CounterField()
 
-class HCPObjective(TimestampedModel, ApprovableModel, SafeDeleteModel):
+
+class HCPObjective(TimestampedModel, ApprovableModel, DeliverablesCountsModel, SoftDeleteCascadeModel):
     _safedelete_policy = SOFT_DELETE_CASCADE
 
     engagement_plan_item = m.ForeignKey(EngagementPlanHCPItem, on_delete=m.CASCADE,
@@ -228,7 +303,7 @@ class HCPObjective(TimestampedModel, ApprovableModel, SafeDeleteModel):
     description = m.TextField()
 
 
-class ProjectObjective(TimestampedModel, SafeDeleteModel):
+class ProjectObjective(TimestampedModel, DeliverablesCountsModel, SoftDeleteCascadeModel):
     _safedelete_policy = SOFT_DELETE_CASCADE
 
     engagement_plan_item = m.ForeignKey(EngagementPlanProjectItem, on_delete=m.CASCADE,
@@ -250,10 +325,77 @@ QUARTERS_CHOICES = (
 )
 
 
+def get_current_quarter():
+    return math.ceil(timezone.now().month / 3.0)
+
+
+def get_quarter_type(quarter, current_quarter):
+    if quarter == current_quarter:
+        return 'current'
+    elif quarter > current_quarter:
+        return 'future'
+    else:
+        return 'past'
+
+
+class QuarterType(ChoiceEnum):
+    past = 'Past'
+    current = 'Current'
+    future = 'Future'
+
+
+QUARTER_TYPE_LOOKUPS = {
+    QuarterType.past.name: 'lt',
+    QuarterType.current.name: 'exact',
+    QuarterType.future.name: 'gt',
+}
+
+
+class DeliverableQuerySet(SafeDeleteQueryset):
+
+    def filter_quarter_type(self, quarter_type, current_quarter=None):
+        """Deliverables of the past, current or future quarters (a plain
+        comparison of `quarter`, which can use its index).
+        """
+        if current_quarter is None:
+            current_quarter = get_current_quarter()
+        return self.filter(**{'quarter__' + QUARTER_TYPE_LOOKUPS[quarter_type]: current_quarter})
+
+    def with_quarter_type(self, current_quarter=None):
+        """Annotated with their `quarter_type`, computed by the database."""
+        if current_quarter is None:
+            current_quarter = get_current_quarter()
+        return self.annotate(quarter_type=m.Case(
+            m.When(quarter__lt=current_quarter, then=m.Value(QuarterType.past.name)),
+            m.When(quarter=current_quarter, then=m.Value(QuarterType.current.name)),
+            default=m.Value(QuarterType.future.name),
+            output_field=m.CharField(),
+        ))
+
+    def status_rollup(self, *fields, **expressions):
+        """Counts of the deliverables by status (`<status>_count`, and
+        `no_status_count`) grouped by `fields` and named `expressions` (eg.
+        `engagement_plan_id=F('objective__engagement_plan_item__engagement_plan')`),
+        in one aggregation query.
+        """
+        counts = {'deliverables_count': m.Count('pk'),
+                  'no_status_count': m.Count('pk', filter=m.Q(status__isnull=True))}
+        for status in self.model.Status:
+            counts['{}_count'.format(status.name)] = m.Count('pk', filter=m.Q(status=status.name))
+        return (self.order_by().values(*fields, **expressions).annotate(**counts)
+                .order_by(*fields, *expressions))
+
+
 class Deliverable(m.Model):
     class Meta:
         abstract = True
         ordering = ['quarter', 'created_at']
+        # eg. the current quarter deliverables which are behind
+        index_together = (('status', 'quarter'),)
+
+    objects = SafeDeleteManager.from_queryset(DeliverableQuerySet)()
+    all_objects = SafeDeleteAllManager.from_queryset(DeliverableQuerySet)()
+    deleted_objects = SafeDeleteDeletedManager.from_queryset(DeliverableQuerySet)()
 
     quarter = m.PositiveSmallIntegerField(choices=QUARTERS_CHOICES)
     description = m.CharField(max_length=255, blank=True)
@@ -268,14 +410,16 @@ class Deliverable(m.Model):
 
     @property
     def quarter_type(self):
+        if getattr(self, '_quarter_type', None) is not None:
+            return self._quarter_type
         if not hasattr(self, '_current_quarter'):
-            self._current_quarter = math.ceil(timezone.now().month / 3.0)
-        if self.quarter == self._current_quarter:
-            return 'current'
-        elif self.quarter > self._current_quarter:
-            return 'future'
-        else:
-            return 'past'
+            self._current_quarter = get_current_quarter()
+        return get_quarter_type(self.quarter, self._current_quarter)
+
+    @quarter_type.setter
+    def quarter_type(self, value):
+        # set by `DeliverableQuerySet.with_quarter_type()`
+        self._quarter_type = value
 
 
 class HCPDeliverable(Deliverable, TimestampedModel, SafeDeleteModel):
@@ -298,7 +442,7 @@ class ProjectDeliverable(Deliverable, TimestampedModel, SafeDeleteModel):
                              related_name='deliverables')
 
 
-class HCP(TimestampedModel, SafeDeleteModel):
+class HCP(TimestampedModel, CountersModel, SafeDeleteModel):
     _safedelete_policy = SOFT_DELETE
 
     class ContactPreference(ChoiceEnum):
@@ -327,6 +471,8 @@ class HCP(TimestampedModel, SafeDeleteModel):
     city = m.CharField(max_length=255, blank=True)
     country = m.CharField(max_length=255, blank=True)
 
+    interactions_count = CounterField()  # live and archived ones
+
     def __str__(self):
         return "{} {}".format(self.first_name, self.last_name)
 
@@ -335,14 +481,14 @@ class HCP(TimestampedModel, SafeDeleteModel):
                                                             self.first_name,
                                                             self.last_name)
 
-    @property
-    def interactions_count(self):
-        return self.interactions.count()
-
     @property
     def last_interaction(self):
-        li = Interaction.objects.filter(hcp=self).latest('time_of_interaction').time_of_interaction
-        return li
+        # only look into the archive for HCPs without recent interactions
+        try:
+            li = Interaction.objects.filter(hcp=self).latest('time_of_interaction')
+        except Interaction.DoesNotExist:
+            li = ArchivedInteraction.objects.filter(hcp=self).latest('time_of_interaction')
+        return li.time_of_interaction
 
     @property
     def tas_names(self):
@@ -373,11 +519,11 @@ class InteractionPerms(ChoiceEnum):
     list_own_ag_interaction = 'Can list Interactions of own AGs'
 
 
-class Interaction(TimestampedModel, SafeDeleteModel):
+class AbstractInteraction(TimestampedModel, SoftDeleteCascadeModel):
     _safedelete_policy = SOFT_DELETE_CASCADE
 
     class Meta:
-        permissions = InteractionPerms.choices()
+        abstract = True
 
     # TODO: investigate behavior on soft-deleting User and HCP
     # (also considering that HCP does not have safe delete set to be cascading)
@@ -385,10 +531,8 @@ class Interaction(TimestampedModel, SafeDeleteModel):
     user = m.ForeignKey('User', on_delete=m.CASCADE,
                         # limit_choices_to={'groups__name': 'Role MSL'},
                         verbose_name='MSL')
-    hcp = m.ForeignKey('HCP', on_delete=m.CASCADE, related_name='interactions')
     hcp_objective = m.ForeignKey('HCPObjective', on_delete=m.SET_NULL, null=True, blank=True)
     project = m.ForeignKey('Project', on_delete=m.SET_NULL, null=True, blank=True)
-    resources = m.ManyToManyField('Resource', blank=True, related_name='interactions')
 
     time_of_interaction = m.DateTimeField()
     purpose = m.TextField()
@@ -434,6 +578,34 @@ class Interaction(TimestampedModel, SafeDeleteModel):
     no_follow_up_required = m.BooleanField(default=False)
 
 
+class Interaction(AbstractInteraction):
+    """Interactions of the last `settings.INTERACTIONS_LIVE_YEARS` years,
+    older ones get moved to `ArchivedInteraction` by the `archive_interactions`
+    management command.
+    """
+    class Meta:
+        permissions = InteractionPerms.choices()
+
+    hcp = m.ForeignKey('HCP', on_delete=m.CASCADE, related_name='interactions')
+    resources = m.ManyToManyField('Resource', blank=True, related_name='interactions')
+
+    @staticmethod
+    def live_since():
+        """Start of the oldest year still kept in the `Interaction` table."""
+        year = timezone.now().year - settings.INTERACTIONS_LIVE_YEARS + 1
+        return timezone.make_aware(datetime.datetime(year, 1, 1))
+
+
+class ArchivedInteraction(AbstractInteraction):
+    """Interaction of a past year, same ids and fields as in `Interaction`."""
+    class Meta:
+        index_together = (('hcp', 'time_of_interaction'),
+                          ('time_of_interaction',))
+
+    hcp = m.ForeignKey('HCP', on_delete=m.CASCADE, related_name='archived_interactions')
+    resources = m.ManyToManyField('Resource', blank=True, related_name='archived_interactions')
+
+
 class Project(TimestampedModel, SafeDeleteModel):
     _safedelete_policy = SOFT_DELETE
 
@@ -485,6 +657,67 @@ def make_resource_filepath(instance, filename):
                         uuid.uuid4().hex + ext)
 
 
+def get_thumbnail_name(name):
+    """Name of the thumbnail of Resource file `name`."""
+    basename = os.path.splitext(os.path.basename(name))[0]
+    return os.path.join(RESOURCES_DIR, 'thumbnails', basename + '.jpg')
+
+
+def make_content_filepath(checksum, ext):
+    return os.path.join(RESOURCES_DIR, checksum[:2], checksum[2:4], checksum + ext.lower())
+
+
+class StoredFileManager(m.Manager):
+
+    def store(self, open_content, filename):
+        """`StoredFile` with the content read from `open_content()`, stored
+        under a path derived from its sha256 unless the same content is already
+        stored. `open_content` is called once to hash the content, and once
+        more to save it when needed.
+
+        The row is locked until the end of the transaction, which must be the
+        one saving the Resource referencing it, so that `gc_resource_files`
+        can't delete it meanwhile.
+        """
+        reader = HashingReader(open_content())
+        while reader.read(64 * 1024):
+            pass
+        checksum = reader.hexdigest()
+        stored_file = self.select_for_update().filter(sha256=checksum).first()
+        if stored_file is None:
+            ext = os.path.splitext(filename)[1]
+            name = save_stream(resource_storage, make_content_filepath(checksum, ext), open_content())
+            try:
+                with transaction.atomic():
+                    stored_file = self.create(sha256=checksum, name=name, size=reader.size)
+            except IntegrityError:
+                # the same content uploaded concurrently: keep the other copy
+                stored_file = self.select_for_update().get(sha256=checksum)
+                if name != stored_file.name:
+                    resource_storage.delete(name)
+        return stored_file
+
+
+class StoredFile(m.Model):
+    """Content-addressed Resource file, shared by all Resources (soft-deleted
+    ones included) with the same file content. Files no Resource references
+    anymore get removed by the `gc_resource_files` management command.
+    """
+    sha256 = m.CharField(max_length=64, unique=True)
+    name = m.CharField(max_length=255)  # in resource_storage
+    size = m.BigIntegerField()
+    created_at = m.DateTimeField(auto_now_add=True)
+
+    objects = StoredFileManager()
+
+    def __str__(self):
+        return self.name
+
+    @property
+    def ref_count(self):
+        return Resource._base_manager.filter(file=self.name).count()
+
+
 class Resource(TimestampedModel, SafeDeleteModel):
     _safedelete_policy = SOFT_DELETE
 
@@ -498,7 +731,15 @@ class Resource(TimestampedModel, SafeDeleteModel):
     zinc_number_country = m.CharField(max_length=255, blank=True)
 
     url = m.URLField(max_length=255, blank=True)
-    file = m.FileField(upload_to=make_resource_filepath, null=True, blank=True)
+    file = m.FileField(upload_to=make_resource_filepath, storage=resource_storage,
+                       null=True, blank=True, db_index=True)
+
+    # preview of `file`, filled in background (see `update_preview`)
+    mime_type = m.CharField(max_length=255, blank=True, editable=False)
+    file_size = m.BigIntegerField(null=True, blank=True, editable=False)
+    page_count = m.IntegerField(null=True, blank=True, editable=False)
+    thumbnail = m.FileField(storage=resource_storage, null=True, blank=True, editable=False)
+    previewed_file = m.CharField(max_length=255, blank=True, editable=False)
 
     def __str__(self):
         return self.title
@@ -506,6 +747,103 @@ class Resource(TimestampedModel, SafeDeleteModel):
     def __repr__(self):
         return '{}(title="{}")'.format(self.__class__.__name__, self.name)
 
+    @transaction.atomic  # keeps the StoredFile locked until saved
+    def save(self, *args, **kwargs):
+        # newly uploaded file: point to its content-addressed copy instead of
+        # letting FileField store it under a new name
+        if self.file and not self.file._committed:
+            content = self.file.file
+
+            def open_content():
+                content.seek(0)
+                return content
+
+            self.file.name = StoredFile.objects.store(open_content, self.file.name).name
+            self.file._committed = True
+        if not self.file and self.previewed_file:
+            self.mime_type, self.file_size, self.page_count = '', None, None
+            self.thumbnail, self.previewed_file = None, ''
+        super().save(*args, **kwargs)
+        if self.file and self.file.name != self.previewed_file:
+            from .tasks import queue_resource_preview
+            transaction.on_commit(lambda: queue_resource_preview(self.pk))
+
+    def update_preview(self):
+        """Fill the preview fields from the current `file`. Thumbnails are named
+        after the file, so files stored once (see `StoredFile`) get one thumbnail.
+        """
+        name = self.file.name
+        with resource_storage.open(name, 'rb') as f:
+            preview = extract_preview(f, name)
+        thumbnail = preview.pop('thumbnail')
+        if thumbnail:
+            thumbnail_name = get_thumbnail_name(name)
+            if not resource_storage.exists(thumbnail_name):
+                thumbnail_name = resource_storage.save(thumbnail_name, ContentFile(thumbnail))
+            preview['thumbnail'] = thumbnail_name
+        # an update, so that a concurrent change of the file or of other fields is kept
+        Resource.all_objects.filter(pk=self.pk, file=name).update(previewed_file=name, **preview)
+        for field, value in preview.items():
+            setattr(self, field, value)
+        self.previewed_file = name
+
+
+class ResourceUpload(TimestampedModel):
+    """Chunked (resumable) upload of a `Resource` file: chunks are stored
+    as separate files until the upload is finalized into a `Resource`.
+    """
+    id = m.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = m.ForeignKey('User', on_delete=m.CASCADE, related_name='resource_uploads')
+    filename = m.CharField(max_length=255)
+    size = m.BigIntegerField()
+    chunk_size = m.IntegerField()
+    resource = m.ForeignKey(Resource, on_delete=m.SET_NULL, null=True, blank=True)
+
+    def __str__(self):
+        return '{} ({})'.format(self.filename, self.id)
+
+    @property
+    def chunks_count(self):
+        return max(1, math.ceil(self.size / self.chunk_size))
+
+    def get_chunk_size(self, index):
+        """Expected size of chunk `index` (only the last one can be smaller)."""
+        if index == self.chunks_count - 1:
+            return self.size - self.chunk_size * index
+        return self.chunk_size
+
+    def get_chunk_name(self, index):
+        return os.path.join(RESOURCES_DIR, 'uploads', str(self.id), '{:05d}'.format(index))
+
+    def save_chunk(self, index, f):
+        """Store chunk `index` streamed from `f` (reading at most one byte more
+        than expected), returns its actual size and sha256 hex digest.
+        """
+        name = self.get_chunk_name(index)
+        resource_storage.delete(name)
+        reader = HashingReader(f, limit=self.get_chunk_size(index) + 1)
+        save_stream(resource_storage, name, reader)
+        return reader.size, reader.hexdigest()
+
+    def assemble(self):
+        """`StoredFile` with the concatenated chunks."""
+        names = [self.get_chunk_name(i) for i in range(self.chunks_count)]
+        return StoredFile.objects.store(lambda: ChainedReader(resource_storage, names), self.filename)
+
+    def delete_chunks(self):
+        for index in range(self.chunks_count):
+            resource_storage.delete(self.get_chunk_name(index))
+
+
+class ResourceUploadChunk(m.Model):
+    class Meta:
+        unique_together = (('upload', 'index'),)
+
+    upload = m.ForeignKey(ResourceUpload, on_delete=m.CASCADE, related_name='chunks')
+    index = m.IntegerField()
+    size = m.IntegerField()
+    checksum = m.CharField(max_length=64)  # sha256 hex digest
+
 
 class TherapeuticArea(TimestampedModel, SafeDeleteModel):
     _safedelete_policy = SOFT_DELETE
@@ -519,12 +857,67 @@ class TherapeuticArea(TimestampedModel, SafeDeleteModel):
         return '{}(name="{}")'.format(self.__class__.__name__, self.name)
 
 
+class ArchivedRecord(m.Model):
+    """Row moved out of its (hot) table long after being soft-deleted,
+    see `archive_deleted` management command.
+    """
+    class Meta:
+        index_together = (('model', 'object_id'),)
+
+    model = m.CharField(max_length=255)  # eg. "interactionscore.HCP"
+    object_id = m.IntegerField()
+    data = m.TextField()  # JSON of field values (and M2M ids)
+    deleted = m.DateTimeField()
+    archived_at = m.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return '{} #{}'.format(self.model, self.object_id)
+
+
+class HCPMerge(m.Model):
+    """Audit entry of a duplicate HCP merged into another one, see
+    `interactionscore.merging.merge_hcps`.
+    """
+    hcp = m.ForeignKey('HCP', on_delete=m.CASCADE, related_name='merges')
+    # (not hidden: `archive_deleted` keeps the merged HCPs it references)
+    merged_hcp = m.ForeignKey('HCP', on_delete=m.CASCADE, related_name='merged_into')
+    merged_by = m.ForeignKey('User', on_delete=m.SET_NULL, null=True, blank=True, related_name='+')
+    # JSON of the merged HCP's field values and of the moved references counts
+    data = m.TextField()
+    created_at = m.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return 'HCP #{} merged into #{}'.format(self.merged_hcp_id, self.hcp_id)
+
+
 # Users/Auth Models
 #####################################################################
 
 
-class UserManager(SafeDeleteManager, DefaultUserManager):
+class UserQueryset(SoftDeleteCascadeQueryset):
+    # fields in the tokens' scope claim (see jwt_auth)
+    scope_fields = {'is_active', 'is_staff', 'is_superuser'}
+
+    def update(self, **kwargs):
+        if self.scope_fields.isdisjoint(kwargs):
+            return super().update(**kwargs)
+        from .jwt_auth import bump_scope_version
+        user_ids = list(self.values_list('pk', flat=True))
+        rows = super().update(**kwargs)
+        bump_scope_version(user_ids)
+        return rows
+
+    def _bulk_set_deleted(self, deleted):
+        # tokens of these users should not be trusted anymore (see jwt_auth)
+        from .jwt_auth import bump_scope_version
+        user_ids = list(self.values_list('pk', flat=True))
+        super()._bulk_set_deleted(deleted)
+        bump_scope_version(user_ids)
+
+
+class UserManager(SoftDeleteCascadeManager, DefaultUserManager):
     """Define a model manager for User model with no username field."""
+    _queryset_class = UserQueryset
 
     def _create_user(self, email, password, **extra_fields):
         """
@@ -553,7 +946,7 @@ class UserManager(SafeDeleteManager, DefaultUserManager):
         return self._create_user(email, password, **extra_fields)
 
 
-class User(AbstractUser, SafeDeleteModel):
+class User(AbstractUser, SoftDeleteCascadeModel):
     _safedelete_policy = SOFT_DELETE_CASCADE
 
     objects = UserManager()
@@ -567,10 +960,22 @@ class User(AbstractUser, SafeDeleteModel):
                                  help_text='Business position title, eg. "Medical Manager"')
     affiliate_groups = m.ManyToManyField(AffiliateGroup, blank=True, related_name='users')
     tas = m.ManyToManyField(TherapeuticArea, blank=True, related_name='users')
+    # bumped when flags, permissions, AGs or TAs change (see jwt_auth)
+    scope_version = m.PositiveIntegerField(default=0, editable=False)
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []
 
+    def save_base(self, *args, **kwargs):
+        # scope_version is only changed by jwt_auth.bump_scope_version(), the
+        # one in memory can be stale (not in save(): soft-deletes skip it)
+        if not self._state.adding and not kwargs.get('force_insert'):
+            update_fields = kwargs.get('update_fields')
+            if update_fields is None:
+                update_fields = [f.attname for f in self._meta.concrete_fields if not f.primary_key]
+            kwargs['update_fields'] = [name for name in update_fields if name != 'scope_version']
+        super().save_base(*args, **kwargs)
+
     def has_interactions_perm(self, perm):
         """Helper to check our custom perms more succinctly.
 
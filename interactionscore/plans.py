@@ -0,0 +1,141 @@
+"""Read model of a user's current engagement plan (the MSL home screen).
+
+The whole plan (items, objectives, deliverables, HCPs and projects, recent
+interaction counts) is built from one `values()` query per table, and cached
+per user along with its fingerprint (see `interactionscore.fingerprints`):
+it is served from the cache until any of these rows changes.
+"""
+import datetime
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils import timezone
+
+from .fingerprints import get_queryset_fingerprint
+from .models import (
+    EngagementPlan,
+    EngagementPlanHCPItem,
+    EngagementPlanProjectItem,
+    HCP,
+    HCPDeliverable,
+    HCPObjective,
+    Interaction,
+    Project,
+    ProjectDeliverable,
+    ProjectObjective,
+    get_current_quarter,
+    get_quarter_type,
+)
+
+PLAN_RELATED = (
+    'hcp_items',
+    'hcp_items__hcp',
+    'hcp_items__objectives',
+    'hcp_items__objectives__deliverables',
+    'project_items',
+    'project_items__project',
+    'project_items__objectives',
+    'project_items__objectives__deliverables',
+)
+
+PLAN_FIELDS = ('id', 'year', 'approved', 'approved_at', 'created_at', 'updated_at')
+HCP_ITEM_FIELDS = ('id', 'hcp_id', 'reason', 'reason_other', 'approved', 'approved_at',
+                   'removed_at', 'reason_removed')
+PROJECT_ITEM_FIELDS = ('id', 'project_id', 'removed_at', 'reason_removed')
+HCP_OBJECTIVE_FIELDS = ('id', 'engagement_plan_item_id', 'hcp_id', 'description', 'approved',
+                        'bcsf_id', 'medical_plan_objective_id', 'project_id')
+PROJECT_OBJECTIVE_FIELDS = ('id', 'engagement_plan_item_id', 'project_id', 'description',
+                            'bcsf_id', 'medical_plan_objective_id')
+DELIVERABLE_FIELDS = ('id', 'objective_id', 'quarter', 'description', 'status')
+HCP_FIELDS = ('id', 'first_name', 'last_name', 'institution_name', 'city', 'country')
+PROJECT_FIELDS = ('id', 'title', 'type')
+
+
+def get_current_plans(user):
+    return EngagementPlan.objects.filter(user=user, year=timezone.now().year)
+
+
+def get_current_plan_fingerprint(user):
+    today = timezone.now().date()  # quarter types and recent interactions change with it
+    return (
+        today,
+        get_queryset_fingerprint(get_current_plans(user), PLAN_RELATED),
+        get_queryset_fingerprint(Interaction.objects.filter(user=user)),
+    )
+
+
+def group_by(rows, key):
+    groups = defaultdict(list)
+    for row in rows:
+        groups[row.pop(key)].append(row)
+    return groups
+
+
+def get_objectives(objective_model, deliverable_model, fields, item_ids):
+    """Objectives of the items `item_ids` (with their deliverables), by item id."""
+    objectives = list(objective_model.objects.filter(engagement_plan_item_id__in=item_ids).values(*fields))
+    current_quarter = get_current_quarter()
+    deliverables = list(deliverable_model.objects.filter(
+        objective_id__in=[objective['id'] for objective in objectives]).values(*DELIVERABLE_FIELDS))
+    for deliverable in deliverables:
+        deliverable['quarter_type'] = get_quarter_type(deliverable['quarter'], current_quarter)
+    deliverables = group_by(deliverables, 'objective_id')
+    for objective in objectives:
+        objective['deliverables'] = deliverables[objective['id']]
+    return group_by(objectives, 'engagement_plan_item_id')
+
+
+def build_current_plan(user):
+    """The current plan of `user` (`None` if they have none) with its items
+    and the summaries of their HCPs and projects, ready to render.
+
+    `recent_interactions_count` of HCPs counts the user's interactions of the
+    last `CURRENT_PLAN_RECENT_INTERACTIONS_DAYS` days.
+    """
+    plan = get_current_plans(user).order_by('-created_at').values(*PLAN_FIELDS).first()
+    data = {'engagement_plan': plan, 'hcp_items': [], 'project_items': [], 'hcps': [], 'projects': []}
+    if plan is None:
+        return data
+
+    hcp_items = list(EngagementPlanHCPItem.objects.filter(engagement_plan_id=plan['id']).values(*HCP_ITEM_FIELDS))
+    objectives = get_objectives(HCPObjective, HCPDeliverable, HCP_OBJECTIVE_FIELDS,
+                                [item['id'] for item in hcp_items])
+    for item in hcp_items:
+        item['objectives'] = objectives[item['id']]
+    project_items = list(EngagementPlanProjectItem.objects.filter(
+        engagement_plan_id=plan['id']).values(*PROJECT_ITEM_FIELDS))
+    objectives = get_objectives(ProjectObjective, ProjectDeliverable, PROJECT_OBJECTIVE_FIELDS,
+                                [item['id'] for item in project_items])
+    for item in project_items:
+        item['objectives'] = objectives[item['id']]
+
+    hcp_ids = {item['hcp_id'] for item in hcp_items}
+    hcps = list(HCP.objects.filter(id__in=hcp_ids).order_by('last_name', 'first_name').values(*HCP_FIELDS))
+    since = timezone.now() - datetime.timedelta(days=settings.CURRENT_PLAN_RECENT_INTERACTIONS_DAYS)
+    counts = dict(Interaction.objects.filter(user=user, hcp_id__in=hcp_ids, time_of_interaction__gte=since)
+                  .order_by().values_list('hcp_id').annotate(count=Count('id')))
+    for hcp in hcps:
+        hcp['recent_interactions_count'] = counts.get(hcp['id'], 0)
+
+    data.update(
+        hcp_items=hcp_items,
+        project_items=project_items,
+        hcps=hcps,
+        projects=list(Project.objects.filter(id__in={item['project_id'] for item in project_items})
+                      .order_by('title').values(*PROJECT_FIELDS)),
+    )
+    return data
+
+
+def get_current_plan(user):
+    """`build_current_plan(user)`, from the cache when still up to date."""
+    key = 'current-plan-{}'.format(user.pk)
+    fingerprint = get_current_plan_fingerprint(user)
+    cached = cache.get(key)
+    if cached is not None and cached[0] == fingerprint:
+        return cached[1]
+    data = build_current_plan(user)
+    cache.set(key, (fingerprint, data), settings.CURRENT_PLAN_CACHE_TIMEOUT)
+    return data
@@ -0,0 +1,156 @@
+"""Metadata and thumbnail extraction for Resource files.
+
+Thumbnails are made with Pillow (images, and the thumbnail Office documents
+embed), PDF first pages are rendered with poppler's `pdftoppm` when installed.
+"""
+import io
+import mimetypes
+import re
+import shutil
+import subprocess
+import tempfile
+import zipfile
+import zlib
+from xml.etree import ElementTree
+
+from django.conf import settings
+
+OFFICE_APP_PROPERTIES = 'docProps/app.xml'
+OFFICE_THUMBNAIL = 'docProps/thumbnail.jpeg'
+PDF_PAGES_COUNT_RE = re.compile(rb'/Type\s*/Pages\b[^>]*?/Count\s+(\d+)')
+PDF_OBJECT_STREAM_RE = re.compile(rb'/Type\s*/ObjStm\b[^>]*?>>\s*stream\r?\n')
+PDF_SCAN_CHUNK_SIZE = 1024 * 1024
+PDF_SCAN_OVERLAP = 4 * 1024  # longer than the dictionaries looked for
+PDF_MAX_OBJECT_STREAM_SIZE = 1024 * 1024
+
+
+def guess_mime_type(filename):
+    return mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+
+def iter_windows(f):
+    """`(offset, data)` of overlapping windows over the content of `f`, so
+    that it isn't read in memory at once.
+    """
+    start, previous = 0, b''
+    while True:
+        chunk = f.read(PDF_SCAN_CHUNK_SIZE)
+        if not chunk:
+            return
+        tail = previous[-PDF_SCAN_OVERLAP:]
+        yield start - len(tail), tail + chunk
+        start += len(chunk)
+        previous = chunk
+
+
+def read_object_stream(f, offset):
+    """Content of the (FlateDecode) PDF object stream starting at `offset`,
+    at most `PDF_MAX_OBJECT_STREAM_SIZE` bytes of it, `b''` if not readable.
+    """
+    position = f.tell()
+    f.seek(offset)
+    decompressor = zlib.decompressobj()
+    data = b''
+    try:
+        while not decompressor.eof and len(data) < PDF_MAX_OBJECT_STREAM_SIZE:
+            chunk = f.read(64 * 1024)
+            if not chunk:
+                break
+            data += decompressor.decompress(chunk, PDF_MAX_OBJECT_STREAM_SIZE - len(data))
+    except zlib.error:
+        data = b''
+    f.seek(position)
+    return data
+
+
+def get_pdf_page_count(f):
+    # page tree roots have the biggest /Count; they are either plain objects,
+    # or (PDF 1.5+) in compressed object streams
+    counts, object_streams = [], set()
+    for offset, data in iter_windows(f):
+        counts.extend(PDF_PAGES_COUNT_RE.findall(data))
+        for match in PDF_OBJECT_STREAM_RE.finditer(data):
+            start = offset + match.end()
+            if start not in object_streams:  # seen again in the overlap
+                object_streams.add(start)
+                counts.extend(PDF_PAGES_COUNT_RE.findall(read_object_stream(f, start)))
+    return max(int(count) for count in counts) if counts else None
+
+
+def get_page_count(f, mime_type):
+    """Page (or slide) count of PDFs and Office documents, `None` for others."""
+    if mime_type == 'application/pdf':
+        return get_pdf_page_count(f)
+    if zipfile.is_zipfile(f):
+        with zipfile.ZipFile(f) as z:
+            if OFFICE_APP_PROPERTIES not in z.namelist():
+                return None
+            root = ElementTree.fromstring(z.read(OFFICE_APP_PROPERTIES))
+        for element in root:
+            if element.tag.rsplit('}', 1)[-1] in {'Pages', 'Slides'} and element.text:
+                return int(element.text)
+    return None
+
+
+def render_pdf_first_page(f):
+    pdftoppm = shutil.which('pdftoppm')
+    if not pdftoppm:
+        return None
+    # streamed to pdftoppm through a temporary file, which it reads as needed
+    with tempfile.TemporaryFile() as pdf:
+        shutil.copyfileobj(f, pdf)
+        pdf.seek(0)
+        result = subprocess.run(
+            [pdftoppm, '-f', '1', '-l', '1', '-png', '-singlefile',
+             '-scale-to', str(max(settings.RESOURCE_THUMBNAIL_SIZE))],
+            stdin=pdf, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=60)
+    return io.BytesIO(result.stdout) if result.returncode == 0 else None
+
+
+def make_thumbnail(f, mime_type):
+    """JPEG thumbnail (bytes) of the content of `f`, `None` when not supported."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+
+    if mime_type.startswith('image/'):
+        image_file = f
+    elif mime_type == 'application/pdf':
+        image_file = render_pdf_first_page(f)
+    elif zipfile.is_zipfile(f):
+        with zipfile.ZipFile(f) as z:
+            if OFFICE_THUMBNAIL not in z.namelist():
+                return None
+            image_file = io.BytesIO(z.read(OFFICE_THUMBNAIL))
+    else:
+        return None
+    if image_file is None:
+        return None
+
+    try:
+        image = Image.open(image_file)
+        image.thumbnail(settings.RESOURCE_THUMBNAIL_SIZE)
+        output = io.BytesIO()
+        image.convert('RGB').save(output, 'JPEG', quality=80)
+    except (IOError, ValueError):  # not an image Pillow can read
+        return None
+    return output.getvalue()
+
+
+def extract_preview(f, filename):
+    """Dict with `mime_type`, `file_size`, `page_count` and `thumbnail`
+    (JPEG bytes or `None`) of the seekable binary file `f`.
+    """
+    mime_type = guess_mime_type(filename)
+    f.seek(0, io.SEEK_END)
+    file_size = f.tell()
+    f.seek(0)
+    page_count = get_page_count(f, mime_type)
+    f.seek(0)
+    return {
+        'mime_type': mime_type,
+        'file_size': file_size,
+        'page_count': page_count,
+        'thumbnail': make_thumbnail(f, mime_type),
+    }
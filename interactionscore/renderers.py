@@ -0,0 +1,31 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+else:
+    # the options below are new in orjson 3, older versions aren't used
+    if not hasattr(orjson, 'OPT_PASSTHROUGH_DATETIME'):
+        orjson = None
+
+if orjson is not None:
+    # datetimes go through DRF's encoder (same format as `JSONRenderer`),
+    # like the types orjson doesn't know (Decimal, lazy strings, querysets...)
+    ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+    json_encoder = JSONEncoder()
+
+
+class ORJSONRenderer(JSONRenderer):
+    """`JSONRenderer` using orjson when installed, for compact output
+    (indented output, eg. for the browsable API, is rendered by DRF).
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or data is None or
+                self.get_indent(accepted_media_type, renderer_context or {})):
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = orjson.dumps(data, default=json_encoder.default, option=ORJSON_OPTIONS)
+        # escaped for use in JavaScript, like `JSONRenderer` does
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
@@ -0,0 +1,41 @@
+"""TA/AG scope filtering with EXISTS subqueries on the many to many through
+tables, instead of joins: rows aren't duplicated, so the (wide) results
+don't need to be made `distinct()` before being paginated.
+"""
+from django.db.models import Exists, OuterRef, Q
+
+
+def m2m_exists(model, field_name, values):
+    """EXISTS subquery of whether a `model` row is related to any of `values`
+    (ids or a queryset) through its many to many field `field_name`.
+    """
+    field = model._meta.get_field(field_name)
+    through = field.remote_field.through
+    return Exists(through.objects.filter(**{
+        field.m2m_field_name(): OuterRef('pk'),
+        field.m2m_reverse_field_name() + '__in': values,
+    }))
+
+
+def filter_m2m(queryset, **lookups):
+    """Filter `queryset` on its rows related to any of the values of any of the
+    `<many to many field>=<ids or queryset>` lookups.
+
+    Call it once per lookup for rows matching all of them.
+    """
+    condition = Q()
+    for field_name, values in lookups.items():
+        # filtering on Exists() directly is only supported from Django 3.0
+        alias = '_{}_exists_{}'.format(field_name, len(queryset.query.annotations))
+        queryset = queryset.annotate(**{alias: m2m_exists(queryset.model, field_name, values)})
+        condition |= Q(**{alias: True})
+    return queryset.filter(condition)
+
+
+def filter_in(queryset, field_name, values):
+    """Filter `queryset` on its rows whose foreign key or many to many field
+    `field_name` is any of `values` (ids or a queryset).
+    """
+    if queryset.model._meta.get_field(field_name).many_to_many:
+        return filter_m2m(queryset, **{field_name: values})
+    return queryset.filter(**{field_name + '__in': values})
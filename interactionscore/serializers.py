@@ -1,3 +1,8 @@
+import os
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.urls import reverse
 from django.utils.text import camel_case_to_spaces
 from rest_framework import serializers
 from collections import defaultdict, OrderedDict
@@ -16,6 +21,7 @@ from .models import (
     AffiliateGroup,
     TherapeuticArea,
     Resource,
+    ResourceUpload,
     Project,
     Interaction,
     User,
@@ -181,6 +187,33 @@ class CommentSerializer(serializers.ModelSerializer):
         )
 
 
+class CommentAuthorSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = (
+            'id',
+            'email',
+            'first_name',
+            'last_name',
+        )
+
+
+class CommentFeedSerializer(serializers.ModelSerializer):
+    user = CommentAuthorSerializer(read_only=True)
+
+    class Meta:
+        model = Comment
+        fields = (
+            'id',
+            'user',
+        ) + Comment.TARGET_FIELDS + (
+            'message',
+            'created_at',
+            'updated_at',
+        )
+        read_only_fields = fields
+
+
 class BrandCriticalSuccessFactorSerializer(serializers.ModelSerializer):
     class Meta:
         model = BrandCriticalSuccessFactor
@@ -238,8 +271,32 @@ class TherapeuticAreaSerializer(serializers.ModelSerializer):
         fields = ('id', 'name')
 
 
+class ResourceFileField(serializers.FileField):
+    """Represented by the (access controlled) `url_name` URL of the Resource,
+    versioned by the file name when `versioned` (so that it can be cached).
+    """
+
+    def __init__(self, url_name='resource-download', versioned=False, **kwargs):
+        self.url_name = url_name
+        self.versioned = versioned
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        url = reverse(self.url_name, args=[value.instance.pk])
+        if self.versioned:
+            url += '?' + urlencode({'v': os.path.splitext(os.path.basename(value.name))[0]})
+        request = self.context.get('request', None)
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+
 class ResourceSerializer(serializers.ModelSerializer):
     user_id = serializers.IntegerField()
+    file = ResourceFileField(required=False, allow_null=True)
+    thumbnail = ResourceFileField(url_name='resource-thumbnail', versioned=True, read_only=True)
 
     class Meta:
         model = Resource
@@ -252,17 +309,61 @@ class ResourceSerializer(serializers.ModelSerializer):
             'zinc_number_global',
             'url',
             'file',
+            'mime_type',
+            'file_size',
+            'page_count',
+            'thumbnail',
             'affiliate_groups',
             'tas',
             'created_at',
             'updated_at',
         )
         read_only_fields = (
+            'mime_type',
+            'file_size',
+            'page_count',
             'created_at',
             'updated_at',
         )
 
 
+class ResourceUploadSerializer(serializers.ModelSerializer):
+    received_chunks = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ResourceUpload
+        fields = (
+            'id',
+            'filename',
+            'size',
+            'chunk_size',
+            'chunks_count',
+            'received_chunks',
+            'resource_id',
+            'created_at',
+        )
+        read_only_fields = (
+            'chunk_size',
+            'chunks_count',
+            'resource_id',
+            'created_at',
+        )
+
+    def get_received_chunks(self, obj):
+        return sorted(obj.chunks.values_list('index', flat=True))
+
+    def validate_size(self, value):
+        if not 0 < value <= settings.RESOURCE_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(
+                'Size should be between 1 and {} bytes.'.format(settings.RESOURCE_UPLOAD_MAX_SIZE))
+        return value
+
+    def create(self, validated_data):
+        validated_data['user'] = self.context['request'].user
+        validated_data['chunk_size'] = settings.RESOURCE_UPLOAD_CHUNK_SIZE
+        return super().create(validated_data)
+
+
 class HCPSerializer(serializers.ModelSerializer):
     class Meta:
         model = HCP
@@ -324,6 +425,15 @@ class HCPDeliverableSerializer(serializers.ModelSerializer):
         extra_kwargs = {'id': {'read_only': False, 'required': False}}
 
 
+class HCPDeliverableListSerializer(HCPDeliverableSerializer):
+    hcp_id = serializers.IntegerField(source='objective.hcp_id', read_only=True)
+    engagement_plan_id = serializers.IntegerField(
+        source='objective.engagement_plan_item.engagement_plan_id', read_only=True)
+
+    class Meta(HCPDeliverableSerializer.Meta):
+        fields = HCPDeliverableSerializer.Meta.fields + ('hcp_id', 'engagement_plan_id')
+
+
 class HCPObjectiveSerializer(NestedWritableFieldsSerializerMixin, serializers.ModelSerializer):
     hcp_id = serializers.IntegerField()
     engagement_plan_item_id = serializers.IntegerField(required=False)
@@ -344,6 +454,10 @@ class HCPObjectiveSerializer(NestedWritableFieldsSerializerMixin, serializers.Mo
             'medical_plan_objective_id',
             'project_id',
             'deliverables',
+            'deliverables_count',
+            'on_track_deliverables_count',
+            'slightly_behind_deliverables_count',
+            'major_issue_deliverables_count',
             'comments',
             'created_at',
             'updated_at',
@@ -387,6 +501,15 @@ class ProjectDeliverableSerializer(serializers.ModelSerializer):
         extra_kwargs = {'id': {'read_only': False, 'required': False}}
 
 
+class ProjectDeliverableListSerializer(ProjectDeliverableSerializer):
+    project_id = serializers.IntegerField(source='objective.project_id', read_only=True)
+    engagement_plan_id = serializers.IntegerField(
+        source='objective.engagement_plan_item.engagement_plan_id', read_only=True)
+
+    class Meta(ProjectDeliverableSerializer.Meta):
+        fields = ProjectDeliverableSerializer.Meta.fields + ('project_id', 'engagement_plan_id')
+
+
 class ProjectObjectiveSerializer(NestedWritableFieldsSerializerMixin, serializers.ModelSerializer):
     project_id = serializers.IntegerField()
     engagement_plan_item_id = serializers.IntegerField(required=False)
@@ -403,6 +526,10 @@ class ProjectObjectiveSerializer(NestedWritableFieldsSerializerMixin, serializer
             'bcsf_id',
             'medical_plan_objective_id',
             'deliverables',
+            'deliverables_count',
+            'on_track_deliverables_count',
+            'slightly_behind_deliverables_count',
+            'major_issue_deliverables_count',
             'comments',
             'created_at',
             'updated_at',
@@ -435,6 +562,7 @@ class EngagementPlanHCPItemSerializer(NestedWritableFieldsSerializerMixin, seria
             'hcp',
             'hcp_id',
             'objectives',
+            'objectives_count',
             'comments',
             'reason',
             'reason_other',
@@ -473,6 +601,7 @@ class EngagementPlanProjectItemItemSerializer(NestedWritableFieldsSerializerMixi
             'created_at',
             'updated_at',
             'objectives',
+            'objectives_count',
             'comments',
         )
         extra_kwargs = {'id': {'read_only': False, 'required': False}}
@@ -497,7 +626,10 @@ class EngagementPlanSerializer(NestedWritableFieldsSerializerMixin, serializers.
             'approved',
             'approved_at',
             'hcp_items',
+            'hcp_items_count',
+            'approved_hcp_items_count',
             'project_items',
+            'project_items_count',
             'created_at',
             'updated_at',
         )
@@ -0,0 +1,138 @@
+import operator
+from collections import OrderedDict
+from functools import reduce
+
+from django.db import models as m, transaction
+from django.db.models import Q
+from django.utils import timezone
+from safedelete.config import SOFT_DELETE, SOFT_DELETE_CASCADE
+from safedelete.managers import SafeDeleteManager, SafeDeleteAllManager, SafeDeleteDeletedManager
+from safedelete.models import SafeDeleteModel, is_safedelete_cls
+from safedelete.queryset import SafeDeleteQueryset
+
+
+def cascade_conditions(model, pks, path=()):
+    """Yield `(related_model, Q)` for all rows that Django would delete
+    along with the rows of `model` whose pks are selected by the `pks` subquery,
+    ie. everything reachable through `on_delete=CASCADE` FKs, recursively.
+
+    Each `Q` only references its parent's rows through a nested subquery, so
+    nothing gets loaded in Python.
+    """
+    path = path + (model,)
+    for rel in model._meta.related_objects:
+        if rel.many_to_many or rel.on_delete is not m.CASCADE:
+            continue
+        related_model = rel.related_model
+        if related_model in path:
+            continue
+        condition = Q(**{rel.field.name + '__in': pks})
+        yield related_model, condition
+        related_pks = related_model._base_manager.filter(condition).values('pk')
+        yield from cascade_conditions(related_model, related_pks, path)
+
+
+def update_descendants(queryset, only_deleted=False, **values):
+    """Apply `values` to the safedelete rows cascading from the rows of
+    `queryset`, with one UPDATE per related table (instead of loading and
+    saving each related object like safedelete's `SOFT_DELETE_CASCADE` does).
+
+    `updated_at`-like (`auto_now`) fields are bumped as well, as a `save()`
+    would have done, and the counters of the related rows' parents are
+    recounted. No `pre_softdelete`/`post_softdelete`/`post_undelete` signals
+    are sent for the related rows.
+    """
+    from .counters import recount_parents
+    conditions = OrderedDict()
+    for model, condition in cascade_conditions(queryset.model, queryset.values('pk')):
+        if is_safedelete_cls(model):
+            conditions.setdefault(model, []).append(condition)
+
+    now = timezone.now()
+    for model, model_conditions in conditions.items():
+        model_values = dict(values)
+        for field in model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False):
+                model_values[field.attname] = now
+        related = model._base_manager.filter(reduce(operator.or_, model_conditions))
+        qs = related.filter(deleted__isnull=False) if only_deleted else related
+        qs.update(**model_values)
+        recount_parents(model, related)
+
+
+class SoftDeleteCascadeQueryset(SafeDeleteQueryset):
+    """`SafeDeleteQueryset` doing `delete()`/`undelete()` of `SOFT_DELETE_CASCADE`
+    models with a few UPDATE queries instead of per object cascades.
+    """
+
+    def _policy(self, force_policy):
+        return self.model._safedelete_policy if force_policy is None else force_policy
+
+    def delete(self, force_policy=None):
+        if self._policy(force_policy) != SOFT_DELETE_CASCADE:
+            return super().delete(force_policy=force_policy)
+        self._bulk_set_deleted(timezone.now())
+    delete.alters_data = True
+
+    def undelete(self, force_policy=None):
+        if self._policy(force_policy) != SOFT_DELETE_CASCADE:
+            return super().undelete(force_policy=force_policy)
+        self._bulk_set_deleted(None)
+    undelete.alters_data = True
+
+    def _bulk_set_deleted(self, deleted):
+        from .counters import recount_parents
+        assert self.query.can_filter(), "Cannot use 'limit' or 'offset' with delete/undelete."
+        roots = self.all()
+        roots._filter_visibility()
+        with transaction.atomic(using=self.db):
+            # loaded, `roots` won't select them anymore to recount their parents
+            root_pks = list(roots.values_list('pk', flat=True))
+            # related rows first: `roots` still selects by deleted state
+            update_descendants(roots, only_deleted=deleted is None, deleted=deleted)
+            values = {'deleted': deleted}
+            if any(f.attname == 'updated_at' for f in self.model._meta.concrete_fields):
+                values['updated_at'] = timezone.now()
+            self.model._base_manager.filter(pk__in=roots.values('pk')).update(**values)
+            recount_parents(self.model, self.model._base_manager.filter(pk__in=root_pks))
+        self._result_cache = None
+
+
+class SoftDeleteCascadeManager(SafeDeleteManager):
+    _queryset_class = SoftDeleteCascadeQueryset
+
+
+class SoftDeleteCascadeModel(SafeDeleteModel):
+    """Safedelete model with `SOFT_DELETE_CASCADE` policy, cascading with set
+    based updates of the related tables.
+
+    The object itself is still soft-deleted/undeleted through `save()`, so its
+    signals are sent as usual.
+    """
+    _safedelete_policy = SOFT_DELETE_CASCADE
+
+    objects = SoftDeleteCascadeManager()
+    all_objects = SafeDeleteAllManager(SoftDeleteCascadeQueryset)
+    deleted_objects = SafeDeleteDeletedManager(SoftDeleteCascadeQueryset)
+
+    class Meta:
+        abstract = True
+
+    def _policy(self, force_policy):
+        return self._safedelete_policy if force_policy is None else force_policy
+
+    def delete(self, force_policy=None, **kwargs):
+        if self._policy(force_policy) != SOFT_DELETE_CASCADE:
+            return super().delete(force_policy=force_policy, **kwargs)
+        with transaction.atomic():
+            super().delete(force_policy=SOFT_DELETE, **kwargs)
+            update_descendants(self.__class__._base_manager.filter(pk=self.pk),
+                               deleted=self.deleted)
+
+    def undelete(self, force_policy=None, **kwargs):
+        if self._policy(force_policy) != SOFT_DELETE_CASCADE:
+            return super().undelete(force_policy=force_policy, **kwargs)
+        with transaction.atomic():
+            super().undelete(force_policy=SOFT_DELETE, **kwargs)
+            update_descendants(self.__class__._base_manager.filter(pk=self.pk),
+                               only_deleted=True, deleted=None)
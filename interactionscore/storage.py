@@ -0,0 +1,173 @@
+import hashlib
+import mimetypes
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import get_storage_class
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.http import FileResponse, HttpResponse
+from django.utils.deconstruct import deconstructible
+from django.utils.encoding import escape_uri_path
+
+
+@lru_cache()
+def get_resource_storage():
+    """Storage of `Resource` files, as configured by `settings.RESOURCES_STORAGE`
+    (dotted path of any Django storage class, eg. a S3 one) and
+    `settings.RESOURCES_STORAGE_OPTIONS`.
+    """
+    storage_class = get_storage_class(settings.RESOURCES_STORAGE)
+    return storage_class(**settings.RESOURCES_STORAGE_OPTIONS)
+
+
+@receiver(setting_changed)
+def reset_resource_storage(setting, **kwargs):
+    if setting in {'RESOURCES_STORAGE', 'RESOURCES_STORAGE_OPTIONS'}:
+        get_resource_storage.cache_clear()
+
+
+@deconstructible
+class ResourceStorage:
+    """Proxy to `get_resource_storage()`, so that the configured storage is
+    picked at runtime and stays out of migrations.
+    """
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(get_resource_storage(), name)
+
+
+resource_storage = ResourceStorage()
+
+
+class HashingReader:
+    """Read-only file-like wrapper computing the sha256 and size of what is
+    read through it, reading at most `limit` bytes (when given).
+    """
+    def __init__(self, f, limit=None):
+        self.f = f
+        self.limit = limit
+        self.size = 0
+        self._hash = hashlib.sha256()
+
+    def read(self, size=-1):
+        if self.limit is not None:
+            left = self.limit - self.size
+            size = left if size is None or size < 0 else min(size, left)
+        data = self.f.read(size) if size != 0 else b''
+        self.size += len(data)
+        self._hash.update(data)
+        return data
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+
+class ChainedReader:
+    """Read-only file-like concatenation of the `names` files of `storage`."""
+    def __init__(self, storage, names):
+        self.storage = storage
+        self.names = list(names)
+        self.f = None
+
+    def read(self, size=-1):
+        data = b''
+        while size is None or size < 0 or len(data) < size:
+            if self.f is None:
+                if not self.names:
+                    break
+                self.f = self.storage.open(self.names.pop(0), 'rb')
+            piece = self.f.read(-1 if size is None or size < 0 else size - len(data))
+            if not piece:
+                self.f.close()
+                self.f = None
+            data += piece
+        return data
+
+
+def save_stream(storage, name, reader):
+    """Save what `reader` yields to `storage` without loading it in memory,
+    returns the actual name used by the storage.
+    """
+    return storage.save(name, File(reader, name))
+
+
+class LimitedReader:
+    """Read-only file-like wrapper reading at most `limit` bytes of `f`."""
+    def __init__(self, f, limit):
+        self.f = f
+        self.left = limit
+
+    def read(self, size=-1):
+        size = self.left if size is None or size < 0 else min(size, self.left)
+        data = self.f.read(size) if size else b''
+        self.left -= len(data)
+        return data
+
+    def close(self):
+        self.f.close()
+
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def parse_range(header, size):
+    """`(start, end)` (inclusive) byte positions of a single range `Range`
+    header, `None` for a missing or unsupported (multiple ranges) header.
+    Raises `ValueError` for unsatisfiable ranges.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match or match.group(1) == match.group(2) == '':
+        return None
+    first, last = match.groups()
+    if first == '':  # suffix range: last `last` bytes
+        start, end = max(0, size - int(last)), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        raise ValueError(header)
+    return start, end
+
+
+def file_response(request, field_file, filename, as_attachment=True):
+    """Response sending the file of `field_file` (as an attachment when
+    `as_attachment`) named `filename`.
+
+    With `settings.RESOURCES_X_ACCEL_REDIRECT_PREFIX` set (an `internal` nginx
+    location aliasing `MEDIA_ROOT`) nginx does the transfer, ranges included.
+    Otherwise the file is streamed from the storage (through the server's
+    `wsgi.file_wrapper`, ie. sendfile, for whole local files), honoring single
+    `Range` requests.
+    """
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    prefix = settings.RESOURCES_X_ACCEL_REDIRECT_PREFIX
+    if prefix:
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = escape_uri_path(prefix.rstrip('/') + '/' + field_file.name)
+    else:
+        size = field_file.size
+        try:
+            byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = 'bytes */{}'.format(size)
+            return response
+        f = field_file.storage.open(field_file.name, 'rb')
+        if byte_range:
+            start, end = byte_range
+            f.seek(start)
+            response = FileResponse(LimitedReader(f, end - start + 1), status=206,
+                                    content_type=content_type)
+            response['Content-Range'] = 'bytes {}-{}/{}'.format(start, end, size)
+            response['Content-Length'] = end - start + 1
+        else:
+            response = FileResponse(f, content_type=content_type)
+            response['Content-Length'] = size
+        response['Accept-Ranges'] = 'bytes'
+    response['Content-Disposition'] = '{}; filename="{}"'.format(
+        'attachment' if as_attachment else 'inline', filename)
+    return response
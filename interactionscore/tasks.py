@@ -0,0 +1,25 @@
+import logging
+
+from celery import shared_task
+
+from .models import Resource
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def generate_resource_preview(resource_id):
+    """Fill the preview fields of a Resource, unless already done for its current file."""
+    resource = Resource.all_objects.filter(pk=resource_id).first()
+    if resource is not None and resource.file and resource.file.name != resource.previewed_file:
+        resource.update_preview()
+
+
+def queue_resource_preview(resource_id):
+    """Queue `generate_resource_preview`, only logging broker errors (eg. none
+    reachable): the `generate_resource_previews` command fills it later.
+    """
+    try:
+        generate_resource_preview.delay(resource_id)
+    except Exception:
+        logger.exception('Could not queue the preview of Resource %s', resource_id)
@@ -0,0 +1,68 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from .common import BaseAPITestCase
+from interactionscore.models import HCP
+
+
+class TestHCPAutocomplete(BaseAPITestCase):
+
+    url = reverse('hcp-autocomplete')
+
+    def setUp(self):
+        cache.clear()  # indexes built in previous tests have rolled back HCPs
+        self.mueller = HCP.objects.create(first_name='Anna', last_name='Müller',
+                                          institution_name='Charité Berlin')
+        self.miller = HCP.objects.create(first_name='John', last_name='Miller',
+                                         institution_name='Mount Sinai')
+        self.milton = HCP.objects.create(first_name='Ann', last_name='Milton',
+                                         institution_name='Berlin Clinic')
+        for hcp in (self.mueller, self.miller, self.milton):
+            hcp.affiliate_groups.set([self.ag1])
+            hcp.tas.set([self.ta1])
+        self.client.force_authenticate(self.superuser)
+
+    def _search(self, q, **params):
+        res = self.client.get(self.url, dict(params, q=q))
+        assert res.status_code == status.HTTP_200_OK
+        return [tuple(row) for row in res.json()]
+
+    def test_prefixes(self):
+        assert self._search('mi') == [
+            (self.miller.id, 'John Miller', 'Mount Sinai'),
+            (self.milton.id, 'Ann Milton', 'Berlin Clinic'),
+        ]
+        # accents ignored, each word must match
+        assert [row[0] for row in self._search('MUL')] == [self.mueller.id]
+        assert [row[0] for row in self._search('ann berl')] == [self.milton.id, self.mueller.id]
+        assert self._search('ann sinai') == []
+        assert self._search('') == []
+        assert len(self._search('ann', limit=1)) == 1
+
+        res = self.client.get(self.url, {'q': 'ann', 'limit': 'all'})
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+        res = self.client.get(self.url, {'q': 'ann', 'limit': 1000})
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_index_refreshed(self):
+        self._search('mil')
+        with CaptureQueriesContext(connection) as queries:
+            self._search('mil')
+        assert not any('interactionscore_hcp' in q['sql'] for q in queries.captured_queries)
+
+        self.miller.last_name = 'Smith'
+        self.miller.save()
+        self.milton.delete()
+        assert self._search('mil') == []
+        assert [row[0] for row in self._search('smi')] == [self.miller.id]
+
+    def test_user_scope(self):
+        self.client.force_authenticate(self.user_msl1)  # ag1, no TAs
+        assert self._search('ann') == []
+
+        self.user_msl1.tas.add(self.ta1)
+        self.milton.tas.set([self.ta2])
+        assert [row[0] for row in self._search('ann')] == [self.mueller.id]
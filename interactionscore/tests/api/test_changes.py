@@ -0,0 +1,126 @@
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from .common import BaseAPITestCase
+from interactionscore.changes import CacheBackend, LocalBackend, check_shared_cache, get_backend
+from interactionscore.models import Comment, EngagementPlan, HCPObjective
+
+
+def run_on_commit():
+    # the test case's transaction is never committed
+    callbacks, connection.run_on_commit = connection.run_on_commit, []
+    for savepoint_ids, callback in callbacks:
+        callback()
+
+
+class TestChangesAPI(BaseAPITestCase):
+
+    url = reverse('changes')
+
+    def setUp(self):
+        run_on_commit()  # the fixtures' changes
+        cache.clear()
+        self.client.force_authenticate(self.user_man1)
+
+    def _get(self, **params):
+        res = self.client.get(self.url, dict(params, timeout=0))
+        assert res.status_code == status.HTTP_200_OK
+        return res.json()
+
+    def test_changes(self):
+        cursor = self._get()['cursor']
+        ep = EngagementPlan.objects.get(pk=self.ep1.pk)
+        ep.approve()
+        objective = HCPObjective.objects.get(description='hcp 2 obj desc')
+        comment = Comment.objects.create(user=self.user_man1, hcp_objective=objective, message='late')
+        Comment.objects.create(user=self.user_man1, message='on nothing')
+        run_on_commit()
+
+        data = self._get(cursor=cursor)
+        assert data['events'] == [
+            {'model': 'engagementplan', 'id': ep.id, 'action': 'updated', 'engagement_plan': ep.id},
+            {'model': 'comment', 'id': comment.id, 'action': 'created', 'engagement_plan': ep.id},
+        ]
+        assert (data['cursor'], data['missed']) == (cursor + 2, False)
+        assert self._get(cursor=data['cursor'])['events'] == []
+
+        comment.delete()
+        run_on_commit()
+        assert self._get(cursor=data['cursor'])['events'] == [
+            {'model': 'comment', 'id': comment.id, 'action': 'deleted', 'engagement_plan': ep.id}]
+
+    def test_scope(self):
+        cursor = self._get()['cursor']
+        self.ep1.hcp_items.create(hcp=self.hcp3, reason='other')
+        run_on_commit()
+        for user, count in ((self.user_msl1, 1), (self.user_msl2, 0), (self.user_man3, 0), (self.superuser, 1)):
+            self.client.force_authenticate(user)
+            assert len(self._get(cursor=cursor)['events']) == count
+
+    def test_missed(self):
+        cursor = self._get()['cursor']
+        for year in (2019, 2020, 2021):
+            EngagementPlan.objects.create(user=self.user_msl1, year=year)
+        run_on_commit()
+        cache.delete(get_backend().get_event_key(cursor + 1))  # expired
+        data = self._get(cursor=cursor)
+        assert len(data['events']) == 2
+        assert data['missed']
+
+    @override_settings(API_MAX_CONCURRENT_REQUESTS=1)
+    def test_concurrent_requests(self):
+        # waiting in another tab
+        cache.set('throttle_concurrent_{}'.format(self.user_man1.id), 1)
+        self._get()
+
+    def test_invalid_parameters(self):
+        res = self.client.get(self.url, {'cursor': 'last', 'timeout': 3600})
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+        assert set(res.json()) == {'cursor', 'timeout'}
+
+
+class TestBackends:
+
+    def _test_backend(self, backend):
+        cursor, events, missed = backend.read(None, 0)
+        assert (events, missed) == ([], False)
+        threading.Timer(0.1, backend.publish, ({'id': 1},)).start()
+        start = time.monotonic()
+        assert backend.read(cursor, 5) == (cursor + 1, [{'id': 1}], False)
+        assert time.monotonic() - start < 2
+        assert backend.read(cursor + 1, 0) == (cursor + 1, [], False)
+
+    def test_local(self):
+        self._test_backend(LocalBackend())
+
+    def test_local_buffer(self):
+        backend = LocalBackend(buffer_size=2)
+        for number in range(3):
+            backend.publish({'id': number})
+        assert backend.read(0, 0) == (3, [{'id': 1}, {'id': 2}], True)
+
+    def test_cache(self):
+        self._test_backend(CacheBackend(poll_interval=0.05))
+
+    def test_check_shared_cache(self):
+        # the tests' local memory cache
+        assert [warning.id for warning in check_shared_cache(None)] == ['interactionscore.W001']
+        with override_settings(CHANGES_BACKEND='interactionscore.changes.LocalBackend'):
+            assert check_shared_cache(None) == []
+        with override_settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'cache'}}):
+            assert check_shared_cache(None) == []
+
+    def test_cache_max_events(self):
+        backend = CacheBackend(max_events=2)
+        cursor = backend.read(None, 0)[0]
+        for number in range(3):
+            backend.publish({'id': number})
+        assert backend.read(cursor, 0) == (cursor + 3, [{'id': 1}, {'id': 2}], True)
+        assert backend.read(cursor + 1, 0) == (cursor + 3, [{'id': 1}, {'id': 2}], False)
@@ -0,0 +1,79 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from .common import BaseAPITestCase
+from interactionscore.models import Comment, HCPDeliverable, HCPObjective
+
+
+class TestCommentsAPI(BaseAPITestCase):
+
+    url = reverse('comment-list')
+
+    def setUp(self):
+        self.objective = HCPObjective.objects.get(description='hcp 2 obj desc')
+        deliverable = self.objective.deliverables.first()
+        self.on_plan = Comment.objects.create(user=self.user_man1, engagement_plan=self.ep1, message='plan')
+        self.on_item = Comment.objects.create(user=self.user_msl1, message='item',
+                                              engagement_plan_project_item=self.ep1.project_items.first())
+        self.on_objective = Comment.objects.create(user=self.user_msl1, hcp_objective=self.objective,
+                                                   message='objective')
+        self.on_deliverable = Comment.objects.create(user=self.user_man1, hcp_deliverable=deliverable,
+                                                     message='deliverable')
+        self.on_nothing = Comment.objects.create(user=self.superuser, message='nothing')
+        self.client.force_authenticate(self.user_msl1)
+
+    def _ids(self, **params):
+        res = self.client.get(self.url, params)
+        assert res.status_code == status.HTTP_200_OK
+        return [comment['id'] for comment in res.json()['results']]
+
+    def test_plan_feed(self):
+        res = self.client.get(self.url, {'engagement_plan': self.ep1.id})
+        assert res.status_code == status.HTTP_200_OK
+        data = res.json()
+        assert [c['message'] for c in data['results']] == ['deliverable', 'objective', 'item', 'plan']
+        assert data['results'][0]['user'] == {'id': self.user_man1.id, 'email': 'man.1@test.com',
+                                              'first_name': '', 'last_name': ''}
+        assert data['results'][0]['hcp_deliverable'] == self.on_deliverable.hcp_deliverable_id
+
+        assert self._ids() == [self.on_deliverable.id, self.on_objective.id, self.on_item.id, self.on_plan.id]
+        assert self._ids(engagement_plan=self.ep1.id, target='engagement_plan') == [self.on_plan.id]
+        assert self._ids(hcp_objective=self.objective.id) == [self.on_objective.id]
+        assert self._ids(user=self.user_man1.id) == [self.on_deliverable.id, self.on_plan.id]
+
+        # comments on deleted rows are left out
+        HCPDeliverable.objects.get(pk=self.on_deliverable.hcp_deliverable_id).delete()
+        assert self.on_deliverable.id not in self._ids(engagement_plan=self.ep1.id)
+
+    def test_scope(self):
+        self.client.force_authenticate(self.user_msl2)
+        assert self._ids() == []
+        assert self._ids(engagement_plan=self.ep1.id) == []
+        self.client.force_authenticate(self.superuser)
+        assert self._ids()[0] == self.on_nothing.id
+        assert len(self._ids(engagement_plan=self.ep1.id)) == 4
+
+    def test_constant_queries(self):
+        self._ids()  # caches the user's permissions
+        with CaptureQueriesContext(connection) as queries:
+            self._ids()
+        for user in (self.user_msl2, self.user_man2, self.superuser):
+            Comment.objects.create(user=user, hcp_objective=self.objective, message='more')
+        with CaptureQueriesContext(connection) as more_queries:
+            assert len(self._ids()) == 7
+        assert len(more_queries) == len(queries)
+
+    def test_admin_changelist(self):
+        self.client.force_login(self.superuser)
+        url = reverse('admin:interactionscore_comment_changelist')
+        with CaptureQueriesContext(connection) as queries:
+            assert self.client.get(url).status_code == status.HTTP_200_OK
+        Comment.objects.create(user=self.user_msl2, hcp_deliverable=self.on_deliverable.hcp_deliverable,
+                               message='more')
+        Comment.objects.create(user=self.user_msl2, engagement_plan_hcp_item=self.ep1.hcp_items.first(),
+                               message='more')
+        with CaptureQueriesContext(connection) as more_queries:
+            assert self.client.get(url).status_code == status.HTTP_200_OK
+        assert len(more_queries) == len(queries)
@@ -0,0 +1,67 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from .common import BaseAPITestCase
+from interactionscore.models import EngagementPlan, HCPDeliverable
+
+
+class TestCurrentPlanAPI(BaseAPITestCase):
+
+    url = reverse('users-current-plan')
+
+    def setUp(self):
+        cache.clear()
+        EngagementPlan.objects.filter(pk=self.ep1.pk).update(year=timezone.now().year)
+        self.client.force_authenticate(self.user_msl1)
+
+    def _get(self):
+        res = self.client.get(self.url)
+        assert res.status_code == status.HTTP_200_OK
+        return res.json()
+
+    def test_current_plan(self):
+        data = self._get()
+        assert data['engagement_plan']['id'] == self.ep1.id
+        assert [item['hcp_id'] for item in data['hcp_items']] == [self.hcp1.id, self.hcp2.id]
+        objectives = data['hcp_items'][1]['objectives']
+        assert [o['description'] for o in objectives] == ['hcp 2 obj desc']
+        assert [d['quarter'] for d in objectives[0]['deliverables']] == [2, 3]
+        assert {d['quarter_type'] for d in objectives[0]['deliverables']} <= {'past', 'current', 'future'}
+        assert len(data['project_items'][0]['objectives'][1]['deliverables']) == 4
+        hcps = {hcp['id']: hcp for hcp in data['hcps']}
+        assert hcps[self.hcp1.id]['recent_interactions_count'] == 1
+        assert hcps[self.hcp2.id]['recent_interactions_count'] == 0
+        assert [p['id'] for p in data['projects']] == [self.proj1.id, self.proj2.id]
+
+        self.client.force_authenticate(self.user_msl2)
+        assert self._get() == {'engagement_plan': None, 'hcp_items': [], 'project_items': [],
+                               'hcps': [], 'projects': []}
+
+    def test_constant_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            self._get()
+        cache.clear()
+        item = self.ep1.hcp_items.create(hcp=self.hcp3, reason='other')
+        for i in range(3):
+            objective = item.objectives.create(hcp=self.hcp3, description='obj {}'.format(i))
+            objective.deliverables.create(quarter=1)
+        with CaptureQueriesContext(connection) as more_queries:
+            self._get()
+        assert len(more_queries) == len(queries)
+
+    def test_cached_until_changed(self):
+        self._get()
+        with CaptureQueriesContext(connection) as queries:
+            self._get()
+        assert not any('interactionscore_hcpdeliverable"."description' in q['sql']
+                       for q in queries.captured_queries)
+
+        deliverable = HCPDeliverable.objects.get(objective__description='hcp 2 obj desc', quarter=2)
+        deliverable.status = HCPDeliverable.Status.major_issue.name
+        deliverable.save()
+        data = self._get()
+        assert data['hcp_items'][1]['objectives'][0]['deliverables'][0]['status'] == 'major_issue'
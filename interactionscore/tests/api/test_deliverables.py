@@ -0,0 +1,89 @@
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from .common import BaseAPITestCase
+from interactionscore.models import EngagementPlan, HCPDeliverable, get_current_quarter
+
+
+class TestDeliverablesAPI(BaseAPITestCase):
+
+    url = reverse('hcpdeliverable-list')
+    rollup_url = reverse('hcpdeliverable-rollup')
+
+    def setUp(self):
+        self.client.force_authenticate(self.user_man1)
+        for deliverable in HCPDeliverable.objects.filter(objective__description='hcp 1 obj 2 desc', quarter__lte=2):
+            deliverable.status = HCPDeliverable.Status.major_issue.name
+            deliverable.save()
+        self.behind = HCPDeliverable.objects.get(objective__description='hcp 2 obj desc', quarter=2)
+        self.behind.status = HCPDeliverable.Status.slightly_behind.name
+        self.behind.save()
+
+    def _get(self, url, **params):
+        res = self.client.get(url, params)
+        assert res.status_code == status.HTTP_200_OK
+        return res.json()
+
+    def test_at_risk(self):
+        data = self._get(self.url, status='slightly_behind,major_issue')
+        assert data['count'] == 3
+        assert {d['status'] for d in data['results']} == {'slightly_behind', 'major_issue'}
+        result = [d for d in data['results'] if d['id'] == self.behind.id][0]
+        assert (result['hcp_id'], result['engagement_plan_id']) == (self.hcp2.id, self.ep1.id)
+
+        data = self._get(self.url, status='major_issue', quarter=1)
+        assert [d['quarter'] for d in data['results']] == [1]
+
+    def test_quarter_type(self):
+        current_quarter = get_current_quarter()
+        data = self._get(self.url, quarter_type='current')
+        assert data['count'] == HCPDeliverable.objects.filter(quarter=current_quarter).count()
+        assert {d['quarter_type'] for d in data['results']} <= {'current'}
+        data = self._get(self.url, quarter_type='past')
+        assert {d['quarter'] for d in data['results']} == set(range(1, current_quarter))
+
+    def test_engagement_plans_scope(self):
+        assert self._get(self.url)['count'] == 9
+        assert self._get(self.url, engagement_plan='current')['count'] == 0
+        EngagementPlan.objects.filter(pk=self.ep1.pk).update(year=timezone.now().year)
+        assert self._get(self.url, engagement_plan='current', user=self.user_msl1.id)['count'] == 9
+
+        # MSLs only see their own plans
+        self.client.force_authenticate(self.user_msl2)
+        assert self._get(self.url)['count'] == 0
+        self.client.force_authenticate(self.user_msl1)
+        assert self._get(self.url)['count'] == 9
+
+    def test_rollup(self):
+        HCPDeliverable.objects.get(objective__description='hcp 2 obj desc', quarter=3).delete()
+        assert self._get(self.rollup_url, status='major_issue,slightly_behind') == [{
+            'engagement_plan_id': self.ep1.id,
+            'deliverables_count': 3,
+            'no_status_count': 0,
+            'on_track_count': 0,
+            'slightly_behind_count': 1,
+            'major_issue_count': 2,
+        }]
+        data = self._get(self.rollup_url, group_by='objective')
+        assert [(d['deliverables_count'], d['major_issue_count'], d['no_status_count']) for d in data] == [
+            (3, 0, 3), (4, 2, 2), (1, 0, 0)]
+        data = self._get(self.rollup_url, group_by='engagement_plan_item')
+        assert [d['deliverables_count'] for d in data] == [7, 1]
+
+    def test_invalid_parameters(self):
+        res = self.client.get(self.url, {'status': 'on_track,late', 'quarter_type': 'next'})
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+        assert set(res.json()) == {'status', 'quarter_type'}
+        res = self.client.get(self.rollup_url, {'group_by': 'hcp'})
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_queryset_quarter_type(self):
+        deliverables = HCPDeliverable.objects.with_quarter_type(current_quarter=2)
+        assert {(d.quarter, d.quarter_type) for d in deliverables} == {
+            (1, 'past'), (2, 'current'), (3, 'future'), (4, 'future')}
+        assert {d.quarter for d in HCPDeliverable.objects.filter_quarter_type('future', 2)} == {3, 4}
+
+    def test_deleted_plans(self):
+        EngagementPlan.objects.get(pk=self.ep1.pk).delete()
+        assert self._get(self.url)['count'] == 0
@@ -19,7 +19,7 @@ from interactionscore.tests.helpers import (
 class TestEngagementPlansAPI(BaseAPITestCase):
 
     def setUp(self):
-        self.client.force_login(self.user_msl1)
+        self.client.force_authenticate(self.user_msl1)
 
     def test_list_engagement_plans(self):
         url = reverse('engagementplan-list')
@@ -251,7 +251,7 @@ class TestEngagementPlansAPI(BaseAPITestCase):
         # required for the test to make sense:
         assert self.ep1.approved is False
 
-        self.client.force_login(self.user_man1)
+        self.client.force_authenticate(self.user_man1)
         res = self.client.post(
             reverse('engagementplan-approve', args=[self.ep1.id]),
             {
@@ -274,7 +274,7 @@ class TestEngagementPlansAPI(BaseAPITestCase):
         # required for the test to make sense:
         assert self.ep1.approved is False
 
-        self.client.force_login(self.user_man1)
+        self.client.force_authenticate(self.user_man1)
         res = self.client.post(
             reverse('engagementplan-approve', args=[self.ep1.id]),
             {
@@ -298,7 +298,7 @@ class TestEngagementPlansAPI(BaseAPITestCase):
         # required for the test to make sense:
         assert self.ep1.approved is False
 
-        self.client.force_login(self.user_man1)
+        self.client.force_authenticate(self.user_man1)
         res = self.client.post(
             reverse('engagementplan-approve', args=[self.ep1.id]),
             {
@@ -323,7 +323,7 @@ class TestEngagementPlansAPI(BaseAPITestCase):
 
         self.ep1.hcp_items.get(hcp=self.hcp1).approve()
 
-        self.client.force_login(self.user_man1)
+        self.client.force_authenticate(self.user_man1)
         res = self.client.post(
             reverse('engagementplan-unapprove', args=[self.ep1.id]),
             {
@@ -348,7 +348,7 @@ class TestEngagementPlansAPI(BaseAPITestCase):
         for it in self.ep1.hcp_items.all():
             it.approve()
 
-        self.client.force_login(self.user_man1)
+        self.client.force_authenticate(self.user_man1)
         res = self.client.post(
             reverse('engagementplan-unapprove', args=[self.ep1.id]),
             {
@@ -372,7 +372,7 @@ class TestEngagementPlansAPI(BaseAPITestCase):
         for it in self.ep1.hcp_items.all():
             it.approve()
 
-        self.client.force_login(self.user_man1)
+        self.client.force_authenticate(self.user_man1)
         res = self.client.post(
             reverse('engagementplan-unapprove', args=[self.ep1.id]),
             {
@@ -0,0 +1,100 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from .common import BaseAPITestCase
+from interactionscore.models import Comment, EngagementPlanHCPItem, HCP, HCPObjective, Interaction
+
+
+class TestListETags(BaseAPITestCase):
+
+    def setUp(self):
+        self.client.force_authenticate(self.user_msl1)
+
+    def _get(self, url, etag=None):
+        if etag is None:
+            return self.client.get(url)
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_not_modified(self):
+        url = reverse('engagementplan-list')
+        res = self._get(url)
+        assert res.status_code == status.HTTP_200_OK
+        etag = res['ETag']
+
+        res = self._get(url, etag)
+        assert res.status_code == status.HTTP_304_NOT_MODIFIED
+        assert res['ETag'] == etag
+
+        # other parameters or users have other ETags
+        assert self._get(url + '?approved=true', etag).status_code == status.HTTP_200_OK
+        self.client.force_authenticate(self.user_man1)
+        assert self._get(url, etag).status_code == status.HTTP_200_OK
+
+    def test_modified_nested_items(self):
+        url = reverse('engagementplan-list')
+        etag = self._get(url)['ETag']
+
+        hcp_item = EngagementPlanHCPItem.objects.filter(engagement_plan__user=self.user_msl1).first()
+        HCPObjective.objects.create(engagement_plan_item=hcp_item, hcp=hcp_item.hcp)
+        res = self._get(url, etag)
+        assert res.status_code == status.HTTP_200_OK
+        assert res['ETag'] != etag
+        etag = res['ETag']
+
+        hcp_item.delete()
+        assert self._get(url, etag).status_code == status.HTTP_200_OK
+
+    def test_modified_nested_comments(self):
+        url = reverse('engagementplan-list')
+        etag = self._get(url)['ETag']
+        objective = HCPObjective.objects.filter(engagement_plan_item__engagement_plan__user=self.user_msl1).first()
+        Comment.objects.create(user=self.user_man1, hcp_objective=objective, message='why?')
+        res = self._get(url, etag)
+        assert res.status_code == status.HTTP_200_OK
+        assert res['ETag'] != etag
+
+
+class TestListResponseCache(BaseAPITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.hcp1.affiliate_groups.set([self.ag1])
+        self.hcp1.tas.set([self.ta1])
+        # same scope: ag1 and ta1
+        self.user_msl1.tas.set([self.ta1])
+        self.user_man1.tas.set([self.ta1])
+
+    def _get(self, user):
+        self.client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(reverse('hcp-list'))
+        assert res.status_code == status.HTTP_200_OK
+        return res, len(queries)
+
+    def test_shared_by_scope(self):
+        res1, queries1 = self._get(self.user_msl1)
+        assert [hcp['id'] for hcp in res1.json()] == [self.hcp1.id]
+
+        res2, queries2 = self._get(self.user_man1)
+        assert res2.content == res1.content
+        assert queries2 < queries1
+
+        # other scope
+        res3, _ = self._get(self.user_msl2)
+        assert res3.json() == []
+
+    def test_invalidated_by_changes(self):
+        count = self._get(self.user_msl1)[0].json()[0]['interactions_count']
+        hcp = HCP.objects.get(id=self.hcp1.id)
+        hcp.first_name = 'Changed'
+        hcp.save()
+        res, _ = self._get(self.user_man1)
+        assert res.json()[0]['first_name'] == 'Changed'
+
+        Interaction.objects.create(user=self.user_msl1, hcp=hcp, time_of_interaction=timezone.now())
+        res, _ = self._get(self.user_man1)
+        assert res.json()[0]['interactions_count'] == count + 1
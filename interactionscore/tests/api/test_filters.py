@@ -0,0 +1,59 @@
+from django.urls import reverse
+from rest_framework import status
+
+from .common import BaseAPITestCase
+from interactionscore.models import EngagementPlan
+
+
+class TestFilters(BaseAPITestCase):
+
+    def setUp(self):
+        self.client.force_authenticate(self.superuser)
+
+    def _get(self, url_name, params):
+        return self.client.get(reverse(url_name), params)
+
+    def test_invalid_params(self):
+        res = self._get('engagementplan-list', {'approved': 'maybe'})
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+        assert list(res.json()) == ['approved']
+
+        res = self._get('project-list', {'type': 'bogus', 'tas': '1,x', 'user': 'me'})
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+        assert sorted(res.json()) == ['tas', 'type', 'user']
+
+        res = self._get('hcp-list', {'engagement_plan': 'current'})
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+        assert list(res.json()) == ['user']
+
+    def test_hcps_of_engagement_plan(self):
+        res = self._get('hcp-list', {'engagement_plan': self.ep1.id, 'user': self.user_msl1.id})
+        assert sorted(hcp['id'] for hcp in res.json()) == [self.hcp1.id, self.hcp2.id]
+        # EP of another user
+        res = self._get('hcp-list', {'engagement_plan': self.ep1.id, 'user': self.user_msl2.id})
+        assert res.json() == []
+
+    def test_hcps_of_deleted_engagement_plan(self):
+        params = {'engagement_plan': self.ep1.id}
+        self.ep1.hcp_items.get(hcp=self.hcp1).delete()
+        assert [hcp['id'] for hcp in self._get('hcp-list', params).json()] == [self.hcp2.id]
+        EngagementPlan.objects.get(pk=self.ep1.pk).delete()
+        assert self._get('hcp-list', params).json() == []
+
+    def test_hcps_of_user(self):
+        self.hcp1.affiliate_groups.set([self.ag2])
+        self.hcp2.tas.set([self.ta1])
+        self.user_msl3.tas.set([self.ta1])
+        res = self._get('hcp-list', {'user': self.user_msl3.id})
+        assert sorted(hcp['id'] for hcp in res.json()) == [self.hcp1.id, self.hcp2.id]
+
+    def test_hcp_objectives_of_engagement_plan(self):
+        params = {'engagement_plan': self.ep1.id, 'user': self.user_msl1.id}
+        assert self._get('hcpobjective-list', params).json() == []
+
+        hcp_item = self.ep1.hcp_items.get(hcp=self.hcp2)
+        hcp_item.approve()
+        res = self._get('hcpobjective-list', params)
+        assert [obj['description'] for obj in res.json()] == ['hcp 2 obj desc']
+        res = self._get('hcpobjective-list', dict(params, hcp=self.hcp1.id))
+        assert res.json() == []
@@ -20,7 +20,7 @@ from interactionscore.tests.helpers import (
 class TestInteractionsAPI(BaseAPITestCase):
 
     def setUp(self):
-        self.client.force_login(self.user_msl1)
+        self.client.force_authenticate(self.user_msl1)
 
     def test_list_interactions(self):
         res = self.client.get(reverse('interaction-list'))
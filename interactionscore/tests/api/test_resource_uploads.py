@@ -0,0 +1,99 @@
+import hashlib
+import shutil
+import tempfile
+
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from .common import BaseAPITestCase
+from interactionscore.models import Resource, ResourceUpload
+from interactionscore.storage import resource_storage
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+@override_settings(RESOURCE_UPLOAD_CHUNK_SIZE=10)
+class TestResourceUploadsAPI(BaseAPITestCase):
+
+    data = b'0123456789abcdefghijABCDE'
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.client.force_authenticate(self.user_msl1)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def _init_upload(self):
+        res = self.client.post(reverse('resourceupload-list'),
+                               {'filename': 'slides.pptx', 'size': len(self.data)})
+        assert res.status_code == status.HTTP_201_CREATED
+        return res.json()
+
+    def _put_chunk(self, upload_id, index, data, checksum=None):
+        url = reverse('resourceupload-chunk', args=[upload_id, index])
+        return self.client.put(url, data, content_type='application/octet-stream',
+                               HTTP_X_CHUNK_CHECKSUM=checksum or sha256(data))
+
+    def test_chunked_upload(self):
+        rdata = self._init_upload()
+        assert rdata['chunk_size'] == 10
+        assert rdata['chunks_count'] == 3
+        upload_id = rdata['id']
+
+        # chunks in any order, with a bad one re-sent
+        res = self._put_chunk(upload_id, 2, self.data[20:])
+        assert res.status_code == status.HTTP_200_OK
+        res = self._put_chunk(upload_id, 0, self.data[:10], checksum=sha256(b'corrupted'))
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+        res = self._put_chunk(upload_id, 0, self.data[:10] + b'extra')
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+        res = self._put_chunk(upload_id, 0, self.data[:10])
+        assert res.json()['received_chunks'] == [0, 2]
+
+        # resume: missing chunks are listed
+        res = self.client.get(reverse('resourceupload-detail', args=[upload_id]))
+        assert res.json()['received_chunks'] == [0, 2]
+        res = self.client.post(reverse('resourceupload-finalize', args=[upload_id]),
+                               {'title': 'Slides'})
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+
+        self._put_chunk(upload_id, 1, self.data[10:20])
+        res = self.client.post(reverse('resourceupload-finalize', args=[upload_id]),
+                               {'title': 'Slides', 'tas': [self.ta1.id], 'checksum': sha256(self.data)})
+        assert res.status_code == status.HTTP_201_CREATED
+        rdata = res.json()
+        assert rdata['user_id'] == self.user_msl1.id
+
+        resource = Resource.objects.get(id=rdata['id'])
+        assert resource.file.name.endswith('.pptx')
+        with resource.file.open('rb') as f:
+            assert f.read() == self.data
+        assert list(resource.tas.all()) == [self.ta1]
+        upload = ResourceUpload.objects.get(id=upload_id)
+        assert upload.resource == resource
+        assert not resource_storage.exists(upload.get_chunk_name(0))
+
+        res = self._put_chunk(upload_id, 0, self.data[:10])
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_finalize_checksum_mismatch(self):
+        upload_id = self._init_upload()['id']
+        for index in range(3):
+            self._put_chunk(upload_id, index, self.data[index * 10:(index + 1) * 10])
+        res = self.client.post(reverse('resourceupload-finalize', args=[upload_id]),
+                               {'title': 'Slides', 'checksum': sha256(b'other')})
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+        assert not Resource.objects.filter(title='Slides').exists()
+
+    def test_uploads_are_private(self):
+        upload_id = self._init_upload()['id']
+        self.client.force_authenticate(self.user_msl2)
+        res = self.client.get(reverse('resourceupload-detail', args=[upload_id]))
+        assert res.status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,123 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from safedelete.config import HARD_DELETE
+
+from .common import BaseAPITestCase
+from interactionscore.models import Resource, StoredFile, make_content_filepath
+from interactionscore.storage import resource_storage
+
+
+class TestResourcesAPI(BaseAPITestCase):
+
+    data = b'0123456789' * 100
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.resource = Resource.objects.create(title='Slide Deck')
+        self.resource.affiliate_groups.set([self.ag1])
+        self.resource.file.save('deck.pdf', ContentFile(self.data))
+        self.url = reverse('resource-download', args=[self.resource.id])
+        self.client.force_authenticate(self.user_msl1)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def test_file_url(self):
+        res = self.client.get(reverse('resource-detail', args=[self.resource.id]))
+        assert res.json()['file'] == 'http://testserver' + self.url
+
+    def test_download(self):
+        res = self.client.get(self.url)
+        assert res.status_code == status.HTTP_200_OK
+        assert b''.join(res.streaming_content) == self.data
+        assert res['Content-Type'] == 'application/pdf'
+        assert res['Content-Length'] == str(len(self.data))
+        assert res['Content-Disposition'] == 'attachment; filename="slide-deck.pdf"'
+        assert res['Accept-Ranges'] == 'bytes'
+
+    def test_download_range(self):
+        res = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+        assert res.status_code == status.HTTP_206_PARTIAL_CONTENT
+        assert b''.join(res.streaming_content) == self.data[10:20]
+        assert res['Content-Range'] == 'bytes 10-19/1000'
+
+        res = self.client.get(self.url, HTTP_RANGE='bytes=-5')
+        assert b''.join(res.streaming_content) == self.data[-5:]
+
+        res = self.client.get(self.url, HTTP_RANGE='bytes=2000-')
+        assert res.status_code == status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+
+    @override_settings(RESOURCES_X_ACCEL_REDIRECT_PREFIX='/protected-media/')
+    def test_download_x_accel_redirect(self):
+        res = self.client.get(self.url)
+        assert res.status_code == status.HTTP_200_OK
+        assert res['X-Accel-Redirect'] == '/protected-media/' + self.resource.file.name
+        assert res.content == b''
+
+    def test_download_forbidden(self):
+        # resource not in any of the user's affiliate groups
+        self.client.force_authenticate(self.user_msl3)
+        res = self.client.get(self.url)
+        assert res.status_code == status.HTTP_404_NOT_FOUND
+
+    def _create_resource(self, filename):
+        res = self.client.post(reverse('resource-list'), {
+            'title': 'Uploaded',
+            'user_id': self.user_msl1.id,
+            'affiliate_groups': [self.ag1.id],
+            'file': SimpleUploadedFile(filename, self.data),
+        }, format='multipart')
+        assert res.status_code == status.HTTP_201_CREATED
+        return Resource.objects.get(id=res.json()['id'])
+
+    def test_upload_dedup_and_gc(self):
+        resource1 = self._create_resource('deck.pdf')
+        resource2 = self._create_resource('deck-copy.pdf')
+
+        stored_file = StoredFile.objects.get()
+        assert resource1.file.name == resource2.file.name == stored_file.name
+        assert stored_file.size == len(self.data)
+        assert stored_file.ref_count == 2
+
+        # soft-deleted resources still reference the file
+        resource1.delete()
+        Resource.all_objects.filter(id=resource2.id).delete(force_policy=HARD_DELETE)
+        call_command('gc_resource_files', stdout=StringIO())
+        assert resource_storage.exists(stored_file.name)
+
+        Resource.all_objects.filter(id=resource1.id).delete(force_policy=HARD_DELETE)
+        call_command('gc_resource_files', stdout=StringIO())
+        assert not StoredFile.objects.exists()
+        assert not resource_storage.exists(stored_file.name)
+
+    def test_store_concurrent_upload(self):
+        other = StoredFile(name=self.resource.file.name, size=len(self.data))
+        calls = []
+
+        def open_content():
+            # the same content stored by another upload between hashing and saving
+            if calls and not other.pk:
+                other.sha256 = hashlib.sha256(self.data).hexdigest()
+                other.save()
+            calls.append(1)
+            return BytesIO(self.data)
+
+        stored_file = StoredFile.objects.store(open_content, 'deck-copy.pdf')
+        assert stored_file == other
+        assert len(calls) == 2
+        # only the other copy is left
+        directory = os.path.dirname(os.path.join(self.media_root, make_content_filepath(other.sha256, '.pdf')))
+        assert not os.path.exists(directory) or not os.listdir(directory)
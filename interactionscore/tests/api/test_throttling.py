@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from .common import BaseAPITestCase
+
+
+@override_settings(REST_FRAMEWORK=dict(settings.REST_FRAMEWORK, DEFAULT_THROTTLE_RATES={
+    'api': '5/min',
+    'expensive': '2/min',
+    'reference': '3/min',
+}), API_MAX_CONCURRENT_REQUESTS=2)
+class TestThrottling(BaseAPITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user_msl1)
+
+    def _statuses(self, url, count):
+        return [self.client.get(url).status_code for _ in range(count)]
+
+    def test_rate_by_scope(self):
+        assert self._statuses(reverse('interaction-list'), 3) == [200, 200, 429]
+        res = self.client.get(reverse('interaction-list'))
+        assert int(res['Retry-After']) > 0
+
+        # other scopes have their own limits
+        assert self._statuses(reverse('therapeuticarea-list'), 4) == [200, 200, 200, 429]
+        assert self._statuses(reverse('users-current'), 1) == [200]
+
+        # and other users too
+        self.client.force_authenticate(self.user_msl2)
+        assert self._statuses(reverse('interaction-list'), 1) == [200]
+
+    def test_concurrent_requests(self):
+        key = 'throttle_concurrent_{}'.format(self.user_msl1.id)
+        cache.set(key, 1)  # one request in progress
+        assert self._statuses(reverse('users-current'), 2) == [200, 200]
+        assert cache.get(key) == 1
+
+        cache.set(key, 2)
+        res = self.client.get(reverse('users-current'))
+        assert res.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert res['Retry-After'] == '1'
+        assert cache.get(key) == 2
@@ -0,0 +1,46 @@
+import datetime
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.utils import timezone
+from safedelete.models import is_safedelete_cls
+
+from interactionscore.management.commands.core_fixtures import get_models_in_dependency_order
+from interactionscore.models import (
+    ArchivedRecord,
+    EngagementPlan,
+    EngagementPlanHCPItem,
+    HCP,
+    Project,
+)
+from interactionscore.tests.api.common import BaseAPITestCase
+
+
+class TestArchiveDeleted(BaseAPITestCase):
+
+    def test_archive_deleted(self):
+        self.ep1.delete()
+        self.hcp2.delete()
+        self.proj1.delete()
+        long_ago = timezone.now() - datetime.timedelta(days=400)
+        for model in get_models_in_dependency_order():
+            if is_safedelete_cls(model):
+                model.deleted_objects.update(deleted=long_ago)
+        self.hcp3.delete()  # recently deleted
+
+        call_command('archive_deleted', stdout=StringIO())
+
+        # whole plan tree is gone, hcp2 only referenced from it as well
+        assert not EngagementPlan.all_objects.filter(id=self.ep1.id).exists()
+        assert not EngagementPlanHCPItem.all_objects.exists()
+        assert not HCP.all_objects.filter(id=self.hcp2.id).exists()
+        # recently deleted, or still referenced (by inter1) rows stay
+        assert HCP.deleted_objects.filter(id=self.hcp3.id).exists()
+        assert Project.deleted_objects.filter(id=self.proj1.id).exists()
+
+        record = ArchivedRecord.objects.get(model='interactionscore.HCP', object_id=self.hcp2.id)
+        data = json.loads(record.data)
+        assert data['email'] == 'hcp.2@test.com'
+        assert data['tas'] == []
+        assert ArchivedRecord.objects.filter(model='interactionscore.HCPDeliverable').count() == 9
@@ -0,0 +1,91 @@
+import datetime
+from io import StringIO
+
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from safedelete.config import HARD_DELETE
+
+from interactionscore.models import ArchivedInteraction, HCP, Interaction
+from interactionscore.tests.api.common import BaseAPITestCase
+
+
+class TestArchiveInteractions(BaseAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.old_year = timezone.now().year - 3
+        cls.old_inter = Interaction.objects.create(
+            user=cls.user_msl1,
+            hcp=cls.hcp1,
+            time_of_interaction=timezone.make_aware(datetime.datetime(cls.old_year, 5, 1)),
+        )
+        cls.old_inter.resources.set([cls.res1, cls.res2])
+        cls.old_deleted_inter = Interaction.objects.create(
+            user=cls.user_msl1,
+            hcp=cls.hcp2,
+            time_of_interaction=timezone.make_aware(datetime.datetime(cls.old_year, 6, 1)),
+        )
+        cls.old_deleted_inter.delete()
+
+    def test_archive_and_restore(self):
+        created_at = Interaction.objects.get(id=self.old_inter.id).created_at
+
+        call_command('archive_interactions', stdout=StringIO())
+
+        assert list(Interaction.all_objects.values_list('id', flat=True)) == [self.inter1.id]
+        archived = ArchivedInteraction.objects.get(id=self.old_inter.id)
+        assert archived.created_at == created_at
+        assert set(archived.resources.all()) == {self.res1, self.res2}
+        assert ArchivedInteraction.deleted_objects.filter(id=self.old_deleted_inter.id).exists()
+
+        hcp1 = HCP.objects.get(id=self.hcp1.id)
+        assert hcp1.interactions_count == 2
+        assert hcp1.last_interaction == self.inter1.time_of_interaction
+        # only found in the archive
+        Interaction.objects.filter(id=self.inter1.id).delete(force_policy=HARD_DELETE)
+        assert hcp1.last_interaction == self.old_inter.time_of_interaction
+
+        call_command('archive_interactions', restore=self.old_year, stdout=StringIO())
+
+        assert not ArchivedInteraction.all_objects.exists()
+        restored = Interaction.objects.get(id=self.old_inter.id)
+        assert set(restored.resources.all()) == {self.res1, self.res2}
+        assert Interaction.deleted_objects.filter(id=self.old_deleted_inter.id).exists()
+
+    def test_list_by_year(self):
+        call_command('archive_interactions', stdout=StringIO())
+        self.client.force_authenticate(self.user_msl1)
+
+        res = self.client.get(reverse('interaction-list'))
+        assert [r['id'] for r in res.json()] == [self.inter1.id]
+
+        res = self.client.get(reverse('interaction-list'), {'year': self.old_year})
+        assert res.status_code == status.HTTP_200_OK
+        rdata = res.json()
+        assert [r['id'] for r in rdata] == [self.old_inter.id]
+        assert rdata[0]['resources'] == [self.res1.id, self.res2.id]
+
+        res = self.client.get(reverse('interaction-list'), {'year': 'last'})
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_list_year_in_both_tables(self):
+        call_command('archive_interactions', stdout=StringIO())
+        # backdated after the archiving
+        backdated = Interaction.objects.create(
+            user=self.user_msl1, hcp=self.hcp2,
+            time_of_interaction=timezone.make_aware(datetime.datetime(self.old_year, 7, 1)))
+        self.client.force_authenticate(self.user_msl1)
+
+        res = self.client.get(reverse('interaction-list'), {'year': self.old_year})
+        assert res.status_code == status.HTTP_200_OK
+        assert [r['id'] for r in res.json()] == [self.old_inter.id, backdated.id]
+        res = self.client.get(reverse('interaction-list'), {'year': self.old_year},
+                              HTTP_IF_NONE_MATCH=res['ETag'])
+        assert res.status_code == status.HTTP_304_NOT_MODIFIED
+
+        # and the current year, not archived yet
+        res = self.client.get(reverse('interaction-list'), {'year': self.inter1.time_of_interaction.year})
+        assert [r['id'] for r in res.json()] == [self.inter1.id]
@@ -0,0 +1,48 @@
+import base64
+from io import StringIO
+
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework_jwt.settings import api_settings as jwt_settings
+
+from interactionscore.authentication import BrowsableAPISessionAuthentication
+from interactionscore.tests.api.common import BaseAPITestCase
+
+
+class TestAuthentication(BaseAPITestCase):
+
+    def _authenticate(self, renderer):
+        http_request = APIRequestFactory().get('/api/v1/hcps/')
+        http_request.user = self.user_msl1  # as set by the session middleware
+        request = Request(http_request)
+        request.accepted_renderer = renderer
+        return BrowsableAPISessionAuthentication().authenticate(request)
+
+    def test_session_for_browsable_api_only(self):
+        assert self._authenticate(BrowsableAPIRenderer()) == (self.user_msl1, None)
+        assert self._authenticate(JSONRenderer()) is None
+
+    def test_benchmark_authentication(self):
+        out = StringIO()
+        call_command('benchmark_authentication', requests=1, stdout=out)
+        lines = out.getvalue().splitlines()
+        assert len(lines) == 7
+        assert lines[-2].startswith('- basic    current') and lines[-2].endswith('(anonymous)')
+
+    def test_json_api_policy(self):
+        url = reverse('hcp-list')
+        self.client.force_login(self.user_msl1)
+        assert self.client.get(url).status_code == status.HTTP_401_UNAUTHORIZED
+        assert self.client.get(url, HTTP_ACCEPT='text/html').status_code == status.HTTP_200_OK
+        self.client.logout()
+
+        basic = base64.b64encode(b'superuser@test.com:secret').decode()  # valid credentials
+        self.client.credentials(HTTP_AUTHORIZATION='Basic ' + basic)
+        assert self.client.get(url).status_code == status.HTTP_401_UNAUTHORIZED
+        token = jwt_settings.JWT_ENCODE_HANDLER(jwt_settings.JWT_PAYLOAD_HANDLER(self.user_msl1))
+        self.client.credentials(HTTP_AUTHORIZATION='JWT ' + token)
+        assert self.client.get(url).status_code == status.HTTP_200_OK
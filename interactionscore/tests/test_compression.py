@@ -0,0 +1,53 @@
+import gzip
+
+import pytest
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory
+
+from interactionscore.compression import CompressionMiddleware, brotli
+
+content = b'{"name": "HCP"}, ' * 200
+
+
+def get_response(response, accept_encoding='gzip, deflate, br'):
+    request = RequestFactory().get('/api/v1/hcps/', HTTP_ACCEPT_ENCODING=accept_encoding)
+    return CompressionMiddleware().process_response(request, response)
+
+
+def test_compress():
+    response = HttpResponse(content, content_type='application/json')
+    response['ETag'] = '"abc"'
+    response = get_response(response, accept_encoding='gzip')
+    assert response['Content-Encoding'] == 'gzip'
+    assert response['Vary'] == 'Accept-Encoding'
+    assert response['ETag'] == 'W/"abc"'
+    assert gzip.decompress(response.content) == content
+
+
+@pytest.mark.skipif(brotli is None, reason='brotli is not installed')
+def test_compress_brotli():
+    response = get_response(HttpResponse(content, content_type='application/json'))
+    assert response['Content-Encoding'] == 'br'
+    assert brotli.decompress(response.content) == content
+
+    response = get_response(StreamingHttpResponse([content] * 3, content_type='text/csv'))
+    assert brotli.decompress(b''.join(response.streaming_content)) == content * 3
+
+
+def test_compress_streaming():
+    response = StreamingHttpResponse([content] * 3, content_type='text/csv')
+    response = get_response(response, accept_encoding='gzip')
+    assert response['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(b''.join(response.streaming_content)) == content * 3
+
+
+def test_not_compressed():
+    # too small
+    response = get_response(HttpResponse(b'{}', content_type='application/json'))
+    assert not response.has_header('Content-Encoding')
+    # already compressed files
+    response = get_response(HttpResponse(content, content_type='application/pdf'))
+    assert not response.has_header('Content-Encoding')
+    # not accepted
+    response = get_response(HttpResponse(content, content_type='application/json'), '')
+    assert not response.has_header('Content-Encoding')
@@ -0,0 +1,57 @@
+import os
+from io import StringIO
+import tempfile
+
+from django.core.management import call_command
+
+from interactionscore.management.commands.core_fixtures import get_models_in_dependency_order
+from interactionscore.models import EngagementPlan, HCP, HCPObjective, User
+from interactionscore.tests.api.common import BaseAPITestCase
+
+
+class TestCoreFixtures(BaseAPITestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def _path(self, name):
+        return os.path.join(self.tmp_dir, name)
+
+    def _read(self, name):
+        call_command('core_fixtures', 'dump', self._path(name), stdout=StringIO())
+        with open(self._path(name)) as f:
+            return f.read()
+
+    def test_models_dependency_order(self):
+        models = get_models_in_dependency_order()
+        assert models.index(User) < models.index(EngagementPlan)
+        assert models.index(EngagementPlan) < models.index(HCPObjective)
+        assert models.index(HCP) < models.index(HCP.tas.through)
+        assert User.groups.through not in models
+
+    def test_dump_load_roundtrip(self):
+        self.hcp1.delete()  # soft-deleted rows should survive too
+        before = self._read('before.ndjson')
+
+        for model in reversed(get_models_in_dependency_order()):
+            model._base_manager.all().delete()
+        assert not HCP.all_objects.exists()
+
+        call_command('core_fixtures', 'load', self._path('before.ndjson'), stdout=StringIO())
+
+        assert self._read('after.ndjson') == before
+        assert HCP.deleted_objects.filter(id=self.hcp1.id).exists()
+        assert self.ep1.hcp_items.count() == 2
+
+    def test_load_recounts(self):
+        # eg. a fixture dumped before the counters
+        EngagementPlan.objects.update(hcp_items_count=0)
+        HCP.objects.update(interactions_count=0)
+        self._read('before.ndjson')
+        for model in reversed(get_models_in_dependency_order()):
+            model._base_manager.all().delete()
+
+        call_command('core_fixtures', 'load', self._path('before.ndjson'), stdout=StringIO())
+
+        assert EngagementPlan.objects.get(pk=self.ep1.pk).hcp_items_count == 2
+        assert HCP.objects.get(pk=self.hcp1.pk).interactions_count == 1
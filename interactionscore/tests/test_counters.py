@@ -0,0 +1,104 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.utils import timezone
+
+from interactionscore.models import (
+    EngagementPlan,
+    EngagementPlanHCPItem,
+    HCP,
+    HCPDeliverable,
+    HCPObjective,
+    Interaction,
+    User,
+)
+from interactionscore.tests.api.common import BaseAPITestCase
+
+
+class TestCounters(BaseAPITestCase):
+
+    def _ep(self):
+        return EngagementPlan.objects.get(pk=self.ep1.pk)
+
+    def test_plan_items(self):
+        ep = self._ep()
+        assert (ep.hcp_items_count, ep.approved_hcp_items_count, ep.project_items_count) == (2, 0, 2)
+
+        item = EngagementPlanHCPItem.objects.get(engagement_plan=ep, hcp=self.hcp1)
+        item.approve()
+        assert self._ep().approved_hcp_items_count == 1
+        item.delete()
+        ep = self._ep()
+        assert (ep.hcp_items_count, ep.approved_hcp_items_count) == (1, 0)
+        # its objectives were soft-deleted along
+        assert EngagementPlanHCPItem.all_objects.get(pk=item.pk).objectives_count == 0
+        item.undelete()
+        ep = self._ep()
+        assert (ep.hcp_items_count, ep.approved_hcp_items_count) == (2, 1)
+        assert EngagementPlanHCPItem.objects.get(pk=item.pk).objectives_count == 2
+
+        # saving outdated instances doesn't overwrite the counters
+        ep.hcp_items.create(hcp=self.hcp3, reason='other')
+        ep.year = 2019
+        ep.save()
+        assert self._ep().hcp_items_count == 3
+        # nor soft-deleting them
+        hcp = HCP.objects.get(pk=self.hcp1.pk)
+        HCP.objects.filter(pk=hcp.pk).update(interactions_count=7)
+        hcp.delete()
+        assert HCP.all_objects.get(pk=hcp.pk).interactions_count == 7
+
+    def test_deliverables_by_status(self):
+        objective = HCPObjective.objects.get(description='hcp 2 obj desc')
+        assert (objective.deliverables_count, objective.on_track_deliverables_count) == (2, 0)
+
+        deliverable = objective.deliverables.first()
+        deliverable.status = HCPDeliverable.Status.on_track.name
+        deliverable.save()
+        # loaded without its status
+        deliverable = HCPDeliverable.objects.only('id').get(pk=deliverable.pk)
+        deliverable.status = HCPDeliverable.Status.major_issue.name
+        deliverable.save()
+        objective.refresh_from_db()
+        assert (objective.on_track_deliverables_count, objective.major_issue_deliverables_count) == (0, 1)
+
+        objective.deliverables.create(quarter=4, status=HCPDeliverable.Status.major_issue.name)
+        deliverable.delete()
+        objective.refresh_from_db()
+        assert (objective.deliverables_count, objective.major_issue_deliverables_count) == (2, 1)
+
+    def test_hcp_interactions(self):
+        assert HCP.objects.get(pk=self.hcp1.pk).interactions_count == 1
+        interaction = Interaction.objects.create(user=self.user_msl1, hcp=self.hcp2,
+                                                 time_of_interaction=timezone.now())
+        assert HCP.objects.get(pk=self.hcp2.pk).interactions_count == 1
+        interaction.hcp = self.hcp3
+        interaction.save()
+        assert HCP.objects.get(pk=self.hcp2.pk).interactions_count == 0
+        assert HCP.objects.get(pk=self.hcp3.pk).interactions_count == 1
+        interaction.delete()
+        assert HCP.objects.get(pk=self.hcp3.pk).interactions_count == 0
+
+    def test_bulk_soft_deletes(self):
+        Interaction.objects.create(user=self.user_msl2, hcp=self.hcp1, time_of_interaction=timezone.now())
+        assert HCP.objects.get(pk=self.hcp1.pk).interactions_count == 2
+        # cascading from a user
+        User.objects.get(pk=self.user_msl1.pk).delete()
+        assert HCP.objects.get(pk=self.hcp1.pk).interactions_count == 1
+        # queryset deletes
+        Interaction.objects.filter(hcp=self.hcp1).delete()
+        assert HCP.objects.get(pk=self.hcp1.pk).interactions_count == 0
+        Interaction.all_objects.filter(hcp=self.hcp1).undelete()
+        assert HCP.objects.get(pk=self.hcp1.pk).interactions_count == 2
+
+    def test_recount(self):
+        EngagementPlan.objects.update(hcp_items_count=7, approved_hcp_items_count=7)
+        HCP.objects.update(interactions_count=7)
+        HCPObjective.objects.update(deliverables_count=7)
+
+        call_command('recount', batch_size=2, stdout=StringIO())
+
+        ep = self._ep()
+        assert (ep.hcp_items_count, ep.approved_hcp_items_count) == (2, 0)
+        assert [hcp.interactions_count for hcp in HCP.objects.order_by('pk')] == [1, 0, 0]
+        assert HCPObjective.objects.get(description='hcp 2 obj desc').deliverables_count == 2
@@ -0,0 +1,67 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+
+from interactionscore.duplicates import find_duplicates, find_duplicates_of, soundex
+from interactionscore.models import HCP
+from interactionscore.tests.api.common import BaseAPITestCase
+
+
+class TestHCPDuplicates(BaseAPITestCase):
+
+    def setUp(self):
+        self.smith = HCP.objects.create(first_name='John', last_name='Smith',
+                                        institution_name='St. Mary Hospital', city='London')
+        self.smyth = HCP.objects.create(first_name='Jon', last_name='Smyth',
+                                        institution_name='St Mary Hospital', city='London')
+        self.swapped = HCP.objects.create(first_name='Smith', last_name='John',
+                                          email='j.smith@stmary.org')
+        self.jones = HCP.objects.create(first_name='John', last_name='Jones',
+                                        institution_name='St. Mary Hospital', city='London')
+        self.other_email = HCP.objects.create(first_name='J.', last_name='Doe', email='J.Smith@stmary.org ')
+
+    def test_soundex(self):
+        assert soundex('Robert') == soundex('Rupert') == 'R163'
+        assert soundex('Ashcraft') == 'A261'
+        assert soundex('Müller') == soundex('Muller') == 'M460'
+        assert soundex('') == ''
+
+    def test_find_duplicates(self):
+        pairs = [d[1:] for d in find_duplicates()]
+        assert pairs == [(self.swapped.id, self.other_email.id), (self.smith.id, self.smyth.id)]
+        assert find_duplicates()[1][0] >= 0.85
+        # similar enough, but not in a common block (other last name)
+        pairs = [d[1:] for d in find_duplicates(threshold=0.5)]
+        assert (self.smith.id, self.jones.id) not in pairs
+
+    def test_find_duplicates_of(self):
+        hcp = HCP(first_name='Jonh', last_name='Smith', institution_name='Saint Mary Hospital')
+        assert [hcp_id for score, hcp_id in find_duplicates_of(hcp)] == [self.smith.id, self.smyth.id]
+
+    def test_find_duplicates_of_accented_initial(self):
+        olsen = HCP.objects.create(first_name='Anna', last_name='Ölsen', institution_name='Karolinska')
+        hooft = HCP.objects.create(first_name='Gerard', last_name="'t Hooft", institution_name='Utrecht')
+        hcp = HCP(first_name='Anna', last_name='Olsen', institution_name='Karolinska')
+        assert [hcp_id for score, hcp_id in find_duplicates_of(hcp)] == [olsen.id]
+        hcp = HCP(first_name='Gerard', last_name='T Hooft', institution_name='Utrecht')
+        assert [hcp_id for score, hcp_id in find_duplicates_of(hcp)] == [hooft.id]
+        olsen.last_name = 'Olsen'
+        olsen.save()
+        hcp = HCP(first_name='Anna', last_name='Ólsen', institution_name='Karolinska')
+        assert [hcp_id for score, hcp_id in find_duplicates_of(hcp)] == [olsen.id]
+
+    def test_create_check(self):
+        self.client.force_authenticate(self.superuser)
+        res = self.client.post(reverse('hcp-list'), {
+            'first_name': 'John', 'last_name': 'Smith', 'institution_name': 'St Mary Hospital'})
+        assert res.status_code == status.HTTP_201_CREATED
+        assert [d['id'] for d in res.json()['possible_duplicates']] == [self.smith.id, self.smyth.id]
+        assert res.json()['possible_duplicates'][0]['score'] > 0.95
+
+    def test_command(self):
+        out = StringIO()
+        call_command('find_duplicate_hcps', stdout=out)
+        assert '#{} '.format(self.smyth.id) in out.getvalue()
+        assert '2 pairs found' in out.getvalue()
@@ -0,0 +1,89 @@
+import io
+
+from interactionscore.autocomplete import get_index_version
+from interactionscore.importers import HCPImporter, read_rows
+from interactionscore.models import HCP, AffiliateGroup
+from interactionscore.tests.api.common import BaseAPITestCase
+
+
+CSV_DATA = '''First Name;Last Name;Email;Institution;City;Affiliate Groups;TAs;Contact Preference;Consent
+Maria;Tyrol;HCP.1@test.com;General Hospital;Vienna;Affiliate Group 1;TA 1;Email;yes
+John;Gravedigger;;St. Mary;London;Affiliate Group 1 | Affiliate Group 2;TA 2;phone;no
+John;Gravedigger;;St. Mary;Londonderry;;;;
+Bad;Row;not-an-email;;;No Such Group;;;
+;;;;;;;;
+'''
+
+
+class TestHCPImporter(BaseAPITestCase):
+
+    def _import(self, data, **kwargs):
+        f = io.BytesIO(data.encode('utf-8'))
+        return HCPImporter(**kwargs).run(read_rows(f, 'hcps.csv'))
+
+    def test_import_csv(self):
+        self.hcp1.affiliate_groups.set([self.ag2])
+        hcps_count = HCP.objects.count()
+
+        importer = self._import(CSV_DATA)
+
+        # matched hcp1 by email, one new HCP from two rows, one invalid row, blank row skipped
+        assert importer.updated == 1
+        assert importer.created == 1
+        assert [row_number for row_number, _ in importer.errors] == [5]
+        assert 'invalid email' in importer.errors[0][1]
+        assert 'unknown affiliate group' in importer.errors[0][1]
+        assert HCP.objects.count() == hcps_count + 1
+
+        self.hcp1.refresh_from_db()
+        assert self.hcp1.first_name == 'Maria'
+        assert self.hcp1.city == 'Vienna'
+        assert self.hcp1.contact_preference == 'email'
+        assert self.hcp1.has_consented is True
+        assert set(self.hcp1.affiliate_groups.all()) == {self.ag1, self.ag2}
+        assert list(self.hcp1.tas.all()) == [self.ta1]
+
+        new_hcp = HCP.objects.get(last_name='Gravedigger')
+        assert new_hcp.city == 'Londonderry'
+        assert new_hcp.contact_preference is None
+        assert set(new_hcp.affiliate_groups.all()) == {self.ag1, self.ag2}
+
+        # importing again only updates
+        importer = self._import(CSV_DATA)
+        assert importer.created == 0
+        assert importer.updated == 2
+        assert HCP.objects.count() == hcps_count + 1
+
+    def test_import_dry_run(self):
+        hcps_count = HCP.objects.count()
+        importer = self._import(CSV_DATA, dry_run=True)
+        assert (importer.created, importer.updated, len(importer.errors)) == (1, 1, 1)
+        assert HCP.objects.count() == hcps_count
+        assert HCP.objects.get(id=self.hcp1.id).city == ''
+
+    def test_name_match_only_without_email(self):
+        HCP.objects.filter(pk=self.hcp1.pk).update(first_name='Maria', last_name='Tyrol')
+        data = 'First Name,Last Name,Email\nMaria,Tyrol,other@test.com\nMaria,Tyrol,\n'
+
+        importer = self._import(data)
+        assert (importer.created, importer.updated) == (1, 1)
+        assert HCP.objects.get(pk=self.hcp1.pk).email == 'hcp.1@test.com'
+        assert HCP.objects.filter(email='other@test.com').exists()
+
+    def test_names_with_delimiters(self):
+        ag = AffiliateGroup.objects.create(name='Oncology, Europe; North')
+        data = 'Email,Affiliate Groups\nhcp.1@test.com,"Oncology, Europe; North|Affiliate Group 2"\n'
+
+        importer = self._import(data)
+        assert (importer.updated, importer.errors) == (1, [])
+        assert set(HCP.objects.get(pk=self.hcp1.pk).affiliate_groups.all()) == {ag, self.ag2}
+
+    def test_autocomplete_index_outdated(self):
+        version = get_index_version()
+        self._import('Email,First Name\nhcp.1@test.com,Mario\n')  # an update only
+        assert get_index_version() != version
+
+    def test_dry_run_across_batches(self):
+        dry_run = self._import(CSV_DATA, dry_run=True, batch_size=1)
+        importer = self._import(CSV_DATA, batch_size=1)
+        assert (dry_run.created, dry_run.updated) == (importer.created, importer.updated) == (1, 2)
@@ -0,0 +1,126 @@
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.views import APIView
+from rest_framework_jwt.settings import api_settings
+
+from interactionscore.authentication import BrowsableAPISessionAuthentication
+from interactionscore.jwt_auth import ScopedJSONWebTokenAuthentication, check_shared_cache, get_scope_version_cache_key
+from interactionscore.tests.api.common import BaseAPITestCase
+
+
+def get_token(user):
+    return api_settings.JWT_ENCODE_HANDLER(api_settings.JWT_PAYLOAD_HANDLER(user))
+
+
+class TestScopedJWTAuthentication(BaseAPITestCase):
+
+    def setUp(self):
+        # opt-in, the views' classes are read from the settings on import
+        patcher = mock.patch.object(APIView, 'authentication_classes', (
+            ScopedJSONWebTokenAuthentication, BrowsableAPISessionAuthentication))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        cache.clear()
+        self.user_msl1.tas.set([self.ta1])
+        # shared between tests, their scope versions don't roll back
+        self.user_msl1.refresh_from_db()
+        self.user_man1.refresh_from_db()
+
+    def _get(self, user, url):
+        self.client.credentials(HTTP_AUTHORIZATION='JWT ' + get_token(user))
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url)
+        assert res.status_code == status.HTTP_200_OK
+        return res, len(queries)
+
+    def test_scope_claim(self):
+        url = reverse('hcp-list')
+        # first request loads the user and caches its scope version
+        res1, db_queries = self._get(self.user_msl1, url)
+        res2, scope_queries = self._get(self.user_msl1, url)
+        assert scope_queries < db_queries
+        assert res1.json() == res2.json()
+
+    def test_scope_change_committed(self):
+        key = get_scope_version_cache_key(self.user_msl1.pk)
+        callbacks = len(connection.run_on_commit)
+        self.user_msl1.tas.clear()
+        # cached by a request of another process before the commit
+        cache.set(key, self.user_msl1.scope_version - 1)
+        # the test case's transaction is never committed
+        for savepoint_ids, callback in connection.run_on_commit[callbacks:]:
+            callback()
+        assert cache.get(key) is None
+
+    def test_scope_change(self):
+        url = reverse('hcp-list')
+        self._get(self.user_msl1, url)
+        token = get_token(self.user_msl1)
+
+        version = self.user_msl1.scope_version
+        self.user_msl1.affiliate_groups.add(self.ag2)
+        assert self.user_msl1.scope_version == version + 1
+        assert cache.get(get_scope_version_cache_key(self.user_msl1.id)) is None
+
+        # old token still works but the user is loaded from the DB
+        self.client.credentials(HTTP_AUTHORIZATION='JWT ' + token)
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url)
+        assert res.status_code == status.HTTP_200_OK
+        assert any('scope_version' in q['sql'] for q in queries.captured_queries)
+        assert cache.get(get_scope_version_cache_key(self.user_msl1.id)) == version + 1
+
+    def test_deleted_user(self):
+        url = reverse('hcp-list')
+        token = get_token(self.user_man1)
+        self._get(self.user_man1, url)
+        type(self.user_man1).objects.filter(id=self.user_man1.id).delete()
+        self.client.credentials(HTTP_AUTHORIZATION='JWT ' + token)
+        res = self.client.get(url)
+        assert res.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_stale_user_save(self):
+        stale = type(self.user_msl1).objects.get(id=self.user_msl1.id)
+        version = stale.scope_version
+        self.user_msl1.affiliate_groups.add(self.ag2)
+        stale.business_title = 'MSL'
+        stale.save()
+        # bumped twice, not written back from the stale instance
+        self.user_msl1.refresh_from_db()
+        assert self.user_msl1.scope_version == version + 2
+        assert self.user_msl1.business_title == 'MSL'
+
+    def test_stale_user_delete(self):
+        stale = type(self.user_msl1).objects.get(id=self.user_msl1.id)
+        version = stale.scope_version
+        self.user_msl1.affiliate_groups.add(self.ag2)
+        stale.delete()
+        assert type(self.user_msl1).all_objects.get(id=stale.id).scope_version == version + 2
+
+    def test_deactivated_user(self):
+        url = reverse('hcp-list')
+        token = get_token(self.user_man1)
+        self._get(self.user_man1, url)
+        type(self.user_man1).objects.filter(id=self.user_man1.id).update(is_active=False)
+        self.client.credentials(HTTP_AUTHORIZATION='JWT ' + token)
+        res = self.client.get(url)
+        assert res.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_check_shared_cache():
+    assert check_shared_cache(None) == []  # not enabled
+    scoped = dict(settings.REST_FRAMEWORK, DEFAULT_AUTHENTICATION_CLASSES=(
+        'interactionscore.jwt_auth.ScopedJSONWebTokenAuthentication',))
+    with override_settings(REST_FRAMEWORK=scoped):
+        # the tests' local memory cache
+        assert [warning.id for warning in check_shared_cache(None)] == ['interactionscore.W002']
+        with override_settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'cache'}}):
+            assert check_shared_cache(None) == []
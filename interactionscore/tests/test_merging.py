@@ -0,0 +1,98 @@
+import json
+
+import pytest
+from django.contrib.admin.models import LogEntry
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from interactionscore.merging import MergeError, merge_hcps
+from interactionscore.models import (
+    EngagementPlan,
+    EngagementPlanHCPItem,
+    HCP,
+    HCPMerge,
+    HCPObjective,
+    Interaction,
+)
+from interactionscore.tests.api.common import BaseAPITestCase
+
+
+class TestMergeHCPs(BaseAPITestCase):
+
+    def setUp(self):
+        self.hcp = HCP.objects.get(pk=self.hcp1.pk)
+        self.duplicate = HCP.objects.get(pk=self.hcp2.pk)
+        self.hcp.affiliate_groups.set([self.ag1])
+        self.duplicate.affiliate_groups.set([self.ag1, self.ag2])
+        self.duplicate.tas.set([self.ta1])
+        HCP.objects.filter(pk=self.duplicate.pk).update(first_name='Jon', institution_name='St Mary')
+        self.duplicate.refresh_from_db()
+
+    def _create_interactions(self, count):
+        for _ in range(count):
+            Interaction.objects.create(user=self.user_msl1, hcp=self.duplicate,
+                                       time_of_interaction=timezone.now())
+
+    def test_merge(self):
+        self._create_interactions(2)
+        Interaction.objects.filter(hcp=self.duplicate).first().delete()
+        interactions_count = Interaction.all_objects.filter(hcp__in=(self.hcp, self.duplicate)).count()
+
+        merge = merge_hcps(self.hcp, self.duplicate, user=self.superuser)
+
+        assert Interaction.all_objects.filter(hcp=self.hcp).count() == interactions_count
+        # both on ep1: one item left, with the objectives of both
+        item = EngagementPlanHCPItem.objects.get(hcp=self.hcp)
+        objective = HCPObjective.objects.get(description='hcp 2 obj desc')
+        assert (objective.hcp_id, objective.engagement_plan_item_id) == (self.hcp.pk, item.pk)
+        assert item.objectives_count == item.objectives.count() == 3
+        assert EngagementPlan.objects.get(pk=self.ep1.pk).hcp_items_count == 1
+        assert set(self.hcp.affiliate_groups.all()) == {self.ag1, self.ag2}
+        assert list(self.hcp.tas.all()) == [self.ta1]
+        assert not HCP.affiliate_groups.through.objects.filter(hcp=self.duplicate).exists()
+
+        self.hcp.refresh_from_db()
+        assert (self.hcp.first_name, self.hcp.institution_name) == ('Jon', 'St Mary')  # blanks filled
+        assert not HCP.objects.filter(pk=self.duplicate.pk).exists()
+        assert HCP.all_objects.filter(pk=self.duplicate.pk).exists()
+
+        assert (merge.hcp, merge.merged_hcp, merge.merged_by) == (self.hcp, self.duplicate, self.superuser)
+        data = json.loads(merge.data)
+        assert data['fields']['email'] == 'hcp.2@test.com'
+        assert data['moved']['interactionscore.Interaction'] == interactions_count - 1
+        assert data['filled'] == ['first_name', 'institution_name']
+        assert data['merged_engagement_plan_items'] == 1
+
+    def test_bulk_updates(self):
+        def merge_queries_count(interactions_count):
+            hcp = HCP.objects.create(email='hcp@test.com')
+            self.duplicate = HCP.objects.create(email='duplicate@test.com')
+            self._create_interactions(interactions_count)
+            with CaptureQueriesContext(connection) as queries:
+                merge_hcps(hcp, self.duplicate)
+            assert Interaction.objects.filter(hcp=hcp).count() == interactions_count
+            return len(queries)
+
+        assert merge_queries_count(1) == merge_queries_count(5)
+
+    def test_errors(self):
+        with pytest.raises(MergeError):
+            merge_hcps(self.hcp, self.hcp)
+        self.duplicate.delete()
+        with pytest.raises(MergeError):
+            merge_hcps(self.hcp, self.duplicate)
+        assert not HCPMerge.objects.exists()
+
+    def test_admin_action(self):
+        self.client.force_login(self.superuser)
+        res = self.client.post(reverse('admin:interactionscore_hcp_changelist'), {
+            'action': 'action_hcps_merge',
+            'index': 0,
+            '_selected_action': [self.duplicate.pk, self.hcp.pk, self.hcp3.pk],
+        }, format='multipart')
+        assert res.status_code == 302
+        assert list(HCP.objects.all()) == [self.hcp]
+        assert HCPMerge.objects.filter(hcp=self.hcp).count() == 2
+        assert LogEntry.objects.filter(object_id=str(self.hcp.pk)).count() == 2
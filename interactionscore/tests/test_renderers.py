@@ -0,0 +1,67 @@
+import datetime
+import decimal
+import importlib
+import sys
+import types
+import uuid
+from io import BytesIO, StringIO
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from interactionscore import parsers, renderers
+from interactionscore.parsers import ORJSONParser
+from interactionscore.renderers import ORJSONRenderer
+from interactionscore.tests.api.common import BaseAPITestCase
+
+
+def test_render_like_json_renderer():
+    data = {
+        'created_at': datetime.datetime(2018, 6, 1, 12, 30, 15, 123456, tzinfo=timezone.utc),
+        'day': datetime.date(2018, 6, 1),
+        'amount': decimal.Decimal('1.50'),
+        'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+        'label': gettext_lazy('Name'),
+        'text': 'naïve line',
+        1: [None, True, 2.5],
+    }
+    assert ORJSONRenderer().render(data) == JSONRenderer().render(data)
+    assert ORJSONRenderer().render(None) == b''
+    indented = ORJSONRenderer().render({'a': 1}, 'application/json; indent=4')
+    assert indented == JSONRenderer().render({'a': 1}, 'application/json; indent=4')
+
+
+def test_parse():
+    data = ORJSONParser().parse(BytesIO('{"a": [1, "é"]}'.encode()))
+    assert data == {'a': [1, 'é']}
+    with pytest.raises(ParseError):
+        ORJSONParser().parse(BytesIO(b'{"a": NaN}'))
+    with pytest.raises(ParseError):
+        ORJSONParser().parse(BytesIO(b'{"a": '))
+
+
+def test_old_orjson(monkeypatch):
+    # orjson 2: no OPT_NON_STR_KEYS nor OPT_PASSTHROUGH_DATETIME
+    monkeypatch.setitem(sys.modules, 'orjson', types.ModuleType('orjson'))
+    try:
+        importlib.reload(renderers)
+        importlib.reload(parsers)
+        assert renderers.orjson is None and parsers.orjson is None
+        assert renderers.ORJSONRenderer().render({1: 'a'}) == JSONRenderer().render({1: 'a'})
+        assert parsers.ORJSONParser().parse(BytesIO(b'{"a": 1}')) == {'a': 1}
+    finally:
+        monkeypatch.undo()
+        importlib.reload(renderers)
+        importlib.reload(parsers)
+
+
+class TestBenchmarkJSON(BaseAPITestCase):
+
+    def test_benchmark_json(self):
+        out = StringIO()
+        call_command('benchmark_json', size=50, repeat=1, stdout=out)
+        assert '- ORJSONRenderer' in out.getvalue()
@@ -0,0 +1,35 @@
+from io import StringIO
+
+from django.core.management import call_command
+
+from interactionscore.models import HCP, TherapeuticArea
+from interactionscore.scopes import filter_m2m
+from interactionscore.tests.api.common import BaseAPITestCase
+
+
+class TestScopes(BaseAPITestCase):
+
+    def test_filter_m2m(self):
+        self.hcp1.affiliate_groups.set([self.ag1, self.ag2])
+        self.hcp1.tas.set([self.ta1, self.ta2])
+        self.hcp2.affiliate_groups.set([self.ag2])
+        self.hcp2.tas.set([self.ta3])
+        self.hcp3.tas.set([self.ta1])
+
+        def ids(qs):
+            return sorted(hcp.id for hcp in qs)
+
+        qs = filter_m2m(HCP.objects.all(), affiliate_groups=[self.ag1.id, self.ag2.id])
+        assert ids(qs) == [self.hcp1.id, self.hcp2.id]
+        # no duplicates without distinct()
+        qs = filter_m2m(qs, tas=TherapeuticArea.objects.filter(id__in=[self.ta1.id, self.ta2.id]))
+        assert ids(qs) == [self.hcp1.id]
+        # any of the lookups
+        qs = filter_m2m(HCP.objects.all(), affiliate_groups=[self.ag2.id], tas=[self.ta1.id])
+        assert ids(qs) == [self.hcp1.id, self.hcp2.id, self.hcp3.id]
+
+    def test_benchmark_scope_filters(self):
+        out = StringIO()
+        call_command('benchmark_scope_filters', hcps=50, repeat=1, stdout=out)
+        assert '- exists' in out.getvalue()
+        assert not HCP.objects.filter(first_name__startswith='Benchmark HCP ').exists()
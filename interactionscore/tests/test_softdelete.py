@@ -0,0 +1,84 @@
+from django.apps import apps
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from safedelete.models import SafeDeleteModel, is_safedelete_cls
+
+from interactionscore.models import Comment, EngagementPlan, EngagementPlanHCPItem, User
+from interactionscore.tests.api.common import BaseAPITestCase
+
+
+def get_deleted_rows():
+    return {
+        (model._meta.label, pk)
+        for model in apps.get_app_config('interactionscore').get_models()
+        if is_safedelete_cls(model)
+        for pk in model.deleted_objects.values_list('pk', flat=True)
+    }
+
+
+def safedelete_cascade(obj):
+    """Original safedelete cascade (per object, through the admin collector)."""
+    return SafeDeleteModel.delete(obj)
+
+
+class TestSoftDeleteCascade(BaseAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        hcp_item = cls.ep1.hcp_items.get(hcp=cls.hcp1)
+        obj = hcp_item.objectives.first()
+        Comment.objects.create(user=cls.user_man1, engagement_plan_hcp_item=hcp_item, message='item')
+        Comment.objects.create(user=cls.user_man1, hcp_deliverable=obj.deliverables.first(), message='deliv')
+
+    def _run_and_get_deleted_rows(self, func):
+        """Run `func`, return resulting soft-deleted rows, then roll back."""
+        sid = transaction.savepoint()
+        with CaptureQueriesContext(connection) as ctx:
+            func()
+        rows = get_deleted_rows()
+        transaction.savepoint_rollback(sid)
+        return rows, len(ctx.captured_queries)
+
+    def _assert_same_as_safedelete(self, new_delete, old_delete):
+        old_rows, old_queries = self._run_and_get_deleted_rows(old_delete)
+        new_rows, new_queries = self._run_and_get_deleted_rows(new_delete)
+        assert old_rows
+        assert new_rows == old_rows
+        assert new_queries < old_queries
+
+    def test_engagement_plan_delete(self):
+        ep = EngagementPlan.objects.get(id=self.ep1.id)
+        self._assert_same_as_safedelete(ep.delete, lambda: safedelete_cascade(ep))
+
+    def test_user_delete(self):
+        user = User.objects.get(id=self.user_msl1.id)
+        self._assert_same_as_safedelete(user.delete, lambda: safedelete_cascade(user))
+
+    def test_queryset_delete(self):
+        # as done by NestedWritableFieldsSerializerMixin.update
+        qs = self.ep1.hcp_items.exclude(hcp=self.hcp2)
+
+        def old_delete():
+            for item in EngagementPlanHCPItem.objects.filter(id__in=qs.values('id')):
+                safedelete_cascade(item)
+
+        self._assert_same_as_safedelete(qs.delete, old_delete)
+
+    def test_undelete(self):
+        ep = EngagementPlan.objects.get(id=self.ep1.id)
+        ep.delete()
+        assert not EngagementPlan.objects.filter(id=ep.id).exists()
+        assert not Comment.objects.exists()
+
+        ep.undelete()
+        assert get_deleted_rows() == set()
+        assert Comment.objects.count() == 2
+        assert self.ep1.hcp_items.count() == 2
+
+    def test_queryset_undelete(self):
+        EngagementPlan.objects.filter(id=self.ep1.id).delete()
+        assert EngagementPlan.deleted_objects.filter(id=self.ep1.id).exists()
+
+        EngagementPlan.deleted_objects.filter(id=self.ep1.id).undelete()
+        assert get_deleted_rows() == set()
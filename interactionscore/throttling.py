@@ -0,0 +1,85 @@
+"""Rate and concurrency limits of the API, per user (or IP when anonymous).
+
+Both keep their state in the default cache: limits are per process with the
+local memory cache, use a shared one (memcached, redis) in production.
+Throttled requests get a 429 response with a `Retry-After` header.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle, ScopedRateThrottle
+
+DEFAULT_SCOPE = 'api'
+EXPENSIVE_SCOPE = 'expensive'
+CONCURRENT_REQUESTS_KEY_ATTR = 'concurrent_requests_cache_key'
+
+
+class UserScopedRateThrottle(ScopedRateThrottle):
+    """`ScopedRateThrottle` applied to all views: their `throttle_scope`
+    when set (eg. 'reference' for cheap reference data), else 'expensive' for
+    `expensive_actions` and 'api' for everything else.
+    """
+    expensive_actions = ('list',)
+
+    def __init__(self):
+        # read when throttling (not on import) so settings overrides apply
+        self.THROTTLE_RATES = api_settings.DEFAULT_THROTTLE_RATES
+
+    def allow_request(self, request, view):
+        if not getattr(view, self.scope_attr, None):
+            view.throttle_scope = (EXPENSIVE_SCOPE if getattr(view, 'action', None) in self.expensive_actions
+                                   else DEFAULT_SCOPE)
+        return super().allow_request(request, view)
+
+
+class ConcurrentRequestsThrottle(BaseThrottle):
+    """Allow up to `API_MAX_CONCURRENT_REQUESTS` requests in progress per user.
+
+    Requests are counted until `ConcurrentRequestsMiddleware` sees their
+    response, so this must be the last throttle class. Counts expire
+    `API_CONCURRENT_REQUESTS_TIMEOUT` seconds after the first request of a
+    burst, in case a worker gets killed before releasing its request.
+    """
+    cache_format = 'throttle_concurrent_%(ident)s'
+
+    def allow_request(self, request, view):
+        if not settings.API_MAX_CONCURRENT_REQUESTS:
+            return True
+        ident = request.user.pk if request.user.is_authenticated else self.get_ident(request)
+        key = self.cache_format % {'ident': ident}
+        cache.add(key, 0, settings.API_CONCURRENT_REQUESTS_TIMEOUT)
+        try:
+            count = cache.incr(key)
+        except ValueError:  # expired in between
+            cache.add(key, 1, settings.API_CONCURRENT_REQUESTS_TIMEOUT)
+            count = 1
+        if count > settings.API_MAX_CONCURRENT_REQUESTS:
+            release_concurrent_request(key)
+            return False
+        setattr(request._request, CONCURRENT_REQUESTS_KEY_ATTR, key)
+        return True
+
+    def wait(self):
+        return 1
+
+
+def release_concurrent_request(key):
+    try:
+        cache.decr(key)
+    except ValueError:  # expired
+        pass
+
+
+class ConcurrentRequestsMiddleware:
+    """Releases the requests counted by `ConcurrentRequestsThrottle`."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            return self.get_response(request)
+        finally:
+            key = getattr(request, CONCURRENT_REQUESTS_KEY_ATTR, None)
+            if key is not None:
+                release_concurrent_request(key)
@@ -1,8 +1,17 @@
+import datetime
+import io
+import itertools
+import os
+
+from django.conf import settings
 from django.utils import timezone
-from django.db.models import Q
+from django.utils.cache import get_conditional_response
+from django.utils.text import slugify
+from django.db import transaction
+from django.db.models import F
 from rest_framework import viewsets, status, mixins
 from rest_framework import permissions
-from rest_framework.exceptions import APIException
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
@@ -11,6 +20,9 @@ from rest_framework.permissions import (
     IsAuthenticated,
 )
 
+from .autocomplete import autocomplete_hcps
+from .changes import read_changes
+from .duplicates import find_duplicates_of
 from .models import (
     EngagementPlan,
     EngagementPlanPerms,
@@ -19,23 +31,46 @@ from .models import (
     AffiliateGroup,
     TherapeuticArea,
     Resource,
+    ResourceUpload,
     Project,
     Interaction,
+    ArchivedInteraction,
     HCPObjective,
-    User,
+    HCPDeliverable,
+    ProjectDeliverable,
+    Comment,
     BrandCriticalSuccessFactor,
     MedicalPlanObjective,
 )
+from .fingerprints import FingerprintETagMixin, get_queryset_fingerprint, get_serializer_related
+from .plans import get_current_plan
+from .filters import (
+    CommentFilterSet,
+    DeliverableFilterSet,
+    EngagementPlanFilterSet,
+    HCPFilterSet,
+    HCPObjectiveFilterSet,
+    ProjectFilterSet,
+    ResourceFilterSet,
+    TAObjectiveFilterSet,
+    filter_visible_engagement_plans,
+)
+from .storage import file_response, resource_storage
+from .throttling import UserScopedRateThrottle
 from .serializers import (
     AffiliateGroupSerializer,
     ProjectSerializer,
     TherapeuticAreaSerializer,
     ResourceSerializer,
+    ResourceUploadSerializer,
     EngagementPlanSerializer,
     HCPSerializer,
     InteractionSerializer,
     UserSerializer,
     HCPObjectiveSerializer,
+    CommentFeedSerializer,
+    HCPDeliverableListSerializer,
+    ProjectDeliverableListSerializer,
     BrandCriticalSuccessFactorSerializer,
     MedicalPlanObjectiveSerializer,
 )
@@ -49,71 +84,24 @@ class AffiliateGroupViewSet(viewsets.ModelViewSet):
     queryset = AffiliateGroup.objects.all()
     serializer_class = AffiliateGroupSerializer
     permission_classes = (IsAuthenticated,)
+    throttle_scope = 'reference'
 
 
 class BrandCriticalSuccessFactorViewSet(viewsets.ModelViewSet):
     queryset = BrandCriticalSuccessFactor.objects.all()
     serializer_class = BrandCriticalSuccessFactorSerializer
     permission_classes = (IsAuthenticated,)
-
-    def filter_queryset(self, qs):
-        qs = super().filter_queryset(qs)
-
-        user_id = self.request.query_params.get('user', None)
-        ta_id = self.request.query_params.get('ta', None)
-
-        affiliate_group_ids = self.request.query_params.get('affiliate_groups', None)
-        if affiliate_group_ids:
-            affiliate_group_ids = affiliate_group_ids.split(',')
-
-        if user_id:
-            qs = qs.filter(user_id=user_id)
-
-        if not ta_id and not self.request.user.is_staff:
-            qs = qs.filter(ta_id__in=self.request.user.tas.all())
-        else:
-            qs = qs.filter(ta_id=ta_id)
-
-        if not affiliate_group_ids and not self.request.user.is_staff:
-            affiliate_group_ids = self.request.user.affiliate_groups.all()
-        if affiliate_group_ids:
-            qs = qs.filter(affiliate_groups__in=affiliate_group_ids)
-
-        return qs.distinct()
+    filterset_class = TAObjectiveFilterSet
 
 
 class MedicalPlanObjectiveViewSet(viewsets.ModelViewSet):
     queryset = MedicalPlanObjective.objects.all()
     serializer_class = MedicalPlanObjectiveSerializer
     permission_classes = (IsAuthenticated,)
+    filterset_class = TAObjectiveFilterSet
 
-    def filter_queryset(self, qs):
-        qs = super().filter_queryset(qs)
-
-        user_id = self.request.query_params.get('user', None)
-        ta_id = self.request.query_params.get('ta', None)
-
-        affiliate_group_ids = self.request.query_params.get('affiliate_groups', None)
-        if affiliate_group_ids:
-            affiliate_group_ids = affiliate_group_ids.split(',')
-
-        if user_id:
-            qs = qs.filter(user_id=user_id)
-
-        if not ta_id and not self.request.user.is_staff:
-            qs = qs.filter(ta_id__in=self.request.user.tas.all())
-        else:
-            qs = qs.filter(ta_id=ta_id)
 
-        if not affiliate_group_ids and not self.request.user.is_staff:
-            affiliate_group_ids = self.request.user.affiliate_groups.all()
-        if affiliate_group_ids:
-            qs = qs.filter(affiliate_groups__in=affiliate_group_ids)
-
-        return qs.distinct()
-
-
-class ProjectViewSet(viewsets.ModelViewSet):
+class ProjectViewSet(FingerprintETagMixin, viewsets.ModelViewSet):
     """
     list:
     ### **URL Query Parameters**
@@ -127,54 +115,16 @@ class ProjectViewSet(viewsets.ModelViewSet):
     queryset = Project.objects.all()
     serializer_class = ProjectSerializer
     permission_classes = (IsAuthenticated,)
-
-    def filter_queryset(self, qs):
-        qs = super().filter_queryset(qs)
-
-        #################################################
-        # Filtering
-        #################################################
-
-        user_id = self.request.query_params.get('user', None)
-        project_type = self.request.query_params.get('type', None)
-        ta_ids = self.request.query_params.get('tas', None)
-        if ta_ids:
-            ta_ids = ta_ids.split(',')
-        affiliate_group_ids = self.request.query_params.get('affiliate_groups', None)
-        if affiliate_group_ids:
-            affiliate_group_ids = affiliate_group_ids.split(',')
-
-        if user_id:
-            qs = qs.filter(user_id=user_id)
-
-        if project_type:
-            qs = qs.filter(type=project_type)
-
-        if not ta_ids and not self.request.user.is_staff:
-            ta_ids = self.request.user.tas.all()
-        if ta_ids:
-            qs = qs.filter(tas__in=ta_ids)
-
-        if not affiliate_group_ids and not self.request.user.is_staff:
-            affiliate_group_ids = self.request.user.affiliate_groups.all()
-        if affiliate_group_ids:
-            qs = qs.filter(affiliate_groups__in=affiliate_group_ids)
-
-        #################################################
-        # Searching
-        #################################################
-
-        search = self.request.query_params.get('search', None)
-        if search:
-            qs = Project.add_full_text_search_to_query(qs, search)
-
-        return qs.distinct()
+    filterset_class = ProjectFilterSet
+    fingerprint_related = ('affiliate_groups', 'tas')
+    cache_list_responses = True
 
 
 class TherapeuticAreaViewSet(viewsets.ModelViewSet):
     queryset = TherapeuticArea.objects.all()
     serializer_class = TherapeuticAreaSerializer
     permission_classes = (IsAuthenticated,)
+    throttle_scope = 'reference'
 
 
 class ResourceViewSet(viewsets.ModelViewSet):
@@ -190,39 +140,134 @@ class ResourceViewSet(viewsets.ModelViewSet):
     queryset = Resource.objects.all()
     serializer_class = ResourceSerializer
     permission_classes = (IsAuthenticated,)
+    filterset_class = ResourceFilterSet
 
-    def filter_queryset(self, qs):
-        qs = super().filter_queryset(qs)
+    @action(methods=['get'], detail=True, url_path='download')
+    def download(self, request, pk=None):
+        """
+        Download the Resource file (only for Resources visible to the user,
+        see list filtering). Supports `Range` requests.
+        """
+        resource = self.get_object()
+        if not resource.file:
+            raise NotFound('Resource has no file.')
+        ext = os.path.splitext(resource.file.name)[1]
+        filename = (slugify(resource.title) or 'resource') + ext
+        return file_response(request, resource.file, filename)
+
+    @action(methods=['get'], detail=True, url_path='thumbnail')
+    def thumbnail(self, request, pk=None):
+        """
+        JPEG thumbnail of the Resource file, when one could be made. Its URL
+        (see `thumbnail` field) changes with the file, so it is cacheable.
+        """
+        resource = self.get_object()
+        if not resource.thumbnail:
+            raise NotFound('Resource has no thumbnail.')
+        filename = (slugify(resource.title) or 'resource') + '.jpg'
+        response = file_response(request, resource.thumbnail, filename, as_attachment=False)
+        if request.query_params.get('v'):
+            response['Cache-Control'] = 'private, max-age={}'.format(365 * 24 * 3600)
+        return response
+
+
+class ResourceUploadViewSet(mixins.CreateModelMixin,
+                            mixins.RetrieveModelMixin,
+                            mixins.DestroyModelMixin,
+                            viewsets.GenericViewSet):
+    """
+    Chunked (resumable) upload of a Resource file:
 
-        user_id = self.request.query_params.get('user', None)
-        ta_ids = self.request.query_params.get('tas', None)
-        if ta_ids:
-            ta_ids = ta_ids.split(',')
-        affiliate_group_ids = self.request.query_params.get('affiliate_groups', None)
-        if affiliate_group_ids:
-            affiliate_group_ids = affiliate_group_ids.split(',')
+    1. `POST` the `filename` and `size` (in bytes), the response gives the
+       upload `id`, `chunk_size` and `chunks_count`
+    2. `PUT` each chunk to `chunks/<index>/` (see below), in any order
+    3. `POST` the Resource fields to `finalize/` to get the new Resource
 
-        if user_id:
-            user = User.objects.get(id=user_id)
-            qs = qs.filter(
-                Q(tas__in=user.tas.all()) |
-                Q(affiliate_groups__in=user.affiliate_groups.all())
-            )
+    To resume an interrupted upload `GET` it and only send the chunks
+    missing from `received_chunks`. `DELETE` aborts it.
+    """
+    queryset = ResourceUpload.objects.all()
+    serializer_class = ResourceUploadSerializer
+    permission_classes = (IsAuthenticated,)
 
-        if not ta_ids and not self.request.user.is_staff:
-            ta_ids = self.request.user.tas.all()
-        if ta_ids:
-            qs = qs.filter(tas__in=ta_ids)
+    def get_queryset(self):
+        # an upload is only visible to its user
+        return super().get_queryset().filter(user=self.request.user)
 
-        if not affiliate_group_ids and not self.request.user.is_staff:
-            affiliate_group_ids = self.request.user.affiliate_groups.all()
-        if affiliate_group_ids:
-            qs = qs.filter(affiliate_groups__in=affiliate_group_ids)
+    def perform_destroy(self, instance):
+        instance.delete_chunks()
+        instance.delete()
 
-        return qs.distinct()
+    @action(methods=['put'], detail=True, url_path=r'chunks/(?P<index>\d+)')
+    def chunk(self, request, pk=None, index=None):
+        """
+        Upload chunk `index` (counting from 0) as the raw request body, with its
+        sha256 hex digest in the `X-Chunk-Checksum` header. All chunks except
+        the last one are `chunk_size` bytes. Sending a chunk again replaces it.
+        """
+        upload = self.get_object()
+        index = int(index)
+        if upload.resource_id:
+            raise ValidationError('Upload is already finalized.')
+        if index >= upload.chunks_count:
+            raise ValidationError({'index': 'Upload only has {} chunks.'.format(upload.chunks_count)})
+        checksum = request.META.get('HTTP_X_CHUNK_CHECKSUM', '').strip().lower()
+        if not checksum:
+            raise ValidationError('X-Chunk-Checksum header is required.')
+
+        upload.chunks.filter(index=index).delete()
+        size, actual_checksum = upload.save_chunk(index, request.stream or io.BytesIO())
+        if size != upload.get_chunk_size(index) or actual_checksum != checksum:
+            resource_storage.delete(upload.get_chunk_name(index))
+            if size != upload.get_chunk_size(index):
+                raise ValidationError('Chunk {} should be {} bytes, got {}.'.format(
+                    index, upload.get_chunk_size(index), size))
+            raise ValidationError('Checksum mismatch for chunk {}.'.format(index))
+        upload.chunks.create(index=index, size=size, checksum=checksum)
+
+        return Response(self.get_serializer(upload).data)
+
+    @action(methods=['post'], detail=True, url_path='finalize')
+    def finalize(self, request, pk=None):
+        """
+        ### **Body Parameters**
 
+        * Resource fields (`title`, `description`, `tas`, ...)
+        * `checksum` - sha256 hex digest of the whole file, optional
 
-class HCPViewSet(viewsets.ModelViewSet):
+        ---
+        """
+        upload = self.get_object()
+        if upload.resource_id:
+            raise ValidationError('Upload is already finalized.')
+        received = set(upload.chunks.values_list('index', flat=True))
+        missing = [i for i in range(upload.chunks_count) if i not in received]
+        if missing:
+            raise ValidationError({'chunks': 'Missing chunks: {}.'.format(missing)})
+
+        data = request.data.copy()
+        data.setdefault('user_id', request.user.id)
+        checksum = data.pop('checksum', None)
+        serializer = ResourceSerializer(data=data, context=self.get_serializer_context())
+        serializer.is_valid(raise_exception=True)
+
+        if isinstance(checksum, list):  # from a QueryDict
+            checksum = checksum[0]
+        with transaction.atomic():  # the StoredFile stays locked until referenced
+            stored_file = upload.assemble()
+            # else an unreferenced StoredFile, left to gc_resource_files
+            if not checksum or checksum.strip().lower() == stored_file.sha256:
+                upload.resource = serializer.save(file=stored_file.name)
+                upload.save()
+                upload.chunks.all().delete()
+        if upload.resource_id is None:
+            raise ValidationError({'checksum': 'Checksum mismatch.'})
+        upload.delete_chunks()
+
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class HCPViewSet(FingerprintETagMixin, viewsets.ModelViewSet):
     """
     list:
     ### **URL Query Parameters**
@@ -235,64 +280,42 @@ class HCPViewSet(viewsets.ModelViewSet):
     queryset = HCP.objects.all()
     serializer_class = HCPSerializer
     permission_classes = (IsAuthenticated,)
+    filterset_class = HCPFilterSet
+    fingerprint_related = ('affiliate_groups', 'tas', 'interactions', 'archived_interactions')
+    cache_list_responses = True
+    throttle_scope = None  # 'autocomplete' for autocomplete()
 
-    def filter_queryset(self, qs):
-        qs = super().filter_queryset(qs)
-
-        #################################################
-        # Filtering
-        #################################################
-
-        user_id = self.request.query_params.get('user', None)
-        engagement_plan = self.request.query_params.get('engagement_plan', None)
-
-        engagement_plan_id = None
-        if engagement_plan:
-            if engagement_plan == 'current':
-                if not user_id:
-                    raise APIException('user needs to be specified '
-                                       'when requesting current EngagementPlan')
-                engagement_plan_id = EngagementPlan.objects.get(
-                    user_id=user_id,
-                    year=timezone.now().year
-                ).id
-            else:
-                engagement_plan_id = engagement_plan
-
-        # get HCPs in user's current engagement plan
-        # (or, in general, get HCPs referenced by an EP while also asserting EP
-        #  belongs to a user)
-        if user_id and engagement_plan_id:
-            qs = qs.filter(
-                engagementplanhcpitem__engagement_plan_id=engagement_plan_id,
-                engagementplanhcpitem__engagement_plan__user_id=user_id,
-            )
-        # get HCPs with TAs and AGs in common with this user
-        elif user_id:
-            user = User.objects.get(id=user_id)
-            qs = qs.filter(
-                Q(tas__in=user.tas.all()) |
-                Q(affiliate_groups__in=user.affiliate_groups.all())
-            )
-        # get HCPs reference in this EP
-        elif engagement_plan_id:
-            qs = qs.filter(engagementplanhcpitem__engagement_plan_id=engagement_plan_id)
-
-        if not self.request.user.is_staff:
-            qs = qs.filter(
-                affiliate_groups__in=self.request.user.affiliate_groups.all(),
-                tas__in=self.request.user.tas.all(),
-            )
-
-        #################################################
-        # Searching
-        #################################################
-
-        search = self.request.query_params.get('search', None)
-        if search:
-            qs = HCP.add_full_text_search_to_query(qs, search)
-
-        return qs.distinct()
+    def create(self, request, *args, **kwargs):
+        """
+        The response also has `possible_duplicates`: `[{id, score}]` of the
+        existing HCPs (visible to the user) looking like the new one.
+        """
+        response = super().create(request, *args, **kwargs)
+        response.data['possible_duplicates'] = [
+            {'id': hcp_id, 'score': round(score, 2)}
+            for score, hcp_id in find_duplicates_of(self.created_hcp, self.filter_queryset(self.get_queryset()))
+        ]
+        return response
+
+    def perform_create(self, serializer):
+        self.created_hcp = serializer.save()
+
+    @action(methods=['get'], detail=False, url_path='autocomplete', throttle_scope='autocomplete')
+    def autocomplete(self, request):
+        """
+        `[id, name, institution]` of the HCPs visible to the user with words
+        starting with each word of `q` (eg. `q=jo smi`), ordered by name.
+
+        * `limit=<n>` - max number of results
+        """
+        try:
+            limit = int(request.query_params.get('limit', settings.HCP_AUTOCOMPLETE_LIMIT))
+        except ValueError:
+            raise ValidationError({'limit': ['A valid integer is required.']})
+        if not 0 < limit <= settings.HCP_AUTOCOMPLETE_MAX_LIMIT:
+            raise ValidationError({'limit': ['Must be between 1 and {}.'.format(
+                settings.HCP_AUTOCOMPLETE_MAX_LIMIT)]})
+        return Response(autocomplete_hcps(request.user, request.query_params.get('q', ''), limit))
 
 
 class HCPObjectiveViewSet(viewsets.ModelViewSet):
@@ -308,70 +331,130 @@ class HCPObjectiveViewSet(viewsets.ModelViewSet):
     queryset = HCPObjective.objects.all()
     serializer_class = HCPObjectiveSerializer
     permission_classes = (IsAuthenticated,)
+    filterset_class = HCPObjectiveFilterSet
 
-    def filter_queryset(self, qs):
-        qs = super().filter_queryset(qs)
-
-        user_id = self.request.query_params.get('user', None)
-        hcp_id = self.request.query_params.get('hcp', None)
-        engagement_plan = self.request.query_params.get('engagement_plan', None)
-
-        if user_id and not engagement_plan:
-            engagement_plan = 'current'
-
-        engagement_plan_id = None
-        if engagement_plan:
-            if engagement_plan == 'current' and user_id:
-                eplan = EngagementPlan.objects.filter(
-                    user_id=user_id,
-                    year=timezone.now().year
-                ).first()
-                if not eplan:
-                    return qs.none()
-                engagement_plan_id = eplan.id
-            else:
-                engagement_plan_id = engagement_plan
-
-        if hcp_id:
-            qs = qs.filter(hcp_id=hcp_id)
-            if not user_id and engagement_plan == 'current':
-                qs = qs.filter(
-                    engagement_plan_item__engagement_plan___year=timezone.now().year,
-                )
-
-        # get HCPObjs in user's current engagement plan
-        # (or, in general, get HCPObjs referenced by an EP while also asserting
-        #  EP belongs to a user)
-        if user_id and engagement_plan_id:
-            qs = qs.filter(
-                engagement_plan_item__approved=True,
-                engagement_plan_item__engagement_plan_id=engagement_plan_id,
-                engagement_plan_item__engagement_plan__user_id=user_id,
-            )
-        # get HCPObjs reference in this EP
-        elif engagement_plan_id:
-            qs = qs.filter(
-                engagement_plan_item__approved=True,
-                engagement_plan_item__engagement_plan_id=engagement_plan_id)
-
-        return qs.distinct()
-
-
-class InteractionViewSet(mixins.CreateModelMixin,
+
+class CommentViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    """
+    list:
+    Newest comments first.
+
+    ### **URL Query Parameters**
+
+    * `engagement_plan=<id>` - comments on this plan or anything in it
+    * `engagement_plan_hcp_item=<id>`, `hcp_objective=<id>`, `hcp_deliverable=<id>`...
+      - comments on this row
+    * `target=engagement_plan|hcp_objective|...` - comments on this kind of rows
+    * `user=<id>` - comments by this user
+    """
+    queryset = Comment.objects.select_related('user').order_by('-created_at', '-id')
+    serializer_class = CommentFeedSerializer
+    permission_classes = (IsAuthenticated,)
+    filterset_class = CommentFilterSet
+    pagination_class = Pagination
+
+
+class DeliverableViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    """
+    list:
+    ### **URL Query Parameters**
+
+    * `engagement_plan=<id>|current`, `user=<id>` - deliverables of these
+      engagement plans (of the ones the user can see)
+    * `quarter_type=past|current|future`, `quarter=<1-4>` - deliverables of
+      these quarters
+    * `status=<status>[,<status>...]` - eg. `slightly_behind,major_issue`
+      for the ones at risk
+
+    rollup:
+    Counts of the deliverables (filtered as above) by status, per
+    `group_by=objective|engagement_plan_item|engagement_plan`.
+    """
+    permission_classes = (IsAuthenticated,)
+    filterset_class = DeliverableFilterSet
+    pagination_class = Pagination
+    rollup_groups = {
+        'objective': 'objective',
+        'engagement_plan_item': 'objective__engagement_plan_item',
+        'engagement_plan': 'objective__engagement_plan_item__engagement_plan',
+    }
+
+    @action(detail=False)
+    def rollup(self, request):
+        group_by = request.query_params.get('group_by', 'engagement_plan')
+        if group_by not in self.rollup_groups:
+            raise ValidationError({'group_by': ['"{}" is not a valid choice.'.format(group_by)]})
+        queryset = self.filter_queryset(self.get_queryset())
+        rollup = queryset.status_rollup(**{group_by + '_id': F(self.rollup_groups[group_by])})
+        return Response(list(rollup))
+
+
+class HCPDeliverableViewSet(DeliverableViewSet):
+    queryset = HCPDeliverable.objects.select_related(
+        'objective__engagement_plan_item').prefetch_related('comments')
+    serializer_class = HCPDeliverableListSerializer
+
+
+class ProjectDeliverableViewSet(DeliverableViewSet):
+    queryset = ProjectDeliverable.objects.select_related(
+        'objective__engagement_plan_item').prefetch_related('comments')
+    serializer_class = ProjectDeliverableListSerializer
+
+
+class InteractionViewSet(FingerprintETagMixin,
+                         mixins.CreateModelMixin,
                          mixins.RetrieveModelMixin,
                          mixins.ListModelMixin,
                          viewsets.GenericViewSet):
+    """
+    list:
+    ### **URL Query Parameters**
+
+    * `year=<yyyy>` - get Interactions of this year only, from the live and
+      archive tables (needed for years older than `INTERACTIONS_LIVE_YEARS`)
+    """
     queryset = Interaction.objects.all()
     serializer_class = InteractionSerializer
     permission_classes = (IsAuthenticated,)
+    fingerprint_related = ('hcp', 'hcp_objective', 'project', 'resources')
     # pagination_class = Pagination
 
+    def get_year_querysets(self, year):
+        """Interactions of `year` from both tables: before `archive_interactions`
+        runs (or with other `--years`), and for backdated ones, a year can be
+        in the live one as well as in the archive.
+        """
+        try:
+            start = timezone.make_aware(datetime.datetime(int(year), 1, 1))
+            end = timezone.make_aware(datetime.datetime(int(year) + 1, 1, 1))
+        except (ValueError, OverflowError):
+            raise ValidationError({'year': 'A valid year is required.'})
+        return [model.objects.filter(time_of_interaction__gte=start, time_of_interaction__lt=end)
+                for model in (Interaction, ArchivedInteraction)]
+
+    def list(self, request, *args, **kwargs):
+        year = request.query_params.get('year', None)
+        if not year:
+            return super().list(request, *args, **kwargs)
+        querysets = [self.filter_queryset(self.filter_scope(qs)) for qs in self.get_year_querysets(year)]
+        fingerprint = [get_queryset_fingerprint(qs, self.fingerprint_related) for qs in querysets]
+        etag = self.get_list_etag(fingerprint)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            # ids are kept when archiving, so they don't collide and sort both tables alike
+            interactions = sorted(itertools.chain(*querysets), key=lambda interaction: interaction.id)
+            response = Response(self.get_serializer(interactions, many=True).data)
+        response['ETag'] = etag
+        return response
+
     #################################################
     # Permissions
     #################################################
 
     def get_queryset(self):
-        qs = super().get_queryset()
+        return self.filter_scope(super().get_queryset())
+
+    def filter_scope(self, qs):
         # staff users and those with list_all_ep perm can see all
         if (
             self.request.user.is_staff or
@@ -397,30 +480,21 @@ class InteractionViewSet(mixins.CreateModelMixin,
             return  # allow
 
 
-class EngagementPlanViewSet(viewsets.ModelViewSet):
+class EngagementPlanViewSet(FingerprintETagMixin, viewsets.ModelViewSet):
     """
     """
     queryset = EngagementPlan.objects.all()
     serializer_class = EngagementPlanSerializer
     permission_classes = (IsAuthenticated,)
+    filterset_class = EngagementPlanFilterSet
+    fingerprint_related = get_serializer_related(EngagementPlanSerializer)
 
     #################################################
     # Permissions
     #################################################
 
     def get_queryset(self):
-        qs = super().get_queryset()
-        # staff users and those with list_all_ep perm can see all
-        if (
-            self.request.user.is_staff or
-            self.request.user.has_interactions_perm(EngagementPlanPerms.list_all_ep)
-        ):
-            return qs
-        # list_own_ag_ep perm allows listing EPs from same AG as user
-        if self.request.user.has_interactions_perm(EngagementPlanPerms.list_own_ag_ep):
-            return qs.filter(user__affiliate_groups__in=self.request.user.affiliate_groups.all())
-        # by default a user only has access to his own EPs
-        return qs.filter(user=self.request.user)
+        return filter_visible_engagement_plans(super().get_queryset(), self.request.user)
 
     def check_object_permissions(self, request, obj):
         super().check_object_permissions(request, obj)
@@ -455,24 +529,6 @@ class EngagementPlanViewSet(viewsets.ModelViewSet):
                     self.permission_denied(request, "Only current (year) engagement plan can be changed")
                 return  # if no condition failed, allow
 
-    #################################################
-    # Filtering
-    #################################################
-
-    def filter_queryset(self, qs):
-        qs = super().filter_queryset(qs)
-        approved = self.request.query_params.get('approved', None)
-        if approved is not None:
-            if approved == 'true':
-                approved = True
-            elif approved == 'false':
-                approved = False
-            else:
-                raise APIException("Parameter 'approved' only have values 'true' or 'false'",
-                                   code=status.HTTP_400_BAD_REQUEST)  # TODO: fix to really return http 400
-            return qs.filter(approved=approved)
-        return qs
-
     #################################################
     # Actions
     #################################################
@@ -546,3 +602,53 @@ class CurrentUserView(APIView):
     def get(self, request):
         serializer = UserSerializer(request.user, context={'request': request})
         return Response(serializer.data)
+
+
+class CurrentPlanView(APIView):
+    """
+    The user's current (year) engagement plan, with its items, objectives and
+    deliverables, and the summaries of its HCPs (with their
+    `recent_interactions_count`) and projects.
+    """
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request):
+        return Response(get_current_plan(request.user))
+
+
+class ChangesView(APIView):
+    """
+    Long-poll of the changes (`{"model", "id", "action", "engagement_plan"}`
+    events) of the engagement plans the user can see, their items and
+    comments, to refetch only what changed.
+
+    ### **URL Query Parameters**
+
+    * `cursor=<cursor>` - the changes after this `cursor` of a previous
+      response (waiting for some), without it only the current `cursor` is
+      answered
+    * `timeout=<seconds>` - how long to wait for changes at most
+
+    `missed` is `true` when changes were missed (too old): everything should
+    be refetched.
+    """
+    permission_classes = (IsAuthenticated,)
+    # waiting requests aren't counted in the user's concurrent ones, a few
+    # open tabs would use them all
+    throttle_classes = (UserScopedRateThrottle,)
+
+    def get(self, request):
+        errors = {}
+        cursor = request.query_params.get('cursor')
+        if cursor is not None:
+            if cursor.isdigit():
+                cursor = int(cursor)
+            else:
+                errors['cursor'] = ['A valid integer is required.']
+        timeout = request.query_params.get('timeout', str(settings.CHANGES_LONG_POLL_TIMEOUT))
+        if not timeout.isdigit() or int(timeout) > settings.CHANGES_LONG_POLL_TIMEOUT:
+            errors['timeout'] = ['Must be between 0 and {}.'.format(settings.CHANGES_LONG_POLL_TIMEOUT)]
+        if errors:
+            raise ValidationError(errors)
+        cursor, events, missed = read_changes(request.user, cursor, int(timeout))
+        return Response({'cursor': cursor, 'events': events, 'missed': missed})